@@ -0,0 +1,82 @@
+# benchmarks/bench_congestion.py
+
+"""
+Cost of the sliding-window congestion counts at scale.
+
+Indexes the departures of a synthetic schedule and counts, for every one of
+its flights, the other departures at its origin, of its carrier at its origin
+and on its route within each window, next to the hourly bucket counts of the
+network features it refines. Checks a sample of the counts against a
+brute-force scan first.
+
+Example usage:
+    python -m benchmarks.bench_congestion --rows 1000000 10000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.data.synthetic import make_flights
+from src.data.table_io import optimize_dtypes
+from src.features.build_features import convert_data_types
+from src.features.congestion_features import (CONGESTION_KEYS, CONGESTION_WINDOWS, congestion_column,
+                                              create_congestion_features, departure_schedule)
+from src.features.network_features import create_network_features, fit_network_statistics
+
+def time_call(func, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def check_sample(result, flights, n_checks, seed=0):
+    """Compare the counts of a few random flights with a scan over the whole schedule."""
+    rng = np.random.default_rng(seed)
+    minutes = ((flights['DepTime'] // 100) * 60 + flights['DepTime'] % 100).to_numpy()
+    for row in rng.choice(len(result), n_checks, replace=False):
+        flight = result.iloc[row]
+        minute = (flight['DepTime'] // 100) * 60 + flight['DepTime'] % 100
+        for name, keys in CONGESTION_KEYS.items():
+            same = np.ones(len(flights), dtype=bool)
+            for col in keys + ('Month', 'DayofMonth'):
+                same &= (flights[col] == flight[col]).to_numpy()
+            for window in CONGESTION_WINDOWS:
+                # less the flight itself
+                expected = (same & (np.abs(minutes - minute) <= window)).sum() - 1
+                assert flight[congestion_column(name, window)] == expected, (row, name, window)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--airports', type=int, default=300)
+    parser.add_argument('--checks', type=int, default=5, help='flights compared against a brute-force scan')
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        # compact dtypes with categorical keys, as read_table loads them
+        flights = optimize_dtypes(convert_data_types(make_flights(n_rows, n_airports=args.airports, seed=0)),
+                                  copy=False)
+        flights['dep_hour'] = flights['DepTime'] // 100
+        print(f"{n_rows} flights, windows of +/-{', '.join(map(str, CONGESTION_WINDOWS))} minutes")
+
+        schedule_s, _ = time_call(lambda: departure_schedule(flights), args.repeat)
+        transform_s, result = time_call(lambda: create_congestion_features(flights), args.repeat)
+        check_sample(result, flights, args.checks)
+        n_columns = len(CONGESTION_KEYS) * len(CONGESTION_WINDOWS)
+        print(f"  index departures             {schedule_s:8.3f}s")
+        print(f"  {n_columns} window counts             {transform_s:8.3f}s ({n_rows / transform_s:,.0f} rows/sec)")
+
+        network = fit_network_statistics(flights)
+        hourly_s, _ = time_call(
+            lambda: create_network_features(flights, statistics=network,
+                                            features=['origin_hourly_flights', 'route_hourly_flights']),
+            args.repeat)
+        print(f"  2 hourly bucket counts       {hourly_s:8.3f}s")
+
+if __name__ == '__main__':
+    main()
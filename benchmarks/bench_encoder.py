@@ -0,0 +1,65 @@
+# benchmarks/bench_encoder.py
+
+"""
+Per-flight latency of the online FeatureEncoder.
+
+Reports p50/p99 of transform_one over individual calls (and whether p99 meets
+the latency target), the amortized per-flight cost of transform_many
+micro-batches, and the batch pandas pipeline on a single row for comparison.
+
+Example usage:
+    python -m benchmarks.bench_encoder --calls 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.data.synthetic import make_flights
+from src.features.build_features import convert_data_types, create_features
+from src.features.encoder import FeatureEncoder
+from src.features.feature_store import FeatureStore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--train-rows', type=int, default=500_000)
+    parser.add_argument('--calls', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--target-p99', type=float, default=50.0, help='transform_one p99 target in microseconds')
+    args = parser.parse_args()
+
+    store = FeatureStore()
+    create_features(convert_data_types(make_flights(args.train_rows)), store, fit=True)
+    encoder = FeatureEncoder(store)
+    records = make_flights(args.calls, seed=1).drop(columns='dep_delayed_15min').to_dict('records')
+
+    # warm up, then time every call individually
+    encoder.transform_many(records[:1000])
+    latencies = np.empty(len(records))
+    clock = time.perf_counter
+    for i, record in enumerate(records):
+        start = clock()
+        encoder.transform_one(record)
+        latencies[i] = clock() - start
+    p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9]) * 1e6
+    verdict = 'meets' if p99 <= args.target_p99 else 'MISSES'
+    print(f"transform_one         p50 {p50:6.1f}us  p99 {p99:6.1f}us  p99.9 {p999:6.1f}us"
+          f"  ({verdict} the {args.target_p99:.0f}us p99 target)")
+
+    start = clock()
+    for i in range(0, len(records), args.batch_size):
+        encoder.transform_many(records[i:i + args.batch_size])
+    per_flight = (clock() - start) / len(records) * 1e6
+    print(f"transform_many({args.batch_size:>3})   {per_flight:6.1f}us per flight")
+
+    single = make_flights(1, seed=2).drop(columns='dep_delayed_15min')
+    timings = []
+    for _ in range(50):
+        start = clock()
+        create_features(convert_data_types(single), store)
+        timings.append(clock() - start)
+    print(f"create_features(1 row) p50 {np.median(timings) * 1e6:8.0f}us")
+
+if __name__ == '__main__':
+    main()
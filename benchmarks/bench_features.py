@@ -0,0 +1,156 @@
+# benchmarks/bench_features.py
+
+"""
+Time and memory of every feature stage and of the end-to-end build_features.
+
+Runs on synthetic flights at each size, writes the results as JSON and, given
+a baseline JSON from an earlier run, exits with status 1 when any benchmark got
+slower (or, when measured, hungrier) by more than the threshold.
+
+Example usage:
+    python -m benchmarks.bench_features --sizes 10000 100000 --output bench.json
+    python -m benchmarks.bench_features --baseline bench.json --threshold 0.2
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.data.synthetic import make_flights
+from src.data.table_io import write_table
+from src.features.build_features import build_features, convert_data_types, create_features
+from src.features.feature_store import FeatureStore
+from src.features.pipeline import FEATURE_STAGES
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+def measure(func, repeat, track_memory):
+    """Best wall time of func over repeat runs, and its tracemalloc peak in one extra run."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    peak = None
+    if track_memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+def run_size(n_rows, args, tmp_dir):
+    """Benchmark every stage and the end-to-end pipeline on n_rows synthetic flights."""
+    results = []
+    track_memory = not args.no_memory and n_rows <= args.memory_max_rows
+
+    def record(name, func):
+        wall_s, peak = measure(func, args.repeat, track_memory)
+        results.append({
+            'benchmark': name,
+            'rows': n_rows,
+            'wall_s': wall_s,
+            'rows_per_s': n_rows / wall_s,
+            'peak_memory_mb': peak / 1e6 if peak is not None else None,
+        })
+        memory = f"{peak / 1e6:10.1f} MB" if peak is not None else ''
+        print(f"{n_rows:>10} {name:<24}{wall_s:>9.3f}s{n_rows / wall_s / 1e6:>8.2f}M rows/s{memory}")
+
+    raw = make_flights(n_rows, seed=0)
+    store = FeatureStore()
+    create_features(convert_data_types(make_flights(min(n_rows, args.train_rows), seed=1)), store, fit=True)
+
+    record('convert_data_types', lambda: convert_data_types(raw))
+
+    # every stage gets a frame with just its declared inputs, as the threaded executor does
+    features = create_features(convert_data_types(raw), store, copy=False)
+    for stage in FEATURE_STAGES:
+        inputs = features[[col for col in stage.inputs if col in features.columns]]
+        statistics = store.statistics.get(stage.statistics)
+        record(f'{stage.name}_stage', lambda: stage.func(inputs.copy(), statistics, None))
+    del features
+
+    raw_path = os.path.join(tmp_dir, f'raw_{n_rows}.parquet')
+    write_table(raw, raw_path)
+    del raw
+    output_path = os.path.join(tmp_dir, f'features_{n_rows}.parquet')
+    store_dir = os.path.join(tmp_dir, f'feature_store_{n_rows}')
+    record('build_features', lambda: build_features(raw_path, output_path, True, store_dir, store_format='parquet'))
+
+    return results
+
+def compare(results, baseline, threshold):
+    """Benchmarks whose time or memory grew by more than threshold over the baseline."""
+    previous = {(result['benchmark'], result['rows']): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        base = previous.get((result['benchmark'], result['rows']))
+        if base is None:
+            continue
+        for metric in ['wall_s', 'peak_memory_mb']:
+            if result[metric] is None or base[metric] is None:
+                continue
+            ratio = result[metric] / base[metric]
+            if ratio > 1 + threshold:
+                regressions.append({'benchmark': result['benchmark'], 'rows': result['rows'], 'metric': metric,
+                                    'baseline': base[metric], 'current': result[metric], 'ratio': ratio})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--train-rows', type=int, default=1_000_000,
+                        help='rows the feature store is fitted on (at most the benchmark size)')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peak-memory runs')
+    parser.add_argument('--memory-max-rows', type=int, default=1_000_000,
+                        help='largest size to measure memory for (tracemalloc slows stages down several times)')
+    parser.add_argument('--output', default='bench_features.json', help='JSON file for the results')
+    parser.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown or memory growth that counts as a regression')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in args.sizes:
+            results += run_size(n_rows, args, tmp_dir)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']} at {regression['rows']} rows: {regression['metric']} "
+                  f"{regression['baseline']:.3f} -> {regression['current']:.3f} ({regression['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
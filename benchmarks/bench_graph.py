@@ -0,0 +1,53 @@
+# benchmarks/bench_graph.py
+
+"""
+Cost of the airport graph scores at the scale of the US network.
+
+Counts a synthetic training set into the feature store's flight count table
+and times building the sparse flight graph and deriving every graph
+statistic (PageRank, weighted degrees, HITS, carrier degrees) from it, which
+is what fitting or partially fitting the store adds for the graph stage.
+
+Example usage:
+    python -m benchmarks.bench_graph --rows 1000000 --airports 350 1025
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.data.synthetic import make_flights
+from src.features.aggregation import count_flights
+from src.features.build_features import convert_data_types
+from src.features.graph_features import flight_graph, graph_statistics_from_counts
+
+def time_call(func, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--airports', type=int, nargs='+', default=[350, 1025])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for n_airports in args.airports:
+        df = convert_data_types(make_flights(args.rows, n_airports=n_airports, seed=0))
+        df['dep_hour'] = df['DepTime'] // 100
+        counts = count_flights(df)
+        _, adjacency = flight_graph(counts)
+        print(f"{n_airports} airports: {adjacency.nnz} city pairs, {len(counts)} count keys from {args.rows} flights")
+
+        graph_s, _ = time_call(lambda: flight_graph(counts), args.repeat)
+        statistics_s, _ = time_call(lambda: graph_statistics_from_counts(counts), args.repeat)
+        print(f"  sparse flight graph          {graph_s:8.3f}s")
+        print(f"  all graph statistics         {statistics_s:8.3f}s")
+
+if __name__ == '__main__':
+    main()
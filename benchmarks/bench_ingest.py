@@ -0,0 +1,71 @@
+# benchmarks/bench_ingest.py
+
+"""
+Ingestion throughput and memory per row of a raw flight CSV.
+
+Compares the previous load (pandas read_csv with every string as a Python
+object, then the "c-" prefix stripped with str.replace and the labels mapped
+after the parse), the same with categorical keys as read_table loads them,
+and schema-driven read_flights (multi-threaded pyarrow parse, "c-" fields
+and labels parsed per distinct value, compact dtypes, range validation).
+Memory is the deep size of the loaded frame.
+
+Example usage:
+    python -m benchmarks.bench_ingest --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from src.data.schema import read_flights
+from src.data.synthetic import make_flights
+from src.data.table_io import read_table
+
+def legacy_convert(df):
+    """The previous convert_data_types: sniff the first Month value, then strip and parse every string."""
+    if isinstance(df['Month'].iloc[0], str) and 'c-' in df['Month'].iloc[0]:
+        for col in ['Month', 'DayofMonth', 'DayOfWeek']:
+            df[col] = df[col].str.replace('c-', '').astype(int)
+    df['dep_delayed_15min'] = df['dep_delayed_15min'].map({'Y': 1, 'N': 0})
+    return df
+
+def timed(func, repeat):
+    """Result of the last call and the best time of repeat calls."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per variant (best time reported)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'flights.csv')
+        make_flights(args.rows, seed=0).to_csv(path, index=False)
+        print(f"{args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB CSV")
+        print(f"{'variant':<34}{'seconds':>9}{'rows/s':>12}{'bytes/row':>11}")
+
+        variants = [
+            ('read_csv + convert (objects)', lambda: legacy_convert(pd.read_csv(path))),
+            ('read_table + convert (categories)', lambda: legacy_convert(read_table(path))),
+            ('read_flights (schema)', lambda: read_flights(path)),
+        ]
+        baseline = None
+        for name, load in variants:
+            df, seconds = timed(load, args.repeat)
+            baseline = baseline or seconds
+            bytes_per_row = df.memory_usage(deep=True).sum() / len(df)
+            print(f"{name:<34}{seconds:>9.2f}{len(df) / seconds:>12,.0f}{bytes_per_row:>11.1f}"
+                  f"  ({baseline / seconds:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_io.py
+
+"""
+Load/save time, file size and in-memory size of the processed feature table.
+
+Compares the previous CSV round-trip with object string columns against
+Parquet and Feather with categorical keys and downcast integers, and the
+memory-mapped float32 feature matrix (whose load maps the file instead of
+reading it, so its memory is only the pages a model touches).
+
+Example usage:
+    python -m benchmarks.bench_io --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from src.data.synthetic import make_flights
+from src.data.matrix_io import load_feature_matrix, write_feature_matrix
+from src.data.table_io import optimize_dtypes, read_table, write_table
+from src.features.build_features import convert_data_types, create_features
+from src.features.feature_store import FeatureStore
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    features = create_features(convert_data_types(make_flights(args.rows)), FeatureStore(), fit=True)
+    # the previous pipeline kept every string column as Python objects
+    legacy = features.astype({col: object for col in features.columns
+                              if isinstance(features[col].dtype, pd.CategoricalDtype)})
+    compact = optimize_dtypes(features)
+
+    print(f"{args.rows} rows, {features.shape[1]} columns")
+    print(f"{'variant':<22}{'write s':>9}{'read s':>9}{'file MB':>10}{'memory MB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = [
+            ('csv (object strings)', legacy, 'features.csv', lambda path: pd.read_csv(path)),
+            ('parquet (compact)', compact, 'features.parquet', read_table),
+            ('feather (compact)', compact, 'features.feather', read_table),
+        ]
+        for name, df, filename, reader in variants:
+            path = os.path.join(tmp, filename)
+            _, write_seconds = timed(lambda: write_table(df, path))
+            loaded, read_seconds = timed(lambda: reader(path))
+            memory_mb = loaded.memory_usage(deep=True).sum() / 1e6
+            print(f"{name:<22}{write_seconds:>9.2f}{read_seconds:>9.2f}"
+                  f"{os.path.getsize(path) / 1e6:>10.1f}{memory_mb:>11.1f}")
+
+        path = os.path.join(tmp, 'features.npy')
+        _, write_seconds = timed(lambda: write_feature_matrix(features, path))
+        matrix, read_seconds = timed(lambda: load_feature_matrix(path))
+        # summing every column touches all pages, the cost of a first pass over the mapped data
+        _, scan_seconds = timed(lambda: matrix.features.sum(axis=0))
+        print(f"{'npy matrix (mapped)':<22}{write_seconds:>9.2f}{read_seconds:>9.4f}"
+              f"{os.path.getsize(path) / 1e6:>10.1f}{0.0:>11.1f}  (first full scan {scan_seconds:.2f}s)")
+
+if __name__ == '__main__':
+    main()
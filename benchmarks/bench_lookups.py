@@ -0,0 +1,76 @@
+# benchmarks/bench_lookups.py
+
+"""
+Per-row cost of the composite-key lookups used by the feature pipeline.
+
+Compares the previous row-wise `df.apply(lambda x: dict.get((a, b)), axis=1)`
+approach with the vectorized KeyLookup engine for every key shape used by the
+feature modules.
+
+Example usage:
+    python -m benchmarks.bench_lookups --rows 100000 10000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.lookup import KeyLookup
+
+KEY_SHAPES = {
+    'carrier x hour': ['UniqueCarrier', 'dep_hour'],
+    'origin x hour': ['Origin', 'dep_hour'],
+    'origin x dest': ['Origin', 'Dest'],
+    'origin x dest x hour': ['Origin', 'Dest', 'dep_hour'],
+}
+
+def make_frame(n_rows, n_airports=300, n_carriers=20, seed=0):
+    """Random frame with Zipf-like airport popularity."""
+    rng = np.random.default_rng(seed)
+    airports = np.array([f'A{i:03d}' for i in range(n_airports)], dtype=object)
+    carriers = np.array([f'C{i:02d}' for i in range(n_carriers)], dtype=object)
+    weights = 1.0 / np.arange(1, n_airports + 1)
+    weights /= weights.sum()
+    return pd.DataFrame({
+        'UniqueCarrier': carriers[rng.integers(0, n_carriers, n_rows)],
+        'Origin': airports[rng.choice(n_airports, n_rows, p=weights)],
+        'Dest': airports[rng.choice(n_airports, n_rows, p=weights)],
+        'dep_hour': rng.integers(0, 24, n_rows),
+    })
+
+def legacy_lookup(df, keys, table, default):
+    table_map = dict(zip(table.index, table.values))
+    return df.apply(lambda x: table_map.get(tuple(x[k] for k in keys), default), axis=1)
+
+def time_call(func, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 10_000_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=100_000,
+                        help='rows used to measure the row-wise path (its per-row cost is size independent)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    reference = make_frame(200_000, seed=1)
+    print(f"{'rows':>10}  {'keys':<22}{'apply ns/row':>14}{'vectorized ns/row':>19}{'speedup':>9}")
+    for n_rows in args.rows:
+        df = make_frame(n_rows)
+        legacy_rows = min(n_rows, args.legacy_max_rows)
+        legacy_df = df.iloc[:legacy_rows]
+        for name, keys in KEY_SHAPES.items():
+            table = reference.groupby(keys).size()
+            legacy = time_call(lambda: legacy_lookup(legacy_df, keys, table, 0), 1) / legacy_rows
+            vectorized = time_call(lambda: KeyLookup(table, 0)(*[df[k] for k in keys]), args.repeat) / n_rows
+            print(f"{n_rows:>10}  {name:<22}{legacy * 1e9:>14.0f}{vectorized * 1e9:>19.1f}{legacy / vectorized:>8.0f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_parallel.py
+
+"""
+Scaling of the feature pipeline from 1 to N cores.
+
+Times the batch transform with independent stages on n_jobs threads and the
+chunked transform with chunks sharded over n_jobs worker processes, and reports
+the speedup over n_jobs=1 for each.
+
+Example usage:
+    python -m benchmarks.bench_parallel --rows 2000000 --max-jobs 8
+"""
+
+import argparse
+import os
+import time
+
+from src.data.synthetic import make_flights
+from src.features.build_features import convert_data_types, create_features, transform_chunks
+from src.features.feature_store import FeatureStore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--train-rows', type=int, default=500_000)
+    parser.add_argument('--chunksize', type=int, default=250_000)
+    parser.add_argument('--max-jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    store = FeatureStore()
+    raw = make_flights(args.rows, seed=1).drop(columns='dep_delayed_15min')
+    chunks = [raw.iloc[i:i + args.chunksize] for i in range(0, len(raw), args.chunksize)]
+    create_features(convert_data_types(make_flights(args.train_rows)), store, fit=True)
+
+    print(f"{args.rows} rows, {os.cpu_count()} cores available")
+    print(f"{'n_jobs':>6}{'stages s':>10}{'speedup':>9}{'chunks s':>10}{'speedup':>9}")
+    # powers of two up to --max-jobs, plus --max-jobs itself
+    job_counts = sorted({2 ** k for k in range(args.max_jobs.bit_length()) if 2 ** k <= args.max_jobs} | {args.max_jobs})
+    baseline = None
+    for n_jobs in job_counts:
+        start = time.perf_counter()
+        create_features(convert_data_types(raw), store, n_jobs=n_jobs)
+        stages = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in transform_chunks((chunk.copy() for chunk in chunks), store, n_jobs=n_jobs):
+            pass
+        sharded = time.perf_counter() - start
+        baseline = baseline or (stages, sharded)
+        print(f"{n_jobs:>6}{stages:>10.2f}{baseline[0] / stages:>8.2f}x{sharded:>10.2f}{baseline[1] / sharded:>8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_predict.py
+
+"""
+Throughput and peak memory of scoring a raw flight file.
+
+Compares the previous path (build_features over the whole file in memory,
+then one model call) with the streaming predict_file pipeline, which
+overlaps reading, featurization, inference and writing on bounded chunks.
+
+Example usage:
+    python -m benchmarks.bench_predict --rows 2000000 --chunksize 200000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from src.data.matrix_io import FeatureMatrixEncoder, read_matrix_manifest
+from src.data.synthetic import make_flights
+from src.features.build_features import build_features
+from src.models import train
+from src.models.predict import load_model, predict_file
+
+def measured(func):
+    """Wall seconds and peak traced memory (MB) of func()."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func()
+        return time.perf_counter() - start, tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--train-rows', type=int, default=200_000)
+    parser.add_argument('--chunksize', type=int, default=200_000)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'feature_store')
+        make_flights(args.train_rows, seed=0).to_parquet(os.path.join(tmp, 'train.parquet'))
+        make_flights(args.rows, seed=1).drop(columns='dep_delayed_15min').to_parquet(os.path.join(tmp, 'test.parquet'))
+        build_features(os.path.join(tmp, 'train.parquet'), os.path.join(tmp, 'train.npy'), feature_store_path=store_dir)
+        matrix = train.load_training_matrix(os.path.join(tmp, 'train.npy'), os.path.join(tmp, 'cache'))
+        train.MAX_ROUNDS = 100
+        study, booster = train.tune(matrix, n_trials=1, cache_dir=os.path.join(tmp, 'cache'))
+        train.save_results(study, booster, 'lightgbm', os.path.join(tmp, 'models'), matrix)
+        model_path = os.path.join(tmp, 'models', 'lightgbm_model.txt')
+
+        def in_memory():
+            df = build_features(os.path.join(tmp, 'test.parquet'), os.path.join(tmp, 'test_features.parquet'),
+                                is_train=False, feature_store_path=store_dir)
+            encoder = FeatureMatrixEncoder(read_matrix_manifest(os.path.join(tmp, 'train.npy')))
+            load_model(model_path)(encoder.encode(df))
+
+        def streaming():
+            predict_file(os.path.join(tmp, 'test.parquet'), os.path.join(tmp, 'predictions.parquet'), model_path,
+                         store_dir, chunksize=args.chunksize, n_jobs=args.n_jobs)
+
+        print(f"{args.rows} rows, chunks of {args.chunksize}")
+        print(f"{'variant':<26}{'seconds':>9}{'rows/sec':>11}{'peak MB':>10}")
+        for name, func in [('build_features + predict', in_memory), ('streaming predict_file', streaming)]:
+            seconds, peak = measured(func)
+            print(f"{name:<26}{seconds:>9.2f}{args.rows / seconds:>11.0f}{peak:>10.1f}")
+
+if __name__ == '__main__':
+    main()
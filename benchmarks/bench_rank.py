@@ -0,0 +1,83 @@
+# benchmarks/bench_rank.py
+
+"""
+Cost of the grouped percentile ranks behind the congestion features.
+
+Ranks a table of flights per (Origin, Dest, dep_hour) within each route, as
+route_congestion_rank does, with the row-expanded
+groupby(...).transform(lambda x: x.rank(pct=True)) the feature was first
+written with, pandas' built-in groupby rank on the rows, and the sort-based
+pct_rank kernel on the counts (each weighted by itself). Checks that all three
+agree before timing.
+
+Example usage:
+    python -m benchmarks.bench_rank --airports 300 3000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.ranking import pct_rank
+
+ROUTE_KEYS = ['Origin', 'Dest', 'dep_hour']
+
+def make_route_hourly(n_airports, n_routes, seed=0):
+    """Flights per (Origin, Dest, dep_hour) for n_routes random routes between n_airports airports."""
+    rng = np.random.default_rng(seed)
+    airports = np.array([f'A{i:04d}' for i in range(n_airports)], dtype=object)
+    origin = rng.integers(0, n_airports, n_routes)
+    dest = (origin + 1 + rng.integers(0, n_airports - 1, n_routes)) % n_airports
+    routes = pd.DataFrame({'Origin': airports[origin], 'Dest': airports[dest]}).drop_duplicates()
+    # every route flies in a random subset of hours, mostly a handful of flights each
+    hours = rng.integers(1, 25, len(routes))
+    keys = routes.loc[routes.index.repeat(hours)].reset_index(drop=True)
+    keys['dep_hour'] = np.concatenate([rng.choice(24, n, replace=False) for n in hours])
+    counts = rng.geometric(0.3, len(keys))
+    return pd.Series(counts, index=pd.MultiIndex.from_frame(keys)).sort_index()
+
+def time_call(func, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--airports', type=int, nargs='+', default=[300, 3000])
+    parser.add_argument('--routes-per-airport', type=int, default=50)
+    parser.add_argument('--lambda-max-routes', type=int, default=20_000,
+                        help='largest table the per-route lambda is timed on (it calls Python once per route)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for n_airports in args.airports:
+        route_hourly = make_route_hourly(n_airports, n_airports * args.routes_per_airport)
+        n_routes = route_hourly.groupby(level=['Origin', 'Dest']).ngroups
+        # one row per flight, carrying the count of its route-hour
+        keys = route_hourly.index.repeat(route_hourly.values)
+        rows = keys.to_frame(index=False).assign(count=route_hourly.reindex(keys).to_numpy())
+        print(f"{n_airports} airports: {n_routes} routes, {len(route_hourly)} route-hours, {len(rows)} flights")
+
+        kernel_s, ranks = time_call(
+            lambda: pct_rank(route_hourly, ['Origin', 'Dest'], weights=route_hourly), args.repeat)
+        expected = ranks.reindex(keys).to_numpy()
+
+        groups = [rows['Origin'], rows['Dest']]
+        builtin_s, builtin = time_call(lambda: rows.groupby(groups)['count'].rank(pct=True), args.repeat)
+        np.testing.assert_array_equal(builtin.to_numpy(), expected)
+        print(f"  groupby().rank on flights    {builtin_s:8.3f}s")
+
+        if n_routes <= args.lambda_max_routes:
+            lambda_s, legacy = time_call(
+                lambda: rows.groupby(groups)['count'].transform(lambda x: x.rank(pct=True)), 1)
+            np.testing.assert_array_equal(legacy.to_numpy(), expected)
+            print(f"  transform(lambda) on flights {lambda_s:8.3f}s")
+        print(f"  pct_rank on counts           {kernel_s:8.3f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_serve.py
+
+"""
+Throughput and latency of the scoring server under concurrent load.
+
+Trains a small model on synthetic flights, starts src.models.serve in a
+separate process and drives it with a closed-loop load generator: each of
+`concurrency` clients keeps one connection open and sends single-flight
+requests back to back. Reports requests/sec and p50/p99 latency per
+concurrency level, for the server with micro-batching and with every
+request scored on its own (--max-batch-size 1).
+
+Example usage:
+    python -m benchmarks.bench_serve --concurrency 1 8 32 128 --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.data.synthetic import make_flights
+from src.features.build_features import build_features
+from src.models import train
+
+MODES = {'micro-batched': [], 'one request per call': ['--max-batch-size', '1']}
+
+async def client(port, flights, deadline, latencies):
+    """Send requests on one keep-alive connection until the deadline, recording each latency."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps(flights[i % len(flights)]).encode()
+        start = time.perf_counter()
+        writer.write(b'POST /predict HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b'\r\n':
+                break
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':')[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    writer.close()
+
+async def load(port, flights, concurrency, duration):
+    """Latencies of all requests of concurrency clients running for duration seconds."""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, flights[i::concurrency], deadline, latencies) for i in range(concurrency)))
+    return np.array(latencies)
+
+def wait_for_port(port, process, timeout=60):
+    """Block until the server accepts connections."""
+    async def probe():
+        _, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.close()
+
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError('the server exited during startup')
+        try:
+            asyncio.run(probe())
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError('the server did not start')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds of load per concurrency level')
+    parser.add_argument('--train-rows', type=int, default=100_000)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-latency-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'feature_store')
+        make_flights(args.train_rows, seed=0).to_parquet(os.path.join(tmp, 'train.parquet'))
+        build_features(os.path.join(tmp, 'train.parquet'), os.path.join(tmp, 'train.npy'), feature_store_path=store_dir)
+        matrix = train.load_training_matrix(os.path.join(tmp, 'train.npy'), os.path.join(tmp, 'cache'))
+        train.MAX_ROUNDS = 100
+        study, booster = train.tune(matrix, n_trials=1, cache_dir=os.path.join(tmp, 'cache'))
+        train.save_results(study, booster, 'lightgbm', os.path.join(tmp, 'models'), matrix)
+        model_path = os.path.join(tmp, 'models', 'lightgbm_model.txt')
+        flights = make_flights(10_000, seed=1).drop(columns='dep_delayed_15min').to_dict('records')
+
+        for mode, options in MODES.items():
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'src.models.serve', '--model', model_path, '--feature-store', store_dir,
+                 '--port', str(args.port), '--max-latency-ms', str(args.max_latency_ms), '--log-level', 'WARNING',
+                 *options])
+            try:
+                wait_for_port(args.port, process)
+                print(mode)
+                for concurrency in args.concurrency:
+                    latencies = asyncio.run(load(args.port, flights, concurrency, args.duration))
+                    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+                    print(f"  concurrency {concurrency:4d}: {len(latencies) / args.duration:8.0f} requests/sec  "
+                          f"p50 {p50:7.1f} ms  p99 {p99:7.1f} ms")
+            finally:
+                process.terminate()
+                process.wait()
+
+if __name__ == '__main__':
+    main()
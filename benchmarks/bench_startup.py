@@ -0,0 +1,116 @@
+# benchmarks/bench_startup.py
+
+"""
+Cold start of the feature transform: imports, loading and the first batch.
+
+Fits a feature store and a training matrix layout on synthetic flights,
+compiles them into a NumPy-only runtime (src.features.runtime) and then
+times, in fresh interpreter processes, everything a short-lived scoring
+worker does before its first feature matrix is ready: importing the
+transform, loading the fitted statistics and transforming one batch. The
+pandas path (build_features.create_features with the feature store and
+FeatureMatrixEncoder) is compared with the runtime; the steady-state time
+of a further batch is reported as well.
+
+Example usage:
+    python -m benchmarks.bench_startup --repeat 5 --batch-size 1 1000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from src.data.matrix_io import read_matrix_manifest
+from src.data.synthetic import make_flights
+from src.features.build_features import MATRIX_MANIFEST_FILENAME, build_features
+from src.features.feature_store import load_feature_store
+from src.features.runtime import compile_runtime
+
+# each script prints the seconds to the first matrix and for a second batch, and whether pandas was imported
+PANDAS_PATH = '''
+import time
+start = time.perf_counter()
+import json
+import sys
+import pandas as pd
+from src.data.matrix_io import FeatureMatrixEncoder
+from src.features.build_features import convert_data_types, create_features
+from src.features.feature_store import load_feature_store
+store = load_feature_store(sys.argv[1])
+with open(sys.argv[2]) as f:
+    encoder = FeatureMatrixEncoder(json.load(f))
+def transform():
+    df = convert_data_types(pd.read_parquet(sys.argv[3]), copy=False)
+    return encoder.encode(create_features(df, store, copy=False, features=encoder.columns))
+transform()
+first = time.perf_counter() - start
+start = time.perf_counter()
+transform()
+print(json.dumps([first, time.perf_counter() - start, 'pandas' in sys.modules]))
+'''
+
+RUNTIME_PATH = '''
+import time
+start = time.perf_counter()
+import json
+import sys
+import numpy as np
+from src.features.runtime import FeatureRuntime
+runtime = FeatureRuntime.load(sys.argv[1])
+def transform():
+    with np.load(sys.argv[3]) as batch:
+        data = {col: batch[col] for col in batch.files}
+    return runtime.transform(data)
+transform()
+first = time.perf_counter() - start
+start = time.perf_counter()
+transform()
+print(json.dumps([first, time.perf_counter() - start, 'pandas' in sys.modules]))
+'''
+
+def run(script, *args):
+    """Seconds to the first matrix and for the second batch, and whether pandas was imported, in a fresh process."""
+    output = subprocess.run([sys.executable, '-c', script, *args], check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[1, 1000])
+    parser.add_argument('--train-rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5, help='fresh processes per measurement (median reported)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'feature_store')
+        make_flights(args.train_rows, seed=0).to_parquet(os.path.join(tmp, 'train.parquet'))
+        build_features(os.path.join(tmp, 'train.parquet'), os.path.join(tmp, 'train.npy'), feature_store_path=store_dir)
+        layout = read_matrix_manifest(os.path.join(store_dir, MATRIX_MANIFEST_FILENAME))
+        layout_path = os.path.join(tmp, 'layout.json')
+        with open(layout_path, 'w') as f:
+            json.dump(layout, f)
+        runtime_path = os.path.join(tmp, 'model.runtime.npz')
+        compile_runtime(load_feature_store(store_dir), layout).save(runtime_path)
+        print(f"{len(layout['columns'])} features, runtime file {os.path.getsize(runtime_path) / 1e6:.1f} MB")
+
+        for batch_size in args.batch_size:
+            flights = make_flights(batch_size, seed=1).drop(columns='dep_delayed_15min')
+            flights.to_parquet(os.path.join(tmp, 'batch.parquet'))
+            np.savez(os.path.join(tmp, 'batch.npz'), **{col: flights[col].to_numpy(dtype=str if flights[col].dtype == object else None)
+                                                        for col in flights.columns})
+            print(f"batch of {batch_size} flights")
+            for name, script, paths in [
+                    ('pandas + feature store', PANDAS_PATH, [store_dir, layout_path, os.path.join(tmp, 'batch.parquet')]),
+                    ('numpy runtime', RUNTIME_PATH, [runtime_path, layout_path, os.path.join(tmp, 'batch.npz')])]:
+                results = [run(script, *paths) for _ in range(args.repeat)]
+                first, second = np.median([result[:2] for result in results], axis=0) * 1000
+                print(f"  {name:24s} import + first batch {first:8.1f} ms   next batch {second:7.1f} ms   "
+                      f"pandas imported: {results[0][2]}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+# src/data/matrix_io.py
+
+import json
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# extension of the feature matrix file; its labels and manifest are written next to it
+MATRIX_EXTENSION = '.npy'
+
+# target column written as the label vector rather than as a feature
+LABEL_COLUMN = 'dep_delayed_15min'
+
+MATRIX_DTYPE = np.float32
+
+# fixed size of the .npy header, so that a streamed file can have its final
+# shape written over the placeholder once all rows are known
+HEADER_BYTES = 128
+
+FeatureMatrix = namedtuple('FeatureMatrix', ['features', 'labels', 'columns', 'categories'])
+
+def is_matrix_path(path):
+    """Whether path names a feature matrix (.npy) rather than a table."""
+    return os.path.splitext(str(path))[1].lower() == MATRIX_EXTENSION
+
+def matrix_files(path):
+    """Paths of the features, labels and manifest of the feature matrix at path."""
+    stem = os.path.splitext(str(path))[0]
+    return str(path), f'{stem}.labels{MATRIX_EXTENSION}', f'{stem}.json'
+
+def read_matrix_manifest(path):
+    """Manifest of the feature matrix at path (or of a manifest .json path)."""
+    manifest_path = path if str(path).endswith('.json') else matrix_files(path)[2]
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def load_feature_matrix(path, mmap_mode='r'):
+    """
+    Load a feature matrix written by FeatureMatrixWriter without copying it.
+
+    The features are memory-mapped, so loading is instant regardless of the
+    row count, pages are only read when touched, and worker processes mapping
+    the same file share them through the page cache. The row-major float32
+    buffer can be passed as is to lightgbm.Dataset, xgboost.DMatrix or
+    catboost.Pool (with the categorical column indices from the manifest).
+
+    Parameters:
+    -----------
+    path : str
+        The .npy features file
+    mmap_mode : str, default='r'
+        Mode of numpy.load; None reads the matrix into memory
+
+    Returns:
+    --------
+    FeatureMatrix
+        features (rows x columns float32), labels (float32, None if the data
+        had no target), column names, and the categories of every
+        categorical column, whose position is the code stored in the matrix
+    """
+    features_path, labels_path, _ = matrix_files(path)
+    manifest = read_matrix_manifest(path)
+    features = np.load(features_path, mmap_mode=mmap_mode)
+    labels = np.load(labels_path, mmap_mode=mmap_mode) if manifest['label'] is not None else None
+    return FeatureMatrix(features, labels, manifest['columns'], manifest['categories'])
+
+class FeatureMatrixEncoder:
+    """
+    Encode DataFrame chunks as rows of a dense float32 feature matrix.
+
+    Numeric columns are taken as they are; string and categorical columns
+    become their integer codes in per-column category lists (missing or
+    unknown values become NaN). Without a reference, the columns are fixed by
+    the first chunk and categories are added as they appear, so the codes of
+    earlier chunks never change.
+
+    Parameters:
+    -----------
+    reference : dict, optional
+        Manifest of an earlier export (e.g. the training matrix) whose columns
+        and category codes are reused, so both matrices share one layout
+    label : str, default=LABEL_COLUMN
+        Target column, left out of the features
+    """
+
+    def __init__(self, reference=None, label=LABEL_COLUMN):
+        self.label = label
+        self.columns = list(reference['columns']) if reference is not None else None
+        self.categories = {col: list(values) for col, values in reference['categories'].items()} if reference else {}
+        # reference categories are fixed; otherwise values are added as they appear
+        self._fixed = reference is not None
+        self._category_index = {col: pd.Index(values) for col, values in self.categories.items()}
+
+    def encode(self, df):
+        """Feature block of df (rows x columns, row-major float32)."""
+        if self.columns is None:
+            self.columns = [col for col in df.columns if col != self.label]
+        block = np.empty((len(df), len(self.columns)), dtype=MATRIX_DTYPE)
+        for i, col in enumerate(self.columns):
+            block[:, i] = self._column(df, col)
+        return block
+
+    def layout(self):
+        """Columns and category codes, as stored in the manifest."""
+        columns = self.columns or []
+        return {
+            'dtype': np.dtype(MATRIX_DTYPE).name,
+            'columns': columns,
+            'categorical': [col for col in columns if col in self.categories],
+            'categories': {col: self.categories[col] for col in columns if col in self.categories},
+        }
+
+    def _column(self, df, col):
+        """float32 values of one column: numbers as they are, strings and categoricals as codes."""
+        if col not in df.columns:
+            return np.nan
+        values = df[col]
+        if col in self.categories or not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)):
+            return self._codes(col, values)
+        return values.to_numpy(dtype=MATRIX_DTYPE, na_value=np.nan)
+
+    def _codes(self, col, values):
+        """Codes of values in the column's categories (NaN when missing or unknown)."""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            level, codes = values.cat.categories, values.cat.codes.to_numpy()
+        else:
+            codes, level = pd.factorize(values)
+        index = self._category_index.get(col, pd.Index([]))
+        if not self._fixed:
+            new = level[~level.isin(index)]
+            if len(new):
+                self.categories.setdefault(col, []).extend(new.sort_values().tolist())
+                index = self._category_index[col] = pd.Index(self.categories[col])
+        self.categories.setdefault(col, [])
+        # a trailing -1 so that missing values (code -1) map to -1 as well
+        mapped = np.append(index.get_indexer(level), -1)[codes]
+        return np.where(mapped >= 0, mapped, np.nan).astype(MATRIX_DTYPE)
+
+class FeatureMatrixWriter:
+    """
+    Incrementally write DataFrame chunks as a dense float32 feature matrix.
+
+    Writes path (a row-major .npy file with every feature column, encoded by
+    a FeatureMatrixEncoder), a .labels.npy file with the target when the data
+    has one, and a .json manifest with the column names and the categories of
+    the string and categorical columns. Rows are appended as they arrive, and
+    the final shape is written into the fixed-size header on close.
+
+    Parameters:
+    -----------
+    path : str
+        Output .npy file
+    reference : dict, optional
+        Manifest of an earlier export (e.g. the training matrix) whose columns
+        and category codes are reused, so both matrices share one layout
+    label : str, default=LABEL_COLUMN
+        Column written as the label vector
+    """
+
+    def __init__(self, path, reference=None, label=LABEL_COLUMN):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.label = label
+        self.encoder = FeatureMatrixEncoder(reference, label)
+        self.n_rows = 0
+        self._features = None
+        self._labels = None
+
+    def write(self, df):
+        """Append one chunk."""
+        if self._features is None:
+            self._open(df)
+        self.encoder.encode(df).tofile(self._features)
+        if self._labels is not None:
+            np.asarray(df[self.label], dtype=MATRIX_DTYPE).tofile(self._labels)
+        self.n_rows += len(df)
+
+    def close(self):
+        """Write the final shapes and the manifest."""
+        if self._features is None:
+            self._open(pd.DataFrame(columns=self.encoder.columns or []))
+        if self._features.closed:
+            return
+        _write_header(self._features, (self.n_rows, len(self.encoder.columns)))
+        self._features.close()
+        if self._labels is not None:
+            _write_header(self._labels, (self.n_rows,))
+            self._labels.close()
+
+        with open(matrix_files(self.path)[2], 'w') as f:
+            json.dump(self.manifest(), f, indent=2)
+
+    def manifest(self):
+        """Layout of the matrix: row count, columns, category codes and label."""
+        return {'rows': self.n_rows, **self.encoder.layout(),
+                'label': self.label if self._labels is not None else None}
+
+    def _open(self, df):
+        """Fix the columns from the first chunk and start both files with placeholder headers."""
+        if self.encoder.columns is None:
+            self.encoder.columns = [col for col in df.columns if col != self.label]
+        features_path, labels_path, _ = matrix_files(self.path)
+        self._features = open(features_path, 'wb')
+        _write_header(self._features, (0, len(self.encoder.columns)))
+        if self.label in df.columns:
+            self._labels = open(labels_path, 'wb')
+            _write_header(self._labels, (0,))
+        elif os.path.exists(labels_path):
+            # do not leave the labels of an earlier export next to the new matrix
+            os.remove(labels_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def write_feature_matrix(df, path, reference=None, label=LABEL_COLUMN):
+    """
+    Write a DataFrame as a dense float32 feature matrix (see FeatureMatrixWriter).
+
+    Returns:
+    --------
+    dict
+        The manifest written next to the matrix
+    """
+    with FeatureMatrixWriter(path, reference, label) as writer:
+        writer.write(df)
+    return writer.manifest()
+
+def _write_header(f, shape):
+    """Write a version 1.0 .npy header padded to HEADER_BYTES at the start of f, then seek to the end."""
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(MATRIX_DTYPE)), 'fortran_order': False,
+                   'shape': tuple(shape)})
+    magic = np.lib.format.magic(1, 0)
+    length = HEADER_BYTES - len(magic) - 2
+    f.seek(0)
+    f.write(magic + struct.pack('<H', length) + (header.ljust(length - 1) + '\n').encode('latin1'))
+    f.seek(0, os.SEEK_END)
@@ -0,0 +1,292 @@
+# src/data/schema.py
+
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .table_io import iter_arrow_chunks, read_arrow, write_table
+
+logger = logging.getLogger(__name__)
+
+# one raw column: target dtype ('category' or an integer dtype), string prefix of
+# encoded values, mapping of label strings to codes, and inclusive valid range
+# (a None bound is open)
+Field = namedtuple('Field', ['name', 'dtype', 'prefix', 'labels', 'valid'], defaults=(None, None, None))
+
+FLIGHT_SCHEMA = [
+    Field('Month', 'int8', prefix='c-', valid=(1, 12)),
+    Field('DayofMonth', 'int8', prefix='c-', valid=(1, 31)),
+    Field('DayOfWeek', 'int8', prefix='c-', valid=(1, 7)),
+    Field('DepTime', 'int16', valid=(0, 2400)),
+    Field('UniqueCarrier', 'category'),
+    Field('Origin', 'category'),
+    Field('Dest', 'category'),
+    Field('Distance', 'int16', valid=(0, None)),
+    Field('dep_delayed_15min', 'int8', labels={'N': 0, 'Y': 1}, valid=(0, 1)),
+]
+
+# what read_flights does with rows failing validation
+BAD_ROW_ACTIONS = ('keep', 'drop', 'raise')
+
+# bad values kept by a BadRowReport (all of them are counted)
+MAX_REPORTED_VALUES = 100_000
+
+def normalize_flights(df, schema=FLIGHT_SCHEMA, copy=True):
+    """
+    Convert raw flight columns to the dtypes of the schema.
+
+    Encoded string columns ("c-7", "Y"/"N") are parsed value by value over
+    their distinct values only and gathered back by code, so categorical
+    columns are never expanded to strings. Integer columns get the schema's
+    compact dtype when all their values fit; columns with missing or
+    unparseable values are left as float64 with NaN for validate_flights to
+    report. Columns already numeric are only downcast.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Raw flight data; schema columns that are absent are skipped
+    schema : list of Field, default=FLIGHT_SCHEMA
+        Columns to normalize
+    copy : bool, default=True
+        Work on a copy of df; set to False to convert the columns in place
+
+    Returns:
+    --------
+    pandas.DataFrame
+        DataFrame with the schema dtypes
+    """
+    df_out = df.copy() if copy else df
+
+    for field in schema:
+        if field.name not in df_out.columns:
+            continue
+        values = df_out[field.name]
+        if field.dtype == 'category':
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                df_out[field.name] = values.astype('category')
+            continue
+        if pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            numbers = values.to_numpy()
+        else:
+            numbers = _parse_encoded(values, field)
+        df_out[field.name] = pd.Series(_compact(numbers, field.dtype), index=values.index)
+
+    return df_out
+
+def validate_flights(df, schema=FLIGHT_SCHEMA):
+    """
+    Find the values of normalized flight data outside the schema's valid ranges.
+
+    Missing values (including those normalize_flights could not parse) are
+    reported in every integer column.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Flight data after normalize_flights
+    schema : list of Field, default=FLIGHT_SCHEMA
+        Columns and ranges to check
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per bad value: row (index label of df), column and value
+        (NaN when missing), ordered by column then row
+    """
+    issues = []
+    for field in schema:
+        if field.name not in df.columns or field.dtype == 'category':
+            continue
+        values = df[field.name].to_numpy()
+        bad = np.isnan(values) if values.dtype.kind == 'f' else np.zeros(len(values), dtype=bool)
+        low, high = field.valid or (None, None)
+        if low is not None:
+            bad |= values < low
+        if high is not None:
+            bad |= values > high
+        rows = np.flatnonzero(bad)
+        if len(rows):
+            issues.append(pd.DataFrame({'row': df.index[rows], 'column': field.name,
+                                        'value': values[rows].astype(np.float64)}))
+    if not issues:
+        return pd.DataFrame({'row': pd.Series(dtype=df.index.dtype), 'column': pd.Series(dtype=object),
+                             'value': pd.Series(dtype=np.float64)})
+    return pd.concat(issues, ignore_index=True)
+
+class BadRowReport:
+    """
+    Bad values found while reading flight data, accumulated over chunks.
+
+    Every bad value is counted per column; the values themselves (row,
+    column, value) are kept up to max_values so a badly broken file cannot
+    exhaust memory.
+
+    Parameters:
+    -----------
+    max_values : int, default=MAX_REPORTED_VALUES
+        Number of bad values kept for to_frame and write
+    """
+
+    def __init__(self, max_values=MAX_REPORTED_VALUES):
+        self.max_values = max_values
+        self.counts = {}
+        self.n_rows = 0
+        self._issues = []
+        self._n_kept = 0
+
+    def add(self, issues):
+        """Record the output of validate_flights for one table or chunk."""
+        if len(issues) == 0:
+            return
+        for column, count in issues['column'].value_counts(sort=False).items():
+            self.counts[column] = self.counts.get(column, 0) + int(count)
+        self.n_rows += issues['row'].nunique()
+        if self._n_kept < self.max_values:
+            kept = issues.head(self.max_values - self._n_kept)
+            self._issues.append(kept)
+            self._n_kept += len(kept)
+
+    @property
+    def n_values(self):
+        """Number of bad values recorded."""
+        return sum(self.counts.values())
+
+    def summary(self):
+        """One line of bad value counts per column."""
+        if not self.counts:
+            return "no bad rows"
+        counts = ', '.join(f'{column}: {count}' for column, count in self.counts.items())
+        return f"{self.n_rows} bad rows ({counts})"
+
+    def to_frame(self):
+        """The kept bad values as a DataFrame of row, column and value."""
+        if not self._issues:
+            return validate_flights(pd.DataFrame())
+        return pd.concat(self._issues, ignore_index=True)
+
+    def write(self, path):
+        """Write the kept bad values as a CSV, Parquet or Feather table."""
+        write_table(self.to_frame(), path)
+
+def read_flights(path, columns=None, on_bad_rows='keep', report=None, schema=FLIGHT_SCHEMA):
+    """
+    Read a raw flight file, normalized and validated against the schema.
+
+    CSV files are parsed by the multi-threaded pyarrow reader with the
+    encoded string columns dictionary-encoded, so "c-" fields and labels are
+    parsed once per distinct value, and the key columns arrive as
+    categoricals without ever being materialised as Python strings.
+
+    Parameters:
+    -----------
+    path : str
+        Input file (CSV, Parquet or Feather)
+    columns : list of str, optional
+        Only read these columns (missing ones are ignored)
+    on_bad_rows : str, default='keep'
+        What to do with rows failing validation: 'keep' them (values that
+        could not be parsed are NaN), 'drop' them or 'raise' a ValueError;
+        they are logged and recorded in report in every case
+    report : BadRowReport, optional
+        Collects the bad values
+    schema : list of Field, default=FLIGHT_SCHEMA
+        Declared columns
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The flights with the schema dtypes and a RangeIndex of file rows
+    """
+    _check_action(on_bad_rows)
+    table = read_arrow(path, columns, column_types=arrow_column_types(schema))
+    return _checked(_normalized_frame(table, schema), on_bad_rows, report, schema, path)
+
+def iter_flight_chunks(path, chunksize, columns=None, on_bad_rows='keep', report=None, schema=FLIGHT_SCHEMA):
+    """
+    Iterate over a raw flight file in normalized and validated chunks of at most chunksize rows.
+
+    CSV files are parsed block by block with the pyarrow reader; see
+    read_flights for the parameters.
+
+    Yields:
+    -------
+    pandas.DataFrame
+        Consecutive chunks, with a running RangeIndex of file rows (dropped
+        bad rows leave gaps)
+    """
+    _check_action(on_bad_rows)
+    start = 0
+    for table in iter_arrow_chunks(path, chunksize, columns, column_types=arrow_column_types(schema)):
+        chunk = _normalized_frame(table, schema)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield _checked(chunk, on_bad_rows, report, schema, path)
+
+def arrow_column_types(schema=FLIGHT_SCHEMA):
+    """pyarrow CSV column types loading the string-encoded and categorical schema columns dictionary-encoded."""
+    import pyarrow as pa
+
+    return {field.name: pa.dictionary(pa.int32(), pa.string()) for field in schema
+            if field.dtype == 'category' or field.prefix is not None or field.labels is not None}
+
+def _normalized_frame(table, schema):
+    """Arrow table to a normalized DataFrame, dictionary-encoding the string columns of a columnar file first."""
+    import pyarrow as pa
+
+    encoded = set(arrow_column_types(schema))
+    for index, name in enumerate(table.column_names):
+        if name in encoded and pa.types.is_string(table.schema.field(name).type):
+            table = table.set_column(index, name, table.column(name).dictionary_encode())
+    return normalize_flights(table.to_pandas(), schema, copy=False)
+
+def _checked(df, on_bad_rows, report, schema, path):
+    """Validate df, then record, log and act on its bad rows."""
+    issues = validate_flights(df, schema)
+    if len(issues) == 0:
+        return df
+    if report is not None:
+        report.add(issues)
+    found = BadRowReport()
+    found.add(issues)
+    if on_bad_rows == 'raise':
+        raise ValueError(f"Invalid flights in {path}: {found.summary()}")
+    logger.warning("%s in %s%s", found.summary(), path, ", dropped" if on_bad_rows == 'drop' else "")
+    if on_bad_rows == 'drop':
+        df = df.drop(index=issues['row'].unique())
+        df = normalize_flights(df, schema, copy=False)
+    return df
+
+def _check_action(on_bad_rows):
+    if on_bad_rows not in BAD_ROW_ACTIONS:
+        raise ValueError(f"on_bad_rows must be one of {BAD_ROW_ACTIONS}, got {on_bad_rows!r}")
+
+def _parse_encoded(values, field):
+    """Numbers (float64, NaN where missing or unparseable) of an encoded string column, parsed per distinct value."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Index(uniques)
+    if field.labels is not None:
+        parsed = uniques.map(lambda value: field.labels.get(value, np.nan))
+    else:
+        text = uniques.astype(str)
+        if field.prefix is not None:
+            text = text.str.removeprefix(field.prefix)
+        parsed = pd.to_numeric(text, errors='coerce')
+    # code -1 (missing) picks the appended NaN
+    return np.append(np.asarray(parsed, dtype=np.float64), np.nan)[codes]
+
+def _compact(numbers, dtype):
+    """numbers as dtype when every value is a whole number in its range, else int64, else float64 (NaN kept)."""
+    if len(numbers) == 0:
+        return numbers.astype(dtype)
+    if numbers.dtype.kind == 'f' and (np.isnan(numbers).any() or (numbers != np.round(numbers)).any()):
+        return numbers.astype(np.float64)
+    info = np.iinfo(dtype)
+    if numbers.min() >= info.min and numbers.max() <= info.max:
+        return numbers.astype(dtype)
+    return numbers.astype(np.int64)
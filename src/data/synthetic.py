@@ -0,0 +1,119 @@
+# src/data/synthetic.py
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# busiest airports first, so the Zipf-like popularity puts the real hubs on top
+HUB_AIRPORTS = ['ATL', 'ORD', 'DFW', 'LAX', 'DEN', 'PHX', 'IAH', 'LAS', 'DTW', 'MSP', 'EWR', 'SFO', 'SLC',
+                'BOS', 'CLT', 'LGA', 'JFK', 'SEA', 'PHL', 'MCO', 'CLE', 'PIT', 'BWI', 'MIA', 'SAN']
+CARRIERS = ['WN', 'AA', 'DL', 'UA', 'MQ', 'OO', 'US', 'NW', 'XE', 'CO', 'EV', 'FL', 'OH', 'B6', 'AS',
+            'YV', '9E', 'DH', 'HP', 'F9', 'TZ', 'HA', 'AQ']
+
+# share of departures per hour of day: quiet nights, morning and evening banks
+HOUR_WEIGHTS = np.array([1, 0.5, 0.2, 0.1, 0.2, 2, 6, 8, 8, 7, 6, 6, 6, 6, 6, 6, 7, 7, 7, 6, 5, 4, 3, 2])
+
+# Y/N target shares are driven by these effects on the log-odds of a delay
+BASE_DELAY_LOGIT = -1.8
+HOUR_DELAY_LOGIT = 0.07
+PEAK_MONTHS = [6, 7, 8, 12]
+
+def _zipf_weights(n, exponent):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+def _airport_codes(n_airports):
+    """The hub codes followed by made-up three-letter codes."""
+    codes = HUB_AIRPORTS[:n_airports]
+    extra = (''.join(letters) for letters in itertools.product('ZYXWVUTSRQ', repeat=3))
+    codes += [code for code, _ in zip(extra, range(n_airports - len(codes)))]
+    return np.array(codes, dtype=object)
+
+def make_flights(n_rows, n_airports=300, n_carriers=20, airport_skew=1.0, carrier_skew=0.8, year=2006,
+                 with_target=True, seed=0):
+    """
+    Random flights in the raw competition format.
+
+    Dates are drawn from one calendar year, so Month, DayofMonth and DayOfWeek
+    are consistent, and use the "c-" string encoding of the competition files.
+    Airport and carrier popularity follow Zipf-like laws with the real hubs
+    and carriers on top, departures cluster in the morning and evening banks,
+    Distance is fixed per route from random airport positions, and the delay
+    probability rises with the departure hour, in the peak travel months and
+    for some carriers and origins.
+
+    Parameters:
+    -----------
+    n_rows : int
+        Number of flights
+    n_airports : int, default=300
+        Number of distinct airports
+    n_carriers : int, default=20
+        Number of distinct carriers (at most len(CARRIERS))
+    airport_skew, carrier_skew : float
+        Zipf exponents of airport and carrier popularity
+    year : int, default=2006
+        Calendar year the dates are drawn from
+    with_target : bool, default=True
+        Add the dep_delayed_15min column ('Y'/'N')
+    seed : int, default=0
+        Random seed
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Raw flights with the columns of flight_delays_train.csv (string columns
+        hold shared Python objects, so even 10M rows stay compact)
+    """
+    if n_carriers > len(CARRIERS):
+        raise ValueError(f"n_carriers must be at most {len(CARRIERS)}")
+    rng = np.random.default_rng(seed)
+
+    # calendar
+    start = np.datetime64(f'{year}-01-01')
+    n_days = int((np.datetime64(f'{year + 1}-01-01') - start).astype(int))
+    dates = start + rng.integers(0, n_days, n_rows).astype('timedelta64[D]')
+    month = dates.astype('datetime64[M]').astype(int) % 12 + 1
+    day_of_month = (dates - dates.astype('datetime64[M]')).astype(int) + 1
+    # 1970-01-01 was a Thursday; DayOfWeek counts Monday as 1
+    day_of_week = (dates.astype(int) + 3) % 7 + 1
+    encoded = np.array([f'c-{i}' for i in range(32)], dtype=object)
+
+    # departure time
+    hour = rng.choice(24, n_rows, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    dep_time = hour * 100 + rng.integers(0, 60, n_rows)
+
+    # carriers, airports and routes
+    carriers = np.array(CARRIERS[:n_carriers], dtype=object)
+    carrier = rng.choice(n_carriers, n_rows, p=_zipf_weights(n_carriers, carrier_skew))
+    airports = _airport_codes(n_airports)
+    airport_weights = _zipf_weights(n_airports, airport_skew)
+    origin = rng.choice(n_airports, n_rows, p=airport_weights)
+    dest = rng.choice(n_airports, n_rows, p=airport_weights)
+    # no round trips to the same airport
+    dest = np.where(dest == origin, (dest + 1 + rng.integers(0, n_airports - 1, n_rows)) % n_airports, dest)
+
+    positions = rng.uniform([0, 0], [2500, 1200], size=(n_airports, 2))
+    distance = np.maximum(np.hypot(*(positions[origin] - positions[dest]).T).round().astype(np.int64), 30)
+
+    flights = pd.DataFrame({
+        'Month': encoded[month],
+        'DayofMonth': encoded[day_of_month],
+        'DayOfWeek': encoded[day_of_week],
+        'DepTime': dep_time,
+        'UniqueCarrier': carriers[carrier],
+        'Origin': airports[origin],
+        'Dest': airports[dest],
+        'Distance': distance,
+    })
+
+    if with_target:
+        carrier_effect = rng.normal(0, 0.3, n_carriers)
+        airport_effect = rng.normal(0, 0.3, n_airports)
+        logit = (BASE_DELAY_LOGIT + HOUR_DELAY_LOGIT * (hour - 12) + 0.3 * np.isin(month, PEAK_MONTHS)
+                 + carrier_effect[carrier] + airport_effect[origin])
+        delayed = rng.random(n_rows) < 1 / (1 + np.exp(-logit))
+        flights['dep_delayed_15min'] = np.array(['N', 'Y'], dtype=object)[delayed.astype(int)]
+
+    return flights
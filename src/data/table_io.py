@@ -0,0 +1,322 @@
+# src/data/table_io.py
+
+import csv
+import os
+import pandas as pd
+
+# file extensions recognised for each supported table format
+TABLE_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+    '.ipc': 'feather',
+}
+
+# string key columns that are always loaded as categoricals
+CATEGORICAL_COLUMNS = ['UniqueCarrier', 'Origin', 'Dest']
+
+# bytes of CSV text parsed into each Arrow record batch when streaming a CSV file
+CSV_BLOCK_BYTES = 1 << 24
+
+def table_format(path):
+    """Return 'csv', 'parquet' or 'feather' from the file extension of path."""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext not in TABLE_FORMATS:
+        raise ValueError(f"Unsupported table format '{ext}' for {path}; expected one of {sorted(TABLE_FORMATS)}")
+    return TABLE_FORMATS[ext]
+
+def optimize_dtypes(df, float_dtype=None, max_category_ratio=0.5, downcast_integers=True, copy=True):
+    """
+    Shrink a DataFrame to compact dtypes.
+
+    String columns with few distinct values become categoricals and integer
+    columns are downcast to the smallest integer type that holds their range.
+    Floats are only downcast when float_dtype is given, since float32 is not
+    lossless for rates and ranks.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        DataFrame to shrink
+    float_dtype : str or numpy.dtype, optional
+        Target dtype for float columns (e.g. 'float32')
+    max_category_ratio : float, default=0.5
+        Convert a string column to categorical when its number of distinct
+        values is at most this fraction of the rows
+    downcast_integers : bool, default=True
+        Downcast integer columns; disable for chunks that must share one schema
+    copy : bool, default=True
+        Work on a copy of df; set to False to convert the columns in place
+
+    Returns:
+    --------
+    pandas.DataFrame
+        DataFrame with compact dtypes
+    """
+    df_out = df.copy() if copy else df
+
+    for col in df_out.columns:
+        values = df_out[col]
+        if isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(values):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            if downcast_integers:
+                df_out[col] = pd.to_numeric(values, downcast='integer')
+        elif pd.api.types.is_float_dtype(values):
+            if float_dtype is not None:
+                df_out[col] = values.astype(float_dtype)
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            if values.nunique() <= max_category_ratio * len(values) or col in CATEGORICAL_COLUMNS:
+                df_out[col] = values.astype('category')
+
+    return df_out
+
+def read_table(path, columns=None):
+    """
+    Read a CSV, Parquet or Feather table, with the key columns as categoricals.
+
+    Parameters:
+    -----------
+    path : str
+        Input file; the format is taken from the extension
+    columns : list of str, optional
+        Only read these columns (missing ones are ignored)
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The loaded table
+    """
+    fmt = table_format(path)
+    if fmt == 'csv':
+        usecols = (lambda col: col in columns) if columns is not None else None
+        return pd.read_csv(path, usecols=usecols, dtype={col: 'category' for col in CATEGORICAL_COLUMNS})
+
+    if columns is not None:
+        available = _arrow_schema(path, fmt).names
+        columns = [col for col in columns if col in available]
+    table = _read_arrow(path, fmt, columns)
+    return _to_pandas(table)
+
+def iter_table_chunks(path, chunksize, columns=None):
+    """
+    Iterate over a CSV, Parquet or Feather table in chunks of at most chunksize rows.
+
+    Parquet files are read batch by batch and Feather files are memory-mapped,
+    so only one chunk is materialised at a time.
+
+    Yields:
+    -------
+    pandas.DataFrame
+        Consecutive chunks, with a running RangeIndex as pd.read_csv(chunksize=...) gives
+    """
+    fmt = table_format(path)
+    if fmt == 'csv':
+        usecols = (lambda col: col in columns) if columns is not None else None
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=usecols,
+                               dtype={col: 'category' for col in CATEGORICAL_COLUMNS})
+        return
+
+    start = 0
+    for table in iter_arrow_chunks(path, chunksize, columns):
+        chunk = _to_pandas(table)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+def read_arrow(path, columns=None, column_types=None):
+    """
+    Read a CSV, Parquet or Feather file as an Arrow table.
+
+    CSV files are parsed by the multi-threaded pyarrow reader.
+
+    Parameters:
+    -----------
+    path : str
+        Input file; the format is taken from the extension
+    columns : list of str, optional
+        Only read these columns (missing ones are ignored)
+    column_types : dict, optional
+        Arrow type of CSV columns, by name (e.g. dictionary-encoded strings);
+        other columns have their type inferred
+
+    Returns:
+    --------
+    pyarrow.Table
+    """
+    fmt = table_format(path)
+    if fmt == 'csv':
+        import pyarrow.csv as pa_csv
+
+        return pa_csv.read_csv(path, convert_options=_csv_convert_options(path, columns, column_types))
+    if columns is not None:
+        available = _arrow_schema(path, fmt).names
+        columns = [col for col in columns if col in available]
+    return _read_arrow(path, fmt, columns)
+
+def iter_arrow_chunks(path, chunksize, columns=None, column_types=None):
+    """
+    Iterate over a CSV, Parquet or Feather file as Arrow tables of at most chunksize rows.
+
+    CSV files are parsed block by block (CSV_BLOCK_BYTES at a time), Parquet
+    files batch by batch and Feather files are memory-mapped, so only about
+    one chunk is materialised at a time. column_types applies to CSV files as
+    in read_arrow.
+
+    Yields:
+    -------
+    pyarrow.Table
+        Consecutive chunks, all of chunksize rows except the last one
+    """
+    import pyarrow as pa
+
+    fmt = table_format(path)
+    if fmt == 'csv':
+        import pyarrow.csv as pa_csv
+
+        batches = pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+                                  convert_options=_csv_convert_options(path, columns, column_types))
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        if columns is not None:
+            table = table.select([col for col in columns if col in table.column_names])
+        batches = table.to_batches(max_chunksize=chunksize)
+
+    # regroup the batches (of whatever size the format gives) into chunks of chunksize rows
+    pending, n_pending = [], 0
+    for batch in batches:
+        pending.append(batch)
+        n_pending += batch.num_rows
+        while n_pending >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunksize)
+            rest = table.slice(chunksize)
+            pending, n_pending = rest.to_batches(), rest.num_rows
+    if n_pending:
+        yield pa.Table.from_batches(pending)
+
+def write_table(df, path):
+    """
+    Write a DataFrame as CSV, Parquet or Feather depending on the extension of path.
+
+    Categorical columns are stored dictionary-encoded in the columnar formats.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fmt = table_format(path)
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+
+class TableWriter:
+    """
+    Incrementally write DataFrame chunks to a CSV, Parquet or Feather file.
+
+    The schema is fixed by the first chunk. Dictionary-encoded (categorical)
+    columns may have different categories in every chunk: Parquet stores a
+    dictionary per row group, while Feather files only allow one dictionary per
+    column, so those columns are written as plain strings there.
+
+    Parameters:
+    -----------
+    path : str
+        Output file; the format is taken from the extension
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.format = table_format(path)
+        self.n_rows = 0
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        """Append one chunk."""
+        if self.format == 'csv':
+            df.to_csv(self.path, mode='w' if self.n_rows == 0 else 'a', header=self.n_rows == 0, index=False)
+            self.n_rows += len(df)
+            return
+
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._schema = _chunk_schema(table.schema, self.format)
+            if self.format == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+        self.n_rows += len(df)
+
+    def close(self):
+        """Finish the file."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _chunk_schema(schema, fmt):
+    """Schema every chunk is cast to: one dictionary index type, or decoded strings for Feather."""
+    import pyarrow as pa
+
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            if fmt == 'parquet':
+                field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+            else:
+                field = field.with_type(field.type.value_type)
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+def _csv_convert_options(path, columns, column_types):
+    """pyarrow CSV conversion options reading the given columns present in the header, with column_types."""
+    import pyarrow.csv as pa_csv
+
+    include = None
+    if columns is not None:
+        with open(path, newline='') as f:
+            header = next(csv.reader(f), [])
+        include = [col for col in columns if col in header]
+    return pa_csv.ConvertOptions(column_types=column_types or {}, include_columns=include)
+
+def _arrow_schema(path, fmt):
+    import pyarrow as pa
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path)
+    return pa.ipc.open_file(pa.memory_map(str(path))).schema
+
+def _read_arrow(path, fmt, columns):
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns)
+
+    import pyarrow.feather as feather
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+def _to_pandas(table):
+    """Convert an Arrow table, loading the key string columns as categoricals."""
+    import pyarrow as pa
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in table.column_names and pa.types.is_string(table.schema.field(col).type):
+            index = table.column_names.index(col)
+            table = table.set_column(index, col, table.column(col).dictionary_encode())
+    return table.to_pandas()
@@ -0,0 +1,109 @@
+# src/features/aggregation.py
+
+import numpy as np
+import pandas as pd
+
+from .lookup import MAX_DENSE_CELLS
+
+# finest key every reference statistic aggregates from
+FLIGHT_KEYS = ['UniqueCarrier', 'Origin', 'Dest', 'dep_hour']
+
+def count_flights(df, keys=None):
+    """
+    Mergeable sufficient statistics of a training frame, in one pass.
+
+    One row per observed key with the number of flights and, when the frame has
+    dep_delayed_15min, the number of delayed flights ('delays') and of flights
+    with a known target ('labelled'). Every reference statistic is a sum, ratio
+    or distinct count over this table, so the feature modules derive all of
+    theirs from it and tables from different batches can be merged with
+    merge_flight_counts.
+
+    Each key column is integer-encoded once (categoricals use their codes), the
+    codes are combined into a single integer per row and all three columns are
+    accumulated with np.bincount: over the dense key space when it is small
+    enough, otherwise over the distinct combined keys found by one sort.
+    Levels are encoded in sorted order, so the observed keys come out sorted
+    without a sort of the table. Missing key values form their own group, last.
+    Keys are stored as plain values (not categoricals) so batches with
+    different categories merge.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Training data with the key columns and optionally dep_delayed_15min
+    keys : list of str, optional
+        Key columns, FLIGHT_KEYS by default
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Counts indexed by the keys
+    """
+    keys = FLIGHT_KEYS if keys is None else keys
+    codes, levels = zip(*[_encode(df[key]) for key in keys])
+    # one extra slot per level for missing values
+    shape = tuple(len(level) + 1 for level in levels)
+    combined = np.ravel_multi_index(codes, shape)
+
+    size = np.prod(shape, dtype=float)
+    if size <= MAX_DENSE_CELLS:
+        flights = np.bincount(combined, minlength=int(size))
+        observed = np.flatnonzero(flights)
+        flights = flights[observed]
+        accumulate = lambda weights: np.bincount(combined, weights, minlength=int(size))[observed]
+    else:
+        observed, inverse = np.unique(combined, return_inverse=True)
+        flights = np.bincount(inverse)
+        accumulate = lambda weights: np.bincount(inverse, weights, minlength=len(observed))
+
+    counts = pd.DataFrame({'flights': flights.astype(np.int64)})
+    if 'dep_delayed_15min' in df.columns:
+        delay = df['dep_delayed_15min']
+        if not pd.api.types.is_numeric_dtype(delay):
+            delay = delay.map({'Y': 1, 'N': 0})
+        delay = np.asarray(delay, dtype=float)
+        labelled = ~np.isnan(delay)
+        counts['delays'] = accumulate(np.where(labelled, delay, 0.0))
+        counts['labelled'] = accumulate(labelled.astype(float)).astype(np.int64)
+
+    level_codes = np.unravel_index(observed, shape)
+    counts.index = pd.MultiIndex.from_arrays(
+        [pd.api.extensions.take(np.asarray(level), np.where(code == len(level), -1, code), allow_fill=True)
+         for level, code in zip(levels, level_codes)],
+        names=keys,
+    )
+    return counts
+
+def count_reference_flights(reference_data):
+    """count_flights over the FLIGHT_KEYS columns reference_data has."""
+    return count_flights(reference_data, [key for key in FLIGHT_KEYS if key in reference_data.columns])
+
+def merge_flight_counts(*counts):
+    """Sum flight count tables from count_flights key by key."""
+    keys = list(counts[0].index.names)
+    merged = pd.concat(counts).groupby(level=keys, dropna=False).sum()
+    for col in ['flights', 'labelled']:
+        if col in merged.columns:
+            merged[col] = merged[col].astype(np.int64)
+    return merged
+
+def plain_keys(counts):
+    """Sorted counts with categorical key levels (e.g. after reading them from Parquet) turned into plain values."""
+    levels = [counts.index.get_level_values(i) for i in range(counts.index.nlevels)]
+    levels = [level.astype(object) if isinstance(level.dtype, pd.CategoricalDtype) else level for level in levels]
+    counts.index = pd.MultiIndex.from_arrays(levels, names=counts.index.names)
+    return counts.sort_index()
+
+def _encode(values):
+    """Integer codes of a key column in sorted level order (missing values get the slot after the last level) and the levels."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # remap the codes to sorted categories
+        order = values.cat.categories.argsort()
+        level = values.cat.categories[order]
+        ranks = np.empty(len(order) + 1, dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+        ranks[-1] = len(order)
+        return ranks[values.cat.codes.to_numpy()], level
+    codes, level = pd.factorize(values, sort=True)
+    return np.where(codes < 0, len(level), codes), pd.Index(level)
@@ -3,116 +3,507 @@
 import pandas as pd
 import numpy as np
 import os
-import joblib
+import json
+import argparse
+import logging
 from pathlib import Path
 
-# Import feature creation functions
-from .temporal_features import create_temporal_features
-from .spatial_features import create_airport_features
-from .carrier_features import create_carrier_features
-# Import new feature modules
-from .cyclical_features import create_cyclical_features
-from .interaction_features import create_interaction_features
-from .network_features import create_network_features
+from joblib import Parallel, delayed
 
-def convert_data_types(df):
-    """Convert data types and clean the input dataframe."""
-    df_out = df.copy()
+# Import the feature stages
+from .pipeline import FEATURE_STAGES, project_stages, run_stages
+from .congestion_features import (CONGESTION_TIME_COLUMNS, congestion_columns, departure_schedule,
+                                  merge_departure_schedules)
+from .cache import StageCache, DEFAULT_CACHE_BYTES
+from .profiling import PipelineProfiler, profiled
+from .feature_store import FeatureStore, feature_store_file, load_feature_store
+from .target_encoding import out_of_fold_delay_rates
+from ..data.table_io import write_table, optimize_dtypes, TableWriter
+from ..data.schema import FLIGHT_SCHEMA, BAD_ROW_ACTIONS, BadRowReport, iter_flight_chunks, normalize_flights, read_flights
+from ..data.matrix_io import FeatureMatrixWriter, is_matrix_path, read_matrix_manifest, write_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+# raw columns the reference statistics are fitted from
+FIT_COLUMNS = ['UniqueCarrier', 'Origin', 'Dest', 'DepTime', 'dep_delayed_15min']
+
+# raw columns the departure schedule of a file is indexed from
+SCHEDULE_COLUMNS = ['Origin', 'Dest', 'UniqueCarrier', *CONGESTION_TIME_COLUMNS]
+
+# schema fields convert_data_types normalizes; the key columns keep the dtype they were loaded with
+CONVERTED_FIELDS = [field for field in FLIGHT_SCHEMA if field.dtype != 'category']
+
+# layout of the training feature matrix, kept with the feature store so test matrices share it
+MATRIX_MANIFEST_FILENAME = 'feature_matrix.json'
+
+def convert_data_types(df, copy=True):
+    """
+    Convert the raw flight columns to the integer dtypes of the flight schema (in place if copy=False).
+
+    The "c-" calendar fields and Y/N labels are parsed to compact integers; see
+    src.data.schema.normalize_flights. Frames from read_flights are already
+    converted and pass through unchanged.
+    """
+    return normalize_flights(df, CONVERTED_FIELDS, copy=copy)
+
+def create_features(df, store=None, fit=False, copy=True, n_jobs=1, cache=None, profiler=None, out_of_fold=None,
+                    features=None, schedule=None):
+    """
+    Apply every feature stage to a converted flight frame.
+    
+    With features, only those columns are computed: the stages are projected
+    onto them and the columns they depend on (see project_stages), stages and
+    statistics nothing asks for are skipped, and intermediate columns are
+    dropped again.
+    
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Flight data after convert_data_types
+    store : FeatureStore, optional
+        Fitted reference statistics; without one df itself is the reference (the
+        statistics are fitted on it in one pass, as with fit=True)
+    fit : bool, default=False
+        Fit store on df (after the temporal features) before the reference-based stages
+    copy : bool, default=True
+        Work on a copy of df; with copy=False the stages append their columns to df
+        in place so peak memory stays close to input plus output
+    n_jobs : int, default=1
+        Run independent feature stages (and the statistic fits) on this many threads
+    cache : StageCache, optional
+        Reuse stage outputs computed before from the same inputs and statistics
+    profiler : PipelineProfiler, optional
+        Record time, memory and columns added per stage (and for the fit)
+    out_of_fold : int, optional
+        When fitting, replace the delay-rate features of df by out-of-fold
+        encodings over this many folds (shrunk like the store's rates), so no
+        training row is encoded with its own target
+    features : list of str, optional
+        Columns wanted in the output besides those of df (e.g. a model's
+        feature list); all features by default
+    schedule : dict, optional
+        departure_schedule of the whole file df is a chunk of, so the
+        congestion windows count the departures of the file rather than only
+        those of the chunk; by default df is the whole schedule
+        
+    Returns:
+    --------
+    pandas.DataFrame
+        DataFrame with all (or the requested) features added
+    """
+    if copy:
+        df = df.copy()
+    
+    if store is None:
+        # one aggregation pass over df feeds every stage instead of each stage scanning it
+        store, fit = FeatureStore(), True
+    
+    stages = FEATURE_STAGES
+    modules = None
+    if features is not None:
+        produced = {col for stage in FEATURE_STAGES for col in stage.outputs}
+        unknown = [col for col in features if col not in produced and col not in df.columns]
+        if unknown:
+            raise ValueError(f"Unknown features {unknown}; they are neither created by a stage nor in the data")
+        input_columns = set(df.columns)
+        # fitting counts flights per departure hour
+        stages = project_stages(set(features) | ({'dep_hour'} if fit else set()))
+        modules = {stage.statistics for stage in stages if stage.statistics is not None}
+    
+    if fit:
+        # the reference statistics need the temporal features of the training data
+        df = run_stages(df, {}, [stage for stage in stages if stage.name == 'temporal'], cache=cache,
+                        profiler=profiler)
+        logger.info("Fitting feature store")
+        with profiled(profiler, 'fit', len(df)):
+            store.fit(df, n_jobs=n_jobs, modules=modules)
+        stages = [stage for stage in stages if stage.name != 'temporal']
+    statistics = store.statistics if schedule is None else {**store.statistics, 'schedule': schedule}
+    df = run_stages(df, statistics, stages, n_jobs=n_jobs, cache=cache, profiler=profiler)
+    
+    if fit and out_of_fold:
+        logger.info("Encoding delay rates out of fold over %d folds", out_of_fold)
+        with profiled(profiler, 'out_of_fold', len(df)) as record:
+            encoded = out_of_fold_delay_rates(df, out_of_fold, smoothing=store.smoothing)
+            for col in encoded.columns:
+                if col in df.columns:
+                    df[col] = encoded[col]
+            record['columns_added'] = list(encoded.columns)
+    
+    if features is not None:
+        # intermediate columns only computed for other features
+        df.drop(columns=[col for col in df.columns if col not in input_columns and col not in features], inplace=True)
+    return df
+
+def fit_feature_store(input_filepath, smoothing=0.0, on_bad_rows='keep'):
+    """
+    Fit a FeatureStore from a raw flight file without loading the full frame.
+    
+    Only the columns the reference statistics depend on are read, so this works
+    on files whose engineered features would not fit in memory.
+    
+    Parameters:
+    -----------
+    input_filepath : str
+        Path to the raw training data file (CSV, Parquet or Feather)
+    smoothing : float, default=0.0
+        Shrink the delay rates toward the global rate with this weight (see FeatureStore)
+    on_bad_rows : str, default='keep'
+        What to do with rows failing schema validation of the columns read (see read_flights)
+        
+    Returns:
+    --------
+    FeatureStore
+        The fitted store
+    """
+    df = read_flights(input_filepath, columns=FIT_COLUMNS, on_bad_rows=on_bad_rows)
+    
+    # same hour bucket as create_temporal_features
+    df['dep_hour'] = df['DepTime'] // 100
+    
+    return FeatureStore(smoothing=smoothing).fit(df)
+
+def read_schedule(input_filepath, chunksize, features=None, on_bad_rows='keep'):
+    """
+    Departure schedule of a whole raw flight file, for transforming it in chunks.
+    
+    The congestion windows of a flight count the other departures of its file;
+    a chunk only holds part of them, so the departures of the whole file are
+    indexed first, chunk by chunk, and the parts merged (see
+    congestion_features.merge_departure_schedules). Only the schedule columns
+    are read, unless bad rows are dropped: then every column is, so that the
+    same rows are dropped as in the chunks.
     
-    # check if the columns have 'c-' prefix and remove it
-    if isinstance(df_out['Month'].iloc[0], str) and 'c-' in df_out['Month'].iloc[0]:
-        df_out['Month'] = df_out['Month'].str.replace('c-', '').astype(int)
-        df_out['DayofMonth'] = df_out['DayofMonth'].str.replace('c-', '').astype(int)
-        df_out['DayOfWeek'] = df_out['DayOfWeek'].str.replace('c-', '').astype(int)
+    Parameters:
+    -----------
+    input_filepath : str
+        Raw flight file (CSV, Parquet or Feather)
+    chunksize : int
+        Rows read at a time
+    features : collection of str, optional
+        Features that will be computed; all by default
+    on_bad_rows : str, default='keep'
+        What to do with rows failing schema validation (see read_flights)
+    
+    Returns:
+    --------
+    dict or None
+        The schedule, or None when no congestion feature is wanted
+    """
+    if features is not None and not set(features) & set(congestion_columns()):
+        return None
+    columns = None if on_bad_rows == 'drop' else SCHEDULE_COLUMNS
+    parts = [departure_schedule(chunk)
+             for chunk in iter_flight_chunks(input_filepath, chunksize, columns=columns, on_bad_rows=on_bad_rows)]
+    return merge_departure_schedules(parts) if parts else None
+
+def _transform_chunk(chunk, store, cache=None, profiler=None, features=None, schedule=None):
+    with profiled(profiler, 'convert', len(chunk)):
+        chunk = convert_data_types(chunk, copy=False)
+    return create_features(chunk, store, copy=False, cache=cache, profiler=profiler, features=features,
+                           schedule=schedule)
+
+def _transform_chunk_profiled(chunk, store, cache, track_memory, features=None, schedule=None):
+    """_transform_chunk in a worker process, returning the chunk and the worker's profile records."""
+    profiler = PipelineProfiler(track_memory=track_memory)
+    chunk = _transform_chunk(chunk, store, cache, profiler, features, schedule)
+    return chunk, profiler.records
+
+def transform_chunks(chunks, store, n_jobs=1, cache=None, profiler=None, features=None, schedule=None):
+    """
+    Create features for a stream of raw flight data chunks.
     
-    # convert target variable if it's Y/N
-    if 'dep_delayed_15min' in df_out.columns and df_out['dep_delayed_15min'].dtype == object:
-        df_out['dep_delayed_15min'] = df_out['dep_delayed_15min'].map({'Y': 1, 'N': 0})
+    All batch-level statistics are fit-time constants in the store, and the
+    congestion windows are counted in the schedule of the whole file, so the
+    concatenated output is identical to transforming the whole frame at once.
     
-    return df_out
+    Parameters:
+    -----------
+    chunks : iterable of pandas.DataFrame
+        Raw flight data, e.g. from iter_flight_chunks(path, chunksize)
+    store : FeatureStore
+        Fitted reference statistics
+    n_jobs : int, default=1
+        Transform this many chunks at a time in a joblib process pool; chunks
+        are still yielded in input order and only about 2 * n_jobs are in flight
+    cache : StageCache, optional
+        Reuse stage outputs computed before from the same inputs and statistics
+    profiler : PipelineProfiler, optional
+        Record time, memory and columns added per stage and chunk (records from
+        worker processes are collected as their chunks come back)
+    features : list of str, optional
+        Only compute these features (see create_features)
+    schedule : dict, optional
+        Departures of the whole file, from read_schedule (without it the
+        congestion windows only count the departures of each chunk)
+        
+    Yields:
+    -------
+    pandas.DataFrame
+        Each chunk with all features added
+    """
+    if store is None or not store.is_fitted:
+        raise ValueError("Chunked transform needs a fitted feature store")
+    
+    if n_jobs == 1:
+        for chunk in chunks:
+            yield _transform_chunk(chunk, store, cache, profiler, features, schedule)
+        return
+    
+    parallel = Parallel(n_jobs=n_jobs, return_as='generator', pre_dispatch='2*n_jobs')
+    if profiler is None:
+        # the schedule's arrays are memory-mapped into the workers by joblib rather than pickled per chunk
+        yield from parallel(delayed(_transform_chunk)(chunk, store, cache, None, features, schedule)
+                            for chunk in chunks)
+        return
+    
+    tasks = (delayed(_transform_chunk_profiled)(chunk, store, cache, profiler.track_memory, features, schedule)
+             for chunk in chunks)
+    for chunk, records in parallel(tasks):
+        profiler.add(records)
+        yield chunk
 
-def build_features(input_filepath, output_filepath, is_train=True, feature_store_path=None):
+def build_features(input_filepath, output_filepath, is_train=True, feature_store_path=None, chunksize=None,
+                   store_format='joblib', n_jobs=1, cache_dir=None, cache_bytes=DEFAULT_CACHE_BYTES, profiler=None,
+                   out_of_fold=None, smoothing=0.0, features=None, on_bad_rows='keep', bad_rows_path=None):
     """
     Main feature engineering pipeline.
     
     Parameters:
     -----------
     input_filepath : str
-        Path to the raw data file
+        Path to the raw data file (.csv, .parquet or .feather)
     output_filepath : str
-        Path to save the processed data
+        Path to save the processed data; the format follows the extension, and
+        .npy writes a memory-mappable float32 feature matrix (see
+        src.data.matrix_io) whose column layout is kept in the feature store
+        directory for the test matrix
     is_train : bool, default=True
         Whether this is training data (used for fitting transformations)
     feature_store_path : str, optional
-        Path to save/load feature transformations
+        Directory to save/load the fitted feature store
+    chunksize : int, optional
+        Stream the input in chunks of this many rows and append each processed
+        chunk to the output (nothing is returned in this mode)
+    store_format : str, default='joblib'
+        Format used to save the fitted feature store ('joblib', 'parquet' or 'feather')
+    n_jobs : int, default=1
+        Parallelism: independent feature stages run on this many threads, or in
+        chunked mode whole chunks are transformed in this many worker processes
+    cache_dir : str, optional
+        Directory of a StageCache; stage outputs whose inputs and fitted statistics
+        are unchanged since an earlier run are loaded from there instead of recomputed
+    cache_bytes : int, default=DEFAULT_CACHE_BYTES
+        Size bound of the cache directory (least recently used entries are evicted)
+    profiler : PipelineProfiler, optional
+        Record time, memory, rows/sec and columns added of every step
+    out_of_fold : int, optional
+        Encode the delay rates of the training rows out of fold over this many
+        folds (needs the training frame in memory, so not with chunksize)
+    smoothing : float, default=0.0
+        Shrink the fitted delay rates toward the global rate with this weight, in flights
+    features : list of str, optional
+        Only compute these features (see create_features); a store fitted in
+        memory then only holds the statistics they need
+    on_bad_rows : str, default='keep'
+        What to do with input rows failing schema validation: 'keep', 'drop' or
+        'raise' (see src.data.schema.read_flights); they are logged in any case
+    bad_rows_path : str, optional
+        Write the bad values found in the input (row, column, value) to this table
     """
     # create output directory if it doesn't exist
     os.makedirs(os.path.dirname(output_filepath), exist_ok=True)
     
-    # load the data
-    print(f"Loading data from {input_filepath}")
-    df = pd.read_csv(input_filepath)
-    
-    # convert data types
-    print("Converting data types")
-    df = convert_data_types(df)
-    
     # create feature store directory if needed
     if feature_store_path is not None:
         os.makedirs(feature_store_path, exist_ok=True)
     
-    # load training data for reference if this is test data
-    train_data = None
-    if not is_train and feature_store_path is not None:
-        train_path = os.path.join(feature_store_path, 'train_reference.csv')
-        if os.path.exists(train_path):
-            print(f"Loading training data reference from {train_path}")
-            train_data = pd.read_csv(train_path)
+    cache = StageCache(cache_dir, cache_bytes) if cache_dir is not None else None
     
-    # apply feature transformations - original features
-    print("Creating temporal features")
-    df = create_temporal_features(df)
+    if chunksize is not None:
+        if out_of_fold and is_train:
+            raise ValueError("Out-of-fold encoding needs the whole training frame; drop chunksize to use it")
+        return _build_features_chunked(input_filepath, output_filepath, is_train, feature_store_path, chunksize,
+                                       store_format, n_jobs, cache, profiler, smoothing, features, on_bad_rows,
+                                       bad_rows_path)
     
-    print("Creating spatial features")
-    df = create_airport_features(df, train_data)
+    # load the data, parsed to the schema dtypes and validated as it is read
+    logger.info("Loading data from %s", input_filepath)
+    report = BadRowReport()
+    with profiled(profiler, 'load') as record:
+        df = read_flights(input_filepath, on_bad_rows=on_bad_rows, report=report)
+        record['rows'] = len(df)
+    _save_bad_rows(report, bad_rows_path)
     
-    print("Creating carrier features")
-    df = create_carrier_features(df, train_data)
+    # only downcasts here, as read_flights already parsed the columns (the chunked path converts per chunk too)
+    with profiled(profiler, 'convert', len(df)):
+        df = convert_data_types(df, copy=False)
     
-    # create interaction features from original pipeline
-    print("Creating basic interaction features")
-    df['hub_to_hub'] = df['origin_is_hub'] * df['dest_is_hub']
-    df['peak_weekend'] = df['is_weekend'] * df['is_peak_travel_season']
-    
-    # NEW ENHANCED FEATURES
-    print("Creating cyclical features")
-    df = create_cyclical_features(df)
-    
-    print("Creating advanced interaction features")
-    df = create_interaction_features(df)
+    # load the fitted reference statistics if this is test data
+    store = FeatureStore(smoothing=smoothing)
+    if not is_train and feature_store_path is not None:
+        logger.info("Loading feature store from %s", feature_store_path)
+        store = load_feature_store(feature_store_path) or store
     
-    print("Creating network effect features")
-    df = create_network_features(df, train_data)
+    # the frame was loaded here, so every stage can add its columns in place
+    df = create_features(df, store, fit=is_train, copy=False, n_jobs=n_jobs, cache=cache, profiler=profiler,
+                         out_of_fold=out_of_fold, features=features)
     
-    # save a reference copy of the training data for future transformations
+    # save the fitted statistics for future transformations
     if is_train and feature_store_path is not None:
-        train_ref_path = os.path.join(feature_store_path, 'train_reference.csv')
-        print(f"Saving training data reference to {train_ref_path}")
-        df.to_csv(train_ref_path, index=False)
+        store_path = feature_store_file(feature_store_path, store_format)
+        logger.info("Saving feature store to %s", store_path)
+        store.save(store_path)
     
-    # save the processed data
-    print(f"Saving processed data to {output_filepath}")
-    df.to_csv(output_filepath, index=False)
+    if is_matrix_path(output_filepath):
+        logger.info("Saving feature matrix to %s", output_filepath)
+        with profiled(profiler, 'write', len(df)):
+            manifest = write_feature_matrix(df, output_filepath, _matrix_reference(feature_store_path, is_train))
+        _save_matrix_reference(manifest, feature_store_path, is_train)
+        logger.info("Feature engineering completed!")
+        return df
     
-    print("Feature engineering completed!")
+    # shrink to categorical and downcast integer dtypes, then save the processed data
+    with profiled(profiler, 'optimize_dtypes', len(df)):
+        df = optimize_dtypes(df, copy=False)
+    logger.info("Saving processed data to %s", output_filepath)
+    with profiled(profiler, 'write', len(df)):
+        write_table(df, output_filepath)
+    
+    logger.info("Feature engineering completed!")
     return df
 
+def _build_features_chunked(input_filepath, output_filepath, is_train, feature_store_path, chunksize, store_format,
+                            n_jobs, cache, profiler, smoothing, features, on_bad_rows, bad_rows_path):
+    """Chunked variant of build_features: fit from the narrow fit columns, then stream the transform."""
+    if is_train:
+        logger.info("Fitting feature store from %s", input_filepath)
+        with profiled(profiler, 'fit'):
+            store = fit_feature_store(input_filepath, smoothing, on_bad_rows)
+        if feature_store_path is not None:
+            store_path = feature_store_file(feature_store_path, store_format)
+            logger.info("Saving feature store to %s", store_path)
+            store.save(store_path)
+    else:
+        logger.info("Loading feature store from %s", feature_store_path)
+        store = load_feature_store(feature_store_path) if feature_store_path is not None else None
+    
+    logger.info("Indexing the departures of %s", input_filepath)
+    with profiled(profiler, 'schedule'):
+        schedule = read_schedule(input_filepath, chunksize, features, on_bad_rows)
+    
+    logger.info("Streaming %s to %s in chunks of %d rows", input_filepath, output_filepath, chunksize)
+    report = BadRowReport()
+    chunks = iter_flight_chunks(input_filepath, chunksize, on_bad_rows=on_bad_rows, report=report)
+    if profiler is not None:
+        chunks = _profiled_chunks(chunks, profiler)
+    if is_matrix_path(output_filepath):
+        with FeatureMatrixWriter(output_filepath, _matrix_reference(feature_store_path, is_train)) as writer:
+            for chunk in transform_chunks(chunks, store, n_jobs=n_jobs, cache=cache, profiler=profiler, features=features,
+                                          schedule=schedule):
+                with profiled(profiler, 'write', len(chunk)):
+                    writer.write(chunk)
+        _save_matrix_reference(writer.manifest(), feature_store_path, is_train)
+    else:
+        with TableWriter(output_filepath) as writer:
+            for chunk in transform_chunks(chunks, store, n_jobs=n_jobs, cache=cache, profiler=profiler, features=features,
+                                          schedule=schedule):
+                # every chunk must share one schema, so only the string columns are compacted
+                with profiled(profiler, 'write', len(chunk)):
+                    writer.write(optimize_dtypes(chunk, max_category_ratio=1.0, downcast_integers=False, copy=False))
+    _save_bad_rows(report, bad_rows_path)
+    
+    logger.info("Feature engineering completed! (%d rows)", writer.n_rows)
+
+def _matrix_reference(feature_store_path, is_train):
+    """Layout of the training feature matrix a test matrix must follow, if one was saved."""
+    if is_train or feature_store_path is None:
+        return None
+    path = os.path.join(feature_store_path, MATRIX_MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        logger.warning("No training matrix layout in %s; the test matrix gets its own column order and codes",
+                       feature_store_path)
+        return None
+    return read_matrix_manifest(path)
+
+def _save_matrix_reference(manifest, feature_store_path, is_train):
+    """Keep the training matrix layout with the feature store."""
+    if is_train and feature_store_path is not None:
+        with open(os.path.join(feature_store_path, MATRIX_MANIFEST_FILENAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+def _save_bad_rows(report, bad_rows_path):
+    """Write the bad values found in the input, if any and if asked to."""
+    if bad_rows_path is not None and report.n_values:
+        logger.info("Writing %s to %s", report.summary(), bad_rows_path)
+        report.write(bad_rows_path)
+
+def _profiled_chunks(chunks, profiler):
+    """Pass chunks through, profiling the read of each one as a 'load' step."""
+    chunks = iter(chunks)
+    while True:
+        with profiler.profile('load') as record:
+            chunk = next(chunks, None)
+            record['rows'] = len(chunk) if chunk is not None else 0
+        if chunk is None:
+            return
+        yield chunk
+
+def find_raw_file(raw_data_dir, stem):
+    """Raw input for stem, preferring columnar files over CSV when several exist."""
+    for ext in ['.parquet', '.feather', '.csv']:
+        path = os.path.join(raw_data_dir, stem + ext)
+        if os.path.exists(path):
+            return path
+    return os.path.join(raw_data_dir, stem + '.csv')
+
 def main():
     """
     Entry point for feature engineering script.
     Example usage: 
         python -m src.features.build_features
+        python -m src.features.build_features --chunksize 500000
+        python -m src.features.build_features --format parquet
+        python -m src.features.build_features --format npy
+        python -m src.features.build_features --chunksize 500000 --n-jobs 4
+        python -m src.features.build_features --no-cache
+        python -m src.features.build_features --profile reports/profiles
+        python -m src.features.build_features --out-of-fold 5 --smoothing 20
+        python -m src.features.build_features --features origin_delay_rate,dep_hour_sin,dep_hour_cos
+        python -m src.features.build_features --on-bad-rows drop --bad-rows reports/bad_rows
     """
+    parser = argparse.ArgumentParser(description='Build flight delay features')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='stream the raw files in chunks of this many rows')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'feather', 'npy'], default='csv',
+                        help='format of the processed outputs (parquet/feather also store the feature store as tables, '
+                             'npy writes memory-mappable float32 feature matrices)')
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help='threads for independent feature stages, or worker processes for chunks with --chunksize')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_BYTES // 1024 ** 2,
+                        help='size bound of the stage output cache in MB')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='recompute every feature stage instead of reusing cached outputs')
+    parser.add_argument('--profile', metavar='DIR', default=None,
+                        help='write per-stage time/memory reports (train_profile.json, test_profile.json) to DIR')
+    parser.add_argument('--no-profile-memory', action='store_true',
+                        help='skip the tracemalloc peak-memory measurement when profiling')
+    parser.add_argument('--out-of-fold', type=int, default=None, metavar='K',
+                        help='encode the training delay rates out of fold over K folds')
+    parser.add_argument('--smoothing', type=float, default=0.0,
+                        help='shrink the delay rates toward the global rate with this weight, in flights')
+    parser.add_argument('--features', default=None, metavar='COL[,COL...]',
+                        help='only compute these features (comma-separated), and the columns they depend on')
+    parser.add_argument('--on-bad-rows', choices=BAD_ROW_ACTIONS, default='keep',
+                        help='keep, drop or fail on input rows outside the raw schema (e.g. Month 13, DepTime 2500)')
+    parser.add_argument('--bad-rows', metavar='DIR', default=None,
+                        help='write the bad input values of each file to DIR/flight_delays_<name>_bad_rows.csv')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    features = args.features.split(',') if args.features else None
+    store_format = 'joblib' if args.format in ('csv', 'npy') else args.format
+    
     # project base path
     project_dir = Path(__file__).resolve().parents[2]
     
@@ -120,20 +511,37 @@ def main():
     raw_data_dir = os.path.join(project_dir, 'data', 'raw')
     processed_data_dir = os.path.join(project_dir, 'data', 'processed')
     feature_store_dir = os.path.join(project_dir, 'models', 'feature_store')
+    cache_dir = None if args.no_cache else os.path.join(project_dir, 'data', 'interim', 'feature_cache')
+    cache_bytes = args.cache_size * 1024 ** 2
     
     # make sure directories exist
     os.makedirs(processed_data_dir, exist_ok=True)
     os.makedirs(feature_store_dir, exist_ok=True)
     
-    # process training data
-    train_input = os.path.join(raw_data_dir, 'flight_delays_train.csv')
-    train_output = os.path.join(processed_data_dir, 'flight_delays_train_features.csv')
-    build_features(train_input, train_output, is_train=True, feature_store_path=feature_store_dir)
-    
-    # process test data
-    test_input = os.path.join(raw_data_dir, 'flight_delays_test.csv')
-    test_output = os.path.join(processed_data_dir, 'flight_delays_test_features.csv')
-    build_features(test_input, test_output, is_train=False, feature_store_path=feature_store_dir)
+    for name, is_train in [('train', True), ('test', False)]:
+        profiler = None
+        if args.profile is not None:
+            profiler = PipelineProfiler(callbacks=[_log_profile_record], track_memory=not args.no_profile_memory)
+        
+        input_path = find_raw_file(raw_data_dir, f'flight_delays_{name}')
+        output_path = os.path.join(processed_data_dir, f'flight_delays_{name}_features.{args.format}')
+        build_features(input_path, output_path, is_train=is_train, feature_store_path=feature_store_dir,
+                       chunksize=args.chunksize, store_format=store_format, n_jobs=args.n_jobs,
+                       cache_dir=cache_dir, cache_bytes=cache_bytes, profiler=profiler,
+                       out_of_fold=args.out_of_fold, smoothing=args.smoothing, features=features,
+                       on_bad_rows=args.on_bad_rows,
+                       bad_rows_path=os.path.join(args.bad_rows, f'flight_delays_{name}_bad_rows.csv') if args.bad_rows else None)
+        
+        if profiler is not None:
+            report_path = os.path.join(args.profile, f'{name}_profile.json')
+            logger.info("Writing profile report to %s", report_path)
+            profiler.save(report_path)
+
+def _log_profile_record(record):
+    memory = record.get('peak_memory_delta_bytes')
+    logger.info("%-18s %8.3fs wall %8.3fs cpu%s%s", record['stage'], record['wall_s'], record['cpu_s'],
+                f" {memory / 1e6:9.1f} MB peak" if memory is not None else '',
+                " (cached)" if record['cached'] else '')
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,127 @@
+# src/features/cache.py
+
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+# default size bound of a stage cache directory
+DEFAULT_CACHE_BYTES = 2 * 1024 ** 3
+
+CACHE_SUFFIX = '.pkl'
+
+def fingerprint(value, digest=None):
+    """
+    Content hash of a frame column, lookup table, statistics dict or scalar.
+
+    Series and Index values are hashed with pandas.util.hash_pandas_object, so
+    categorical and plain string columns with the same values hash the same.
+    """
+    digest = digest or hashlib.blake2b()
+    if value is None:
+        digest.update(b'none')
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key in sorted(value):
+            digest.update(str(key).encode())
+            fingerprint(value[key], digest)
+    elif isinstance(value, pd.Series):
+        digest.update(f'series {value.name} {list(value.index.names)}'.encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Index):
+        digest.update(f'index {value.name}'.encode())
+        digest.update(pd.util.hash_pandas_object(value).values.tobytes())
+    else:
+        digest.update(repr(np.asarray(value).tolist()).encode())
+    return digest
+
+class StageCache:
+    """
+    Content-addressed on-disk cache of feature stage outputs.
+
+    An entry holds the columns one stage added to a frame and is keyed on the
+    stage name and version, the values of the stage's input columns and the
+    fitted statistics it used, so a hit is guaranteed to return what the stage
+    would compute. Entries are evicted least recently used first once the
+    directory grows beyond max_bytes.
+
+    Parameters:
+    -----------
+    path : str
+        Cache directory (created if needed)
+    max_bytes : int, default=DEFAULT_CACHE_BYTES
+        Size bound of the directory
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_CACHE_BYTES):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, stage, df, statistics, column_hashes=None):
+        """
+        Cache key of running stage on df with the given statistics.
+
+        column_hashes memoizes the per-column hashes between the stages of one
+        run (keyed by column name, so entries must be dropped when a column changes).
+        """
+        column_hashes = column_hashes if column_hashes is not None else {}
+        # the outputs are part of the key, since a projected stage computes only some of them
+        digest = hashlib.blake2b(f'{stage.name} v{stage.version} {",".join(stage.outputs)}'.encode())
+        for col in stage.inputs:
+            if col in df.columns:
+                if col not in column_hashes:
+                    # row labels are not part of the key, so shifted chunks of the same rows hit too
+                    values = pd.util.hash_pandas_object(df[col], index=False).values
+                    column_hashes[col] = hashlib.blake2b(values.tobytes()).digest()
+                digest.update(col.encode())
+                digest.update(column_hashes[col])
+        fingerprint(statistics, digest)
+        return digest.hexdigest()
+
+    def load(self, key, index):
+        """Cached columns for key re-labelled with index, or None on a miss."""
+        path = self._entry(key)
+        try:
+            # plain pickle: joblib unpickles object (string) columns in pure Python
+            with open(path, 'rb') as f:
+                columns = pickle.load(f)
+        except (FileNotFoundError, EOFError):
+            self.misses += 1
+            return None
+        # mark as recently used
+        os.utime(path)
+        self.hits += 1
+        for values in columns.values():
+            values.index = index
+        return columns
+
+    def save(self, key, columns):
+        """Store the columns a stage added, then evict old entries beyond max_bytes."""
+        path = self._entry(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(columns, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the directory fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(CACHE_SUFFIX):
+                stat = os.stat(os.path.join(self.path, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.path, name))
+            total -= size
+
+    def _entry(self, key):
+        return os.path.join(self.path, key + CACHE_SUFFIX)
@@ -0,0 +1,232 @@
+# src/features/calendar_table.py
+
+import datetime
+import functools
+
+import numpy as np
+import pandas as pd
+
+# season from month
+SEASONS = {
+    1: 'Winter', 2: 'Winter', 3: 'Spring',
+    4: 'Spring', 5: 'Spring', 6: 'Summer',
+    7: 'Summer', 8: 'Summer', 9: 'Fall',
+    10: 'Fall', 11: 'Fall', 12: 'Winter'
+}
+SEASON_CODES = {'Winter': 0, 'Spring': 1, 'Summer': 2, 'Fall': 3}
+
+# US Holiday indicators (simplified)
+US_HOLIDAYS = [
+    '01-01',  # New Year's Day
+    '01-15',  # Martin Luther King Jr. Day (third Monday in January, approximated)
+    '02-14',  # Valentine's Day
+    '02-15',  # Presidents' Day (third Monday in February, approximated)
+    '03-17',  # St. Patrick's Day
+
+    # Easter varies by year but falls between March 22 and April 25
+    # I'll include common dates in this range
+    '04-05',  # Easter approximation (early April)
+    '04-15',  # Easter approximation (mid April)
+
+    '05-05',  # Cinco de Mayo
+    '05-25',  # Memorial Day (last Monday in May, approximated)
+    '06-19',  # Juneteenth
+    '07-04',  # Independence Day
+    '09-01',  # Labor Day (first Monday in September, approximated)
+    '10-31',  # Halloween
+    '11-11',  # Veterans Day
+    '11-25',  # Thanksgiving (fourth Thursday in November, approximated)
+    '11-26',  # Black Friday
+    '12-24',  # Christmas Eve
+    '12-25',  # Christmas Day
+    '12-31',  # New Year's Eve
+]
+
+# the holidays of US_HOLIDAYS that always fall on the same date
+FIXED_US_HOLIDAYS = ['01-01', '02-14', '03-17', '05-05', '06-19', '07-04', '10-31', '11-11', '12-24', '12-25', '12-31']
+
+# a day is addressed by the slot month * DAY_SLOTS + day; every month 0-12 and day
+# 0-31 has a slot (impossible dates included), so any such pair resolves by a gather
+DAY_SLOTS = 32
+MONTH_SLOTS = 13
+
+# leap year laying out the year-independent calendar, so that 02-29 is a real day
+REFERENCE_YEAR = 2000
+
+def nth_weekday(year, month, weekday, n):
+    """Date of the n-th weekday (0 is Monday) of a month, counting from the end for negative n."""
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7 + 7 * (-n - 1))
+
+def easter(year):
+    """Date of (Western) Easter Sunday, by the anonymous Gregorian algorithm."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+def us_holidays(year):
+    """The holidays of US_HOLIDAYS on their actual dates in year, as sorted 'MM-DD' strings."""
+    thanksgiving = nth_weekday(year, 11, 3, 4)
+    movable = [
+        nth_weekday(year, 1, 0, 3),   # Martin Luther King Jr. Day
+        nth_weekday(year, 2, 0, 3),   # Presidents' Day
+        easter(year),
+        nth_weekday(year, 5, 0, -1),  # Memorial Day
+        nth_weekday(year, 9, 0, 1),   # Labor Day
+        thanksgiving,
+        thanksgiving + datetime.timedelta(days=1),  # Black Friday
+    ]
+    return sorted(set(FIXED_US_HOLIDAYS) | {date.strftime('%m-%d') for date in movable})
+
+def day_attributes(month, day, holidays=US_HOLIDAYS):
+    """
+    Calendar columns of month and day numbers, computed value by value.
+
+    This is the definition the day table of a Calendar is built from; it is
+    only applied to frames directly when their values fall outside the table.
+
+    Parameters:
+    -----------
+    month, day : array-like
+        Month and day-of-month numbers
+    holidays : list of str, default=US_HOLIDAYS
+        Holiday dates as 'MM-DD'
+
+    Returns:
+    --------
+    pandas.DataFrame
+        season, month_day, is_holiday and is_peak_travel_season, with a default index
+    """
+    month = pd.Series(np.asarray(month))
+    day = pd.Series(np.asarray(day))
+    month_day = month.astype(str).str.zfill(2) + '-' + day.astype(str).str.zfill(2)
+    summer_peak = (month >= 6) & (month <= 8)
+    winter_holiday = ((month == 12) & (day >= 15)) | ((month == 1) & (day <= 5))
+    return pd.DataFrame({
+        'season': month.map(SEASONS),
+        'month_day': month_day,
+        'is_holiday': month_day.isin(holidays).astype(int),
+        'is_peak_travel_season': (summer_peak | winter_holiday).astype(int),
+    })
+
+def _days_to_holiday(month, day, holidays, year):
+    """Days from each date to the nearest holiday, wrapping around the year end (NaN for impossible dates)."""
+    def day_of_year(month, day):
+        dates = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': day}), errors='coerce')
+        return dates.dt.dayofyear.to_numpy(dtype=float)
+
+    days = day_of_year(month, day)
+    holiday_days = day_of_year(*np.array([[int(part) for part in date.split('-')] for date in holidays]).T)
+    holiday_days = holiday_days[~np.isnan(holiday_days)]
+    if len(holiday_days) == 0:
+        return np.full(len(days), np.nan)
+    year_length = 366 if pd.Timestamp(year=year, month=1, day=1).is_leap_year else 365
+    distance = np.abs(days[:, None] - holiday_days[None, :])
+    return np.minimum(distance, year_length - distance).min(axis=1)
+
+class Calendar:
+    """
+    Day table resolving the calendar features of a frame by one integer gather.
+
+    The table holds one row per (month, day) slot with the day's season (and
+    its code), month-day label, holiday and peak-season flags and the distance
+    to the nearest holiday, so per-row work is a lookup of slot
+    month * DAY_SLOTS + day instead of building and matching strings. Rows
+    with values outside the table fall back to day_attributes.
+
+    Without a year the calendar is year-independent and uses the approximate
+    US_HOLIDAYS; given a year it uses that year's actual holiday dates (see
+    us_holidays) and day numbering. Any other holiday list can be passed in.
+
+    Parameters:
+    -----------
+    year : int, optional
+        Calendar year of the data
+    holidays : list of str, optional
+        Holiday dates as 'MM-DD' (defaults as described above)
+
+    Attributes:
+    -----------
+    table : pandas.DataFrame
+        Day attributes indexed by slot
+    """
+
+    def __init__(self, year=None, holidays=None):
+        if holidays is None:
+            holidays = us_holidays(year) if year is not None else US_HOLIDAYS
+        self.year = year
+        self.holidays = list(holidays)
+
+        month, day = np.divmod(np.arange(MONTH_SLOTS * DAY_SLOTS), DAY_SLOTS)
+        table = day_attributes(month, day, self.holidays)
+        table.insert(0, 'month', month)
+        table.insert(1, 'day', day)
+        table['season_code'] = table['season'].map(SEASON_CODES).fillna(-1).astype(np.int8)
+        table['days_to_holiday'] = _days_to_holiday(month, day, self.holidays,
+                                                    year if year is not None else REFERENCE_YEAR)
+        self.table = table
+
+    def slots(self, month, day):
+        """Table slot of every (month, day) pair (-1 where there is none), or None for non-integer values."""
+        month = np.asarray(month)
+        day = np.asarray(day)
+        if not (np.issubdtype(month.dtype, np.integer) and np.issubdtype(day.dtype, np.integer)):
+            return None
+        slots = month.astype(np.intp) * DAY_SLOTS + day
+        outside = (month < 0) | (month >= MONTH_SLOTS) | (day < 0) | (day >= DAY_SLOTS)
+        if outside.any():
+            slots[outside] = -1
+        return slots
+
+    def lookup(self, month, day, columns):
+        """
+        Day attributes of every (month, day) pair.
+
+        Parameters:
+        -----------
+        month, day : array-like
+            Month and day-of-month numbers
+        columns : list of str
+            Table columns to return
+
+        Returns:
+        --------
+        dict
+            NumPy array per column, aligned with month and day
+        """
+        month = np.asarray(month)
+        day = np.asarray(day)
+        slots = self.slots(month, day)
+        if slots is None:
+            return self._compute(month, day, columns)
+
+        days = {col: self.table[col].to_numpy()[slots] for col in columns}
+        outside = np.flatnonzero(slots < 0)
+        if len(outside):
+            computed = self._compute(month[outside], day[outside], columns)
+            for col in columns:
+                days[col] = days[col].astype(np.result_type(days[col], computed[col]))
+                days[col][outside] = computed[col]
+        return days
+
+    def _compute(self, month, day, columns):
+        """Day attributes of values outside the table, from day_attributes."""
+        attributes = day_attributes(month, day, self.holidays)
+        attributes['season_code'] = attributes['season'].map(SEASON_CODES).fillna(-1).astype(np.int8)
+        # values outside the table are not dates
+        attributes['days_to_holiday'] = np.nan
+        return {col: attributes[col].to_numpy() for col in columns}
+
+@functools.lru_cache(maxsize=None)
+def default_calendar():
+    """The year-independent Calendar used by the feature pipeline."""
+    return Calendar()
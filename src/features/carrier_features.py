@@ -3,7 +3,66 @@
 import pandas as pd
 import numpy as np
 
-def create_carrier_features(df, train_data=None):
+from .aggregation import count_reference_flights
+from .lookup import lookup
+from .projection import requested
+from .ranking import pct_rank
+
+def fit_carrier_statistics(reference_data):
+    """
+    Compute the carrier lookup tables used by create_carrier_features.
+    
+    The reference data is scanned once into flight counts and the tables are
+    derived from those by carrier_statistics_from_counts.
+    
+    Parameters:
+    -----------
+    reference_data : pandas.DataFrame
+        Training data to extract carrier statistics from
+        
+    Returns:
+    --------
+    dict
+        Lookup tables keyed by name, indexed by carrier or carrier combinations
+    """
+    return carrier_statistics_from_counts(count_reference_flights(reference_data))
+
+def carrier_statistics_from_counts(counts):
+    """
+    Carrier lookup tables from mergeable flight counts.
+    
+    Parameters:
+    -----------
+    counts : pandas.DataFrame
+        Flight counts from aggregation.count_flights, indexed by
+        (UniqueCarrier, Origin, Dest) and optionally dep_hour
+        
+    Returns:
+    --------
+    dict
+        Lookup tables keyed by name, indexed by carrier or carrier combinations
+    """
+    statistics = {}
+    
+    # carrier size and frequency
+    carrier_counts = counts['flights'].groupby(level='UniqueCarrier').sum().rename(None)
+    statistics['carrier_rank'] = pct_rank(carrier_counts)
+    
+    # carrier delay rates, overall and by time of day
+    if 'labelled' in counts.columns:
+        rate_levels = {'carrier_delay_rates': 'UniqueCarrier'}
+        if 'dep_hour' in counts.index.names:
+            rate_levels['carrier_hour_delay'] = ['UniqueCarrier', 'dep_hour']
+        for name, levels in rate_levels.items():
+            sums = counts[['delays', 'labelled']].groupby(level=levels).sum()
+            statistics[name] = (sums['delays'] / sums['labelled']).rename('dep_delayed_15min')
+    
+    # carrier-route counts
+    statistics['carrier_route_counts'] = counts['flights'].groupby(level=['UniqueCarrier', 'Origin', 'Dest']).sum().rename(None)
+    
+    return statistics
+
+def create_carrier_features(df, train_data=None, statistics=None, copy=True, features=None):
     """
     Create carrier-related features.
     
@@ -13,57 +72,41 @@ def create_carrier_features(df, train_data=None):
         Input DataFrame with the raw flight data
     train_data : pandas.DataFrame, optional
         Training data to extract carrier statistics (for test data transformation)
+    statistics : dict, optional
+        Pre-computed tables from fit_carrier_statistics (takes precedence over train_data)
+    copy : bool, default=True
+        Work on a copy of df; set to False to add the columns to df in place
+    features : collection of str, optional
+        Only compute these of the function's columns (all by default)
         
     Returns:
     --------
     pandas.DataFrame
         DataFrame with carrier features added
     """
-    # use the provided dataframe or itself as reference data
-    reference_data = train_data if train_data is not None else df
-    df_out = df.copy()
-    
-    # carrier size and frequency
-    carrier_counts = reference_data['UniqueCarrier'].value_counts()
-    carrier_rank = carrier_counts.rank(pct=True)
+    # use the fitted statistics, the provided dataframe or itself as reference data
+    if statistics is None:
+        statistics = fit_carrier_statistics(train_data if train_data is not None else df)
+    df_out = df.copy() if copy else df
     
-    df_out['carrier_size_rank'] = df_out['UniqueCarrier'].map(carrier_rank)
+    if requested(features, 'carrier_size_rank'):
+        df_out['carrier_size_rank'] = lookup(df_out, ['UniqueCarrier'], statistics['carrier_rank'])
     
     # carrier delay rates
-    if 'dep_delayed_15min' in reference_data.columns:
-        if reference_data['dep_delayed_15min'].dtype == object:
-            # convert Y/N to 1/0 if not already done
-            reference_delay = reference_data.copy()
-            reference_delay['dep_delayed_15min'] = reference_delay['dep_delayed_15min'].map({'Y': 1, 'N': 0})
-        else:
-            reference_delay = reference_data
-            
-        carrier_delay_rates = reference_delay.groupby('UniqueCarrier')['dep_delayed_15min'].mean()
-        df_out['carrier_delay_rate'] = df_out['UniqueCarrier'].map(carrier_delay_rates)
+    if 'carrier_delay_rates' in statistics and requested(features, 'carrier_delay_rate'):
+        df_out['carrier_delay_rate'] = lookup(df_out, ['UniqueCarrier'], statistics['carrier_delay_rates'])
     
     # create carrier-specific time features
-    if 'dep_hour' in df_out.columns:
-        # calculate carrier performance by time of day
-        carrier_hour_delay = reference_delay.groupby(['UniqueCarrier', 'dep_hour'])['dep_delayed_15min'].mean().reset_index()
-        carrier_hour_map = dict(zip(zip(carrier_hour_delay['UniqueCarrier'], carrier_hour_delay['dep_hour']), 
-                                   carrier_hour_delay['dep_delayed_15min']))
-        
-        df_out['carrier_hour_performance'] = df_out.apply(
-            lambda x: carrier_hour_map.get((x['UniqueCarrier'], x['dep_hour']), np.nan), axis=1
+    if ('dep_hour' in df_out.columns and 'carrier_hour_delay' in statistics
+            and requested(features, 'carrier_hour_performance')):
+        df_out['carrier_hour_performance'] = lookup(
+            df_out, ['UniqueCarrier', 'dep_hour'], statistics['carrier_hour_delay'], np.nan
         )
     
-    # create carrier-route performance features
-    carrier_route_grouped = reference_data.groupby(['UniqueCarrier', 'Origin', 'Dest']).size().reset_index(name='route_carrier_count')
-    
-    # merge this information back (this is an alternative to map for multi-key lookups)
-    df_out = pd.merge(
-        df_out, 
-        carrier_route_grouped,
-        on=['UniqueCarrier', 'Origin', 'Dest'],
-        how='left'
-    )
-    
-    # fill missing values for routes not in training data
-    df_out['route_carrier_count'] = df_out['route_carrier_count'].fillna(0)
+    # create carrier-route performance features (0 for routes not in training data)
+    if requested(features, 'route_carrier_count'):
+        df_out['route_carrier_count'] = lookup(
+            df_out, ['UniqueCarrier', 'Origin', 'Dest'], statistics['carrier_route_counts'], 0
+        )
     
-    return df_out
\ No newline at end of file
+    return df_out
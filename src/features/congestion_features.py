@@ -0,0 +1,243 @@
+# src/features/congestion_features.py
+
+import numpy as np
+import pandas as pd
+
+from .calendar_table import DAY_SLOTS, MONTH_SLOTS
+from .lookup import _level_codes
+from .projection import requested
+
+# half-widths, in minutes, of the departure windows counted around every flight
+CONGESTION_WINDOWS = (15, 30, 60)
+
+# departures counted around a flight, by the columns they share with it
+CONGESTION_KEYS = {
+    'origin': ('Origin',),
+    'origin_carrier': ('Origin', 'UniqueCarrier'),
+    'route': ('Origin', 'Dest'),
+}
+
+# columns giving the date and minute of a departure
+CONGESTION_TIME_COLUMNS = ('Month', 'DayofMonth', 'DepTime')
+
+# minute slots of a day; DepTime runs past 2400 for late departures
+MINUTES_PER_DAY = 26 * 60
+
+def congestion_column(name, window):
+    """Column counting the departures of the CONGESTION_KEYS entry name within window minutes."""
+    return f'{name}_departures_{window}m'
+
+def congestion_columns(windows=CONGESTION_WINDOWS):
+    """Every column of create_congestion_features, key by key and window by window."""
+    return [congestion_column(name, window) for name in CONGESTION_KEYS for window in windows]
+
+def departure_schedule(df):
+    """
+    Index the departures of a flight schedule for the window counts.
+
+    Every departure becomes one integer, (key * days + day) * minutes + minute,
+    where key is the position of its airports (and carrier) in sorted level
+    lists. Sorting these codes puts the departures of one key and date in a
+    contiguous run ordered by minute, so the departures of any window are a
+    range found with two binary searches.
+
+    The index is built from the flights being featurized (see
+    create_congestion_features), never fitted and kept in the feature store:
+    it grows with the number of flights.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Flights with Origin, Dest, UniqueCarrier, Month, DayofMonth and DepTime
+
+    Returns:
+    --------
+    dict
+        Sorted level Index of every key column ('<column>_levels') and the
+        sorted departure codes of every CONGESTION_KEYS entry ('<name>_departures')
+    """
+    schedule = {}
+    for col in _key_columns():
+        schedule[f'{col}_levels'] = _levels(df[col])
+
+    day, minute, valid = _departure_times(df)
+    codes = _column_codes(df, schedule)
+    for name, keys in CONGESTION_KEYS.items():
+        key, known = _key_codes(codes, keys, schedule)
+        departures = (key * DAY_SLOTS * MONTH_SLOTS + day) * MINUTES_PER_DAY + minute
+        schedule[f'{name}_departures'] = np.sort(departures[valid & known])
+    return schedule
+
+def merge_departure_schedules(schedules):
+    """
+    Departure schedule of the union of several sets of flights.
+
+    The levels become the sorted union of all parts and the codes of every
+    part are re-keyed onto them, so a file indexed chunk by chunk gives the
+    schedule of indexing it at once without ever holding all its flights.
+
+    Parameters:
+    -----------
+    schedules : list of dict
+        Outputs of departure_schedule
+
+    Returns:
+    --------
+    dict
+        The merged schedule
+    """
+    merged = {}
+    for col in _key_columns():
+        levels = schedules[0][f'{col}_levels']
+        for schedule in schedules[1:]:
+            levels = levels.union(schedule[f'{col}_levels'])
+        merged[f'{col}_levels'] = levels
+    for name, keys in CONGESTION_KEYS.items():
+        codes = np.concatenate([_recode(schedule, name, keys, merged) for schedule in schedules])
+        codes.sort()
+        merged[f'{name}_departures'] = codes
+    return merged
+
+def window_counts(departures, day_start, minute, windows):
+    """
+    Number of departures within each window of every query minute.
+
+    Parameters:
+    -----------
+    departures : numpy.ndarray
+        Sorted departure codes (key and date offset plus minute)
+    day_start : numpy.ndarray
+        Code of minute 0 of every query's key and date
+    minute : numpy.ndarray
+        Minute of day of every query
+    windows : iterable of int
+        Window half-widths in minutes; windows are cut at the date's boundaries
+
+    Returns:
+    --------
+    list of numpy.ndarray
+        Departure counts per window
+    """
+    # sorted queries make consecutive binary searches walk the same cache lines
+    queries = day_start + minute
+    order = np.argsort(queries)
+    queries, day_start = queries[order], day_start[order]
+    day_end = day_start + (MINUTES_PER_DAY - 1)
+    bound = np.empty_like(queries)
+    counts = []
+    for window in windows:
+        np.minimum(np.add(queries, window, out=bound), day_end, out=bound)
+        in_window = np.searchsorted(departures, bound, side='right')
+        np.maximum(np.subtract(queries, window, out=bound), day_start, out=bound)
+        in_window -= np.searchsorted(departures, bound, side='left')
+        count = np.empty_like(in_window)
+        count[order] = in_window
+        counts.append(count)
+    return counts
+
+def create_congestion_features(df, schedule=None, copy=True, features=None, windows=CONGESTION_WINDOWS):
+    """
+    Count the other departures close in time to every flight of a schedule.
+
+    For every flight and window, counts the other flights of its schedule on
+    the same date (Month, DayofMonth) departing within window minutes of its
+    DepTime: from the same origin, from the same origin by the same carrier,
+    and on the same route. The schedule is the frame being featurized itself,
+    so training and test flights are counted the same way; a chunk of a larger
+    file passes the schedule of the whole file instead. Unlike the hourly
+    bucket counts of the network features, a flight at 9:55 sees the 10:05
+    departures. All windows are counted from one sort of the flights, in
+    O(n log n).
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Input DataFrame with Origin, Dest, UniqueCarrier, Month, DayofMonth and DepTime
+    schedule : dict, optional
+        departure_schedule of the flights df belongs to (which must include
+        df's flights); by default that of df
+    copy : bool, default=True
+        Work on a copy of df; set to False to add the columns to df in place
+    features : collection of str, optional
+        Only compute these of the function's columns (all by default)
+    windows : iterable of int, default=CONGESTION_WINDOWS
+        Window half-widths in minutes
+
+    Returns:
+    --------
+    pandas.DataFrame
+        DataFrame with the departure counts added
+    """
+    wanted = {name: [window for window in windows if requested(features, congestion_column(name, window))]
+              for name in CONGESTION_KEYS}
+    if not any(wanted.values()):
+        return df.copy() if copy else df
+
+    if schedule is None:
+        schedule = departure_schedule(df)
+    df_out = df.copy() if copy else df
+
+    day, minute, valid = _departure_times(df_out)
+    keys_used = {col for name, keys in CONGESTION_KEYS.items() if wanted[name] for col in keys}
+    codes = _column_codes(df_out, schedule, keys_used)
+    for name, keys in CONGESTION_KEYS.items():
+        if not wanted[name]:
+            continue
+        key, known = _key_codes(codes, keys, schedule)
+        # flights with a missing key or time are not in the schedule and see no departures
+        known &= valid
+        starts = np.where(known, (key * DAY_SLOTS * MONTH_SLOTS + day) * MINUTES_PER_DAY, -MINUTES_PER_DAY)
+        departures = schedule[f'{name}_departures']
+        for window, count in zip(wanted[name], window_counts(departures, starts, minute, wanted[name])):
+            # every window holds the flight's own departure
+            df_out[congestion_column(name, window)] = np.where(known, count - 1, 0)
+
+    return df_out
+
+def _key_columns():
+    """Key columns of all CONGESTION_KEYS entries, in first-use order."""
+    return list(dict.fromkeys(col for keys in CONGESTION_KEYS.values() for col in keys))
+
+def _levels(col):
+    """Sorted distinct non-missing values of col."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        codes = col.cat.codes.to_numpy()
+        return pd.Index(np.asarray(col.cat.categories[np.unique(codes[codes >= 0])], dtype=object)).sort_values()
+    return pd.Index(np.asarray(col.dropna().unique(), dtype=object)).sort_values()
+
+def _column_codes(df, schedule, columns=None):
+    """Positions of every key column's values in its levels (-1 when unknown)."""
+    return {col: _level_codes(schedule[f'{col}_levels'], df[col]) for col in _key_columns()
+            if columns is None or col in columns}
+
+def _key_codes(codes, keys, schedule):
+    """Mixed-radix code of the key columns of every row in the levels, and whether all were known."""
+    key = np.zeros(len(codes[keys[0]]), dtype=np.int64)
+    known = np.ones(len(key), dtype=bool)
+    for col in keys:
+        known &= codes[col] >= 0
+        key = key * len(schedule[f'{col}_levels']) + np.maximum(codes[col], 0)
+    return key, known
+
+def _departure_times(df):
+    """Day slot (month * DAY_SLOTS + day), minute of day and validity of every departure."""
+    month, day, dep_time = (df[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in CONGESTION_TIME_COLUMNS)
+    valid = np.isfinite(month) & np.isfinite(day) & np.isfinite(dep_time)
+    month, day, dep_time = (np.where(valid, values, 0).astype(np.int64) for values in (month, day, dep_time))
+    valid &= (month >= 0) & (month < MONTH_SLOTS) & (day >= 0) & (day < DAY_SLOTS) & (dep_time >= 0)
+    minute = np.minimum((dep_time // 100) * 60 + dep_time % 100, MINUTES_PER_DAY - 1)
+    return np.where(valid, month * DAY_SLOTS + day, 0), np.where(valid, minute, 0), valid
+
+def _recode(schedule, name, keys, levels):
+    """Departure codes of one CONGESTION_KEYS entry re-keyed from the schedule's own levels onto levels."""
+    codes = schedule[f'{name}_departures']
+    key, time = np.divmod(codes, DAY_SLOTS * MONTH_SLOTS * MINUTES_PER_DAY)
+    positions = []
+    for col in reversed(keys):
+        own = schedule[f'{col}_levels']
+        key, position = np.divmod(key, len(own))
+        positions.append(levels[f'{col}_levels'].get_indexer(own)[position])
+    recoded = np.zeros(len(codes), dtype=np.int64)
+    for col, position in zip(keys, reversed(positions)):
+        recoded = recoded * len(levels[f'{col}_levels']) + position
+    return recoded * DAY_SLOTS * MONTH_SLOTS * MINUTES_PER_DAY + time
@@ -1,59 +1,113 @@
 # src/features/cyclical_features.py
 
+import functools
+
 import numpy as np
 import pandas as pd
 
-def create_cyclical_features(df):
+from .projection import requested
+
+# dtype of the sin/cos columns; float32 holds values in [-1, 1] to ~1e-7 at half the memory
+CYCLICAL_DTYPE = np.float32
+
+# largest DepTime value covered by the precomputed time-of-day tables
+MAX_DEP_TIME = 2499
+
+# every cyclical feature: output prefix, source column, range of tabulated values and
+# the angle of a value (day of month approximates every month to 31 days)
+CYCLICAL_ENCODINGS = [
+    ('dep_hour', 'dep_hour', 0, MAX_DEP_TIME // 100, lambda hour: 2 * np.pi * hour / 24),
+    ('day_of_week', 'DayOfWeek', 1, 7, lambda day: 2 * np.pi * (day - 1) / 7),
+    ('month', 'Month', 1, 12, lambda month: 2 * np.pi * (month - 1) / 12),
+    ('day_of_month', 'DayofMonth', 1, 31, lambda day: 2 * np.pi * (day - 1) / 31),
+    # DepTime like 1430 (2:30 PM) as a fraction of the day
+    ('time_of_day', 'DepTime', 0, MAX_DEP_TIME,
+     lambda dep_time: 2 * np.pi * (((dep_time // 100) * 60 + dep_time % 100) / (24 * 60))),
+]
+
+@functools.lru_cache(maxsize=None)
+def cyclical_tables(dtype=CYCLICAL_DTYPE):
+    """
+    sin and cos of every tabulated value of each cyclical feature.
+
+    Returns:
+    --------
+    dict
+        (values, sin, cos) arrays per output prefix, the last two in dtype
+    """
+    tables = {}
+    for name, _, lowest, highest, angle in CYCLICAL_ENCODINGS:
+        values = np.arange(lowest, highest + 1)
+        radians = angle(values)
+        tables[name] = (values, np.sin(radians).astype(dtype), np.cos(radians).astype(dtype))
+    return tables
+
+def _encode(values, lowest, angle, sin_table, cos_table, out_sin, out_cos):
+    """Fill out_sin and out_cos by gathering from the tables, computing values outside them directly."""
+    values = np.asarray(values)
+    outside = None
+    if np.issubdtype(values.dtype, np.integer):
+        positions = values.astype(np.intp) - lowest
+        outside = (positions < 0) | (positions >= len(sin_table))
+        if outside.any():
+            positions[outside] = 0
+        np.take(sin_table, positions, out=out_sin)
+        np.take(cos_table, positions, out=out_cos)
+        outside = np.flatnonzero(outside)
+        if len(outside) == 0:
+            return
+    else:
+        # e.g. float columns with missing values
+        outside = slice(None)
+    radians = angle(values[outside])
+    out_sin[outside] = np.sin(radians)
+    out_cos[outside] = np.cos(radians)
+
+def create_cyclical_features(df, copy=True, dtype=CYCLICAL_DTYPE, features=None):
     """
     Create cyclical transformations of temporal features.
-    
+
+    Every source column has a small integer domain, so the sin/cos values are
+    gathered from tables computed once (see cyclical_tables) into one pair of
+    arrays per feature. Values outside the tables are computed directly.
+
     Parameters:
     -----------
     df : pandas.DataFrame
         Input DataFrame with the raw flight data
-        
+    copy : bool, default=True
+        Work on a copy of df; set to False to add the columns to df in place
+    dtype : numpy.dtype, default=CYCLICAL_DTYPE
+        dtype of the new columns; float64 reproduces np.sin/np.cos of the
+        column values exactly
+    features : collection of str, optional
+        Only compute these of the function's columns (all by default; the sin
+        and cos of a feature are computed together)
+
     Returns:
     --------
     pandas.DataFrame
         DataFrame with cyclical features added
     """
-    df_out = df.copy()
-    
-    # Create hour of day cyclical features
-    if 'dep_hour' in df_out.columns:
-        df_out['dep_hour_sin'] = np.sin(2 * np.pi * df_out['dep_hour'] / 24)
-        df_out['dep_hour_cos'] = np.cos(2 * np.pi * df_out['dep_hour'] / 24)
-    elif 'DepTime' in df_out.columns:
-        # Create dep_hour if it doesn't exist
-        df_out['dep_hour'] = df_out['DepTime'] // 100
-        df_out['dep_hour_sin'] = np.sin(2 * np.pi * df_out['dep_hour'] / 24)
-        df_out['dep_hour_cos'] = np.cos(2 * np.pi * df_out['dep_hour'] / 24)
-    
-    # Create day of week cyclical features
-    if 'DayOfWeek' in df_out.columns:
-        df_out['day_of_week_sin'] = np.sin(2 * np.pi * (df_out['DayOfWeek'] - 1) / 7)
-        df_out['day_of_week_cos'] = np.cos(2 * np.pi * (df_out['DayOfWeek'] - 1) / 7)
-    
-    # Create month cyclical features
-    if 'Month' in df_out.columns:
-        df_out['month_sin'] = np.sin(2 * np.pi * (df_out['Month'] - 1) / 12)
-        df_out['month_cos'] = np.cos(2 * np.pi * (df_out['Month'] - 1) / 12)
-    
-    # Create day of month cyclical features
-    if 'DayofMonth' in df_out.columns:
-        # Get max days for normalization (approximating to 31 for simplicity)
-        max_days = 31
-        df_out['day_of_month_sin'] = np.sin(2 * np.pi * (df_out['DayofMonth'] - 1) / max_days)
-        df_out['day_of_month_cos'] = np.cos(2 * np.pi * (df_out['DayofMonth'] - 1) / max_days)
-    
-    # Create time of day features that combine hour and minute
-    if 'DepTime' in df_out.columns:
-        # Convert time like 1430 (2:30 PM) to fraction of day
-        hours = df_out['DepTime'] // 100
-        minutes = df_out['DepTime'] % 100
-        time_of_day = (hours * 60 + minutes) / (24 * 60)  # Fraction of day
-        
-        df_out['time_of_day_sin'] = np.sin(2 * np.pi * time_of_day)
-        df_out['time_of_day_cos'] = np.cos(2 * np.pi * time_of_day)
-    
-    return df_out
\ No newline at end of file
+    df_out = df.copy() if copy else df
+
+    sources = {}
+    for name, column, lowest, _, angle in CYCLICAL_ENCODINGS:
+        if not (requested(features, f'{name}_sin') or requested(features, f'{name}_cos')):
+            continue
+        if column in df_out.columns:
+            sources[name] = df_out[column].to_numpy()
+        elif name == 'dep_hour' and 'DepTime' in df_out.columns:
+            sources[name] = df_out['DepTime'].to_numpy() // 100
+
+    tables = cyclical_tables(np.dtype(dtype).type)
+    for name, _, lowest, _, angle in CYCLICAL_ENCODINGS:
+        if name in sources:
+            _, sin_table, cos_table = tables[name]
+            out_sin, out_cos = np.empty(len(df_out), dtype=dtype), np.empty(len(df_out), dtype=dtype)
+            _encode(sources[name], lowest, angle, sin_table, cos_table, out_sin, out_cos)
+            # assigning copies the values into the frame, so only one pair is held besides it at a time
+            df_out[f'{name}_sin'] = out_sin
+            df_out[f'{name}_cos'] = out_cos
+
+    return df_out
@@ -0,0 +1,308 @@
+# src/features/encoder.py
+
+import math
+import numpy as np
+
+from .cyclical_features import CYCLICAL_DTYPE, CYCLICAL_ENCODINGS, cyclical_tables
+from .temporal_features import TIME_PERIOD_BINS, TIME_PERIOD_LABELS, DAY_COLUMNS
+from .calendar_table import DAY_SLOTS, MONTH_SLOTS, default_calendar
+from .spatial_features import DISTANCE_BINS, DISTANCE_LABELS
+from .interaction_features import NORTHERN_HUBS, WINTER_MONTHS
+from .graph_features import AIRPORT_SCORES
+from .congestion_features import (CONGESTION_KEYS, CONGESTION_WINDOWS, MINUTES_PER_DAY, congestion_column,
+                                  congestion_columns, window_counts)
+from .feature_store import load_feature_store
+
+NAN = float('nan')
+
+# codes of the raw label strings
+LABEL_CODES = {'Y': 1, 'N': 0}
+
+def _as_dict(table):
+    """Plain dict of a statistics Series, keyed by values or tuples of values."""
+    if table is None:
+        return None
+    return dict(zip(table.index.tolist(), table.tolist()))
+
+def _bin_lookup(edges, labels, n_values):
+    """Label of every integer 0..n_values-1 under right-inclusive bins (None outside)."""
+    table = [None] * n_values
+    for lower, upper, label in zip(edges[:-1], edges[1:], labels):
+        for value in range(lower + 1, min(upper, n_values - 1) + 1):
+            table[value] = label
+    return table
+
+CYCLICAL_ANGLES = {name: angle for name, _, _, _, angle in CYCLICAL_ENCODINGS}
+CYCLICAL_COLUMNS = {name: (f'{name}_sin', f'{name}_cos') for name in CYCLICAL_ANGLES}
+
+def _cyclical_tables():
+    """sin/cos of every tabulated input value, as Python floats from the tables of create_cyclical_features."""
+    return {
+        name: (dict(zip(values.tolist(), sin.tolist())), dict(zip(values.tolist(), cos.tolist())))
+        for name, (values, sin, cos) in cyclical_tables().items()
+    }
+
+def _missing(value):
+    """Whether a raw key field is missing (None or NaN)."""
+    return value is None or value != value
+
+def _int_field(value):
+    """Raw calendar field as int, accepting the 'c-' string encoding."""
+    if isinstance(value, str):
+        return int(value.replace('c-', ''))
+    return int(value)
+
+class FeatureEncoder:
+    """
+    Online encoder that featurizes single flights without pandas.
+
+    All fitted statistics are compiled into plain dicts and lists once, so
+    transform_one is a few dozen dictionary lookups and produces the same
+    columns, in the same order and with the same values, as the batch pipeline
+    in build_features with the same feature store. The congestion windows
+    count the other flights transformed together, as the batch pipeline counts
+    those of its frame: none for transform_one, the micro-batch for
+    transform_many.
+
+    Parameters:
+    -----------
+    store : FeatureStore
+        Fitted reference statistics
+    """
+
+    def __init__(self, store):
+        if store is None or not store.is_fitted:
+            raise ValueError("FeatureEncoder needs a fitted feature store")
+        airport = store.statistics['airport']
+        carrier = store.statistics['carrier']
+        network = store.statistics['network']
+
+        self.origin_ranks = _as_dict(airport['origin_ranks'])
+        self.dest_ranks = _as_dict(airport['dest_ranks'])
+        self.origin_delay_rates = _as_dict(airport.get('origin_delay_rates'))
+        self.dest_delay_rates = _as_dict(airport.get('dest_delay_rates'))
+        self.top_origins = set(airport['top_origins'].tolist())
+        self.top_dests = set(airport['top_dests'].tolist())
+        self.route_ranks = _as_dict(airport['route_ranks'])
+
+        self.carrier_rank = _as_dict(carrier['carrier_rank'])
+        self.carrier_delay_rates = _as_dict(carrier.get('carrier_delay_rates'))
+        self.carrier_hour_delay = _as_dict(carrier.get('carrier_hour_delay'))
+        self.carrier_route_counts = _as_dict(carrier['carrier_route_counts'])
+
+        self.airport_hourly_traffic = _as_dict(network.get('airport_hourly_traffic'))
+        self.origin_congestion_rank = _as_dict(network.get('origin_congestion_rank'))
+        self.carrier_hourly = _as_dict(network.get('carrier_hourly'))
+        self.origin_connectivity = _as_dict(network['origin_connectivity'])
+        self.airport_hourly_delays = _as_dict(network.get('airport_hourly_delays'))
+        self.route_hourly = _as_dict(network['route_hourly'])
+        self.route_counts = _as_dict(network['route_counts'])
+        self.route_congestion_rank = _as_dict(network['route_congestion_rank'])
+
+        graph = store.statistics.get('graph')
+        self.airport_scores = None
+        if graph is not None:
+            self.airport_scores = [(f'origin_{score}', f'dest_{score}', _as_dict(graph[score]))
+                                   for score in AIRPORT_SCORES]
+            self.carrier_out_degree = _as_dict(graph['carrier_out_degree'])
+            self.carrier_in_degree = _as_dict(graph['carrier_in_degree'])
+
+        self.time_periods = dict(enumerate(_bin_lookup(TIME_PERIOD_BINS, TIME_PERIOD_LABELS, TIME_PERIOD_BINS[-1] + 1)))
+        self.distance_categories = _bin_lookup(DISTANCE_BINS, DISTANCE_LABELS, DISTANCE_BINS[-1] + 1)
+        self.calendar = default_calendar()
+        self.calendar_days = list(zip(*(self.calendar.table[col].tolist() for col in DAY_COLUMNS)))
+        self.northern_hubs = set(NORTHERN_HUBS)
+        self.winter_months = set(WINTER_MONTHS)
+        # sin/cos tables, output columns and angle of every cyclical encoding, in output order
+        tables = _cyclical_tables()
+        self.cyclical = [(*tables[name], *CYCLICAL_COLUMNS[name], CYCLICAL_ANGLES[name]) for name in CYCLICAL_ANGLES]
+        # window counts of a flight transformed alone, merged into every output
+        self.no_congestion = dict.fromkeys(congestion_columns(), 0)
+
+    @classmethod
+    def from_path(cls, feature_store_path):
+        """Build an encoder from a feature store directory written by build_features."""
+        return cls(load_feature_store(feature_store_path))
+
+    def transform_one(self, record):
+        """
+        Featurize a single flight.
+
+        Parameters:
+        -----------
+        record : dict
+            Raw flight fields (Month, DayofMonth, DayOfWeek, DepTime, UniqueCarrier,
+            Origin, Dest, Distance and optionally dep_delayed_15min)
+
+        Returns:
+        --------
+        dict
+            The raw fields followed by every engineered feature, in the column
+            order of the batch pipeline output
+        """
+        out = dict(record)
+
+        # convert data types
+        month = out['Month'] = _int_field(record['Month'])
+        day_of_month = out['DayofMonth'] = _int_field(record['DayofMonth'])
+        day_of_week = out['DayOfWeek'] = _int_field(record['DayOfWeek'])
+        if 'dep_delayed_15min' in record and isinstance(record['dep_delayed_15min'], str):
+            out['dep_delayed_15min'] = LABEL_CODES.get(record['dep_delayed_15min'], NAN)
+        dep_time = record['DepTime']
+        carrier = record['UniqueCarrier']
+        origin = record['Origin']
+        dest = record['Dest']
+        distance = record['Distance']
+
+        # temporal features
+        dep_hour = out['dep_hour'] = dep_time // 100
+        out['dep_minute'] = dep_time % 100
+        time_period = self.time_periods.get(dep_hour)
+        out['time_period'] = time_period if time_period is not None else NAN
+        is_weekend = out['is_weekend'] = int(day_of_week >= 6)
+        if 0 <= month < MONTH_SLOTS and 0 <= day_of_month < DAY_SLOTS:
+            days = self.calendar_days[month * DAY_SLOTS + day_of_month]
+        else:
+            days = [values[0].item() for values in self.calendar.lookup([month], [day_of_month], DAY_COLUMNS).values()]
+        out.update(zip(DAY_COLUMNS, days))
+        is_peak = out['is_peak_travel_season']
+
+        # airport features
+        origin_freq_rank = out['origin_freq_rank'] = self.origin_ranks.get(origin, NAN)
+        out['dest_freq_rank'] = self.dest_ranks.get(dest, NAN)
+        origin_delay_rate = NAN
+        if self.origin_delay_rates is not None:
+            origin_delay_rate = out['origin_delay_rate'] = self.origin_delay_rates.get(origin, NAN)
+            out['dest_delay_rate'] = self.dest_delay_rates.get(dest, NAN)
+        origin_is_hub = out['origin_is_hub'] = int(origin in self.top_origins)
+        dest_is_hub = out['dest_is_hub'] = int(dest in self.top_dests)
+        out['route'] = f'{origin}_{dest}'
+        out['route_freq_rank'] = self.route_ranks.get((origin, dest), NAN)
+        distance_category = None
+        if 0 <= distance < len(self.distance_categories) and distance == int(distance):
+            distance_category = self.distance_categories[int(distance)]
+        elif DISTANCE_BINS[0] < distance <= DISTANCE_BINS[-1]:
+            distance_category = DISTANCE_LABELS[np.searchsorted(DISTANCE_BINS, distance) - 1]
+        out['distance_category'] = distance_category if distance_category is not None else NAN
+
+        # carrier features
+        carrier_size_rank = out['carrier_size_rank'] = self.carrier_rank.get(carrier, NAN)
+        if self.carrier_delay_rates is not None:
+            out['carrier_delay_rate'] = self.carrier_delay_rates.get(carrier, NAN)
+        if self.carrier_hour_delay is not None:
+            out['carrier_hour_performance'] = self.carrier_hour_delay.get((carrier, dep_hour), NAN)
+        out['route_carrier_count'] = self.carrier_route_counts.get((carrier, origin, dest), 0)
+
+        # basic interaction features
+        out['hub_to_hub'] = origin_is_hub * dest_is_hub
+        peak_weekend = out['peak_weekend'] = is_weekend * is_peak
+
+        # cyclical features
+        for key, (sin_table, cos_table, sin_name, cos_name, angle) in zip(
+                (dep_hour, day_of_week, month, day_of_month, dep_time), self.cyclical):
+            sin = sin_table.get(key)
+            if sin is not None:
+                out[sin_name] = sin
+                out[cos_name] = cos_table[key]
+            else:
+                angle = angle(key)
+                out[sin_name] = float(CYCLICAL_DTYPE(math.sin(angle)))
+                out[cos_name] = float(CYCLICAL_DTYPE(math.cos(angle)))
+
+        # advanced interaction features
+        out['evening_weekend'] = int(time_period == 'Evening' or time_period == 'Night') * is_weekend
+        out['major_carrier_at_hub'] = int(carrier_size_rank > 0.8) * origin_is_hub
+        out['long_distance_peak'] = int(distance_category == 'Long' or distance_category == 'Very Long') * is_peak
+        morning_rush = out['morning_rush'] = int(6 <= dep_hour <= 9)
+        evening_rush = out['evening_rush'] = int(16 <= dep_hour <= 19)
+        rush_at_busy_airport = out['rush_at_busy_airport'] = int(morning_rush or evening_rush) * int(origin_freq_rank > 0.8)
+        winter_in_north = out['winter_in_north'] = int(month in self.winter_months and origin in self.northern_hubs)
+        out['delay_risk_score'] = rush_at_busy_airport + winter_in_north + peak_weekend
+
+        # network features
+        if self.airport_hourly_traffic is not None:
+            out['origin_hourly_flights'] = self.airport_hourly_traffic.get((origin, dep_hour), 0)
+            rank = self.origin_congestion_rank.get((origin, dep_hour))
+            out['origin_congestion_rank'] = rank if rank is not None else (0.0 if origin in self.origin_connectivity else 0.5)
+        out['origin_num_connections'] = self.origin_connectivity.get(origin, NAN)
+        if self.carrier_hourly is not None:
+            out['carrier_hourly_flights'] = self.carrier_hourly.get((carrier, dep_hour), 0)
+        if self.airport_hourly_delays is not None:
+            rate = self.airport_hourly_delays.get((origin, dep_hour), NAN)
+            out['origin_hour_delay_rate'] = rate if rate == rate else origin_delay_rate
+        out['route_hourly_flights'] = self.route_hourly.get((origin, dest, dep_hour), 0)
+        rank = self.route_congestion_rank.get((origin, dest, dep_hour))
+        out['route_congestion_rank'] = rank if rank is not None else (0.0 if (origin, dest) in self.route_counts else 0.5)
+
+        # graph features
+        if self.airport_scores is not None:
+            for origin_name, _, table in self.airport_scores:
+                out[origin_name] = table.get(origin, 0.0)
+            for _, dest_name, table in self.airport_scores:
+                out[dest_name] = table.get(dest, 0.0)
+            out['origin_carrier_degree'] = self.carrier_out_degree.get((carrier, origin), 0)
+            out['dest_carrier_degree'] = self.carrier_in_degree.get((carrier, dest), 0)
+
+        # congestion features: a flight transformed alone has no other departures around it
+        out.update(self.no_congestion)
+
+        return out
+
+    def transform_many(self, records):
+        """
+        Featurize a micro-batch of flights.
+
+        Parameters:
+        -----------
+        records : iterable of dict
+            Raw flight fields, as for transform_one
+
+        Returns:
+        --------
+        list of dict
+            One feature dict per record, with the congestion windows counted
+            among the records of the batch
+        """
+        transform_one = self.transform_one
+        outs = [transform_one(record) for record in records]
+        self._congestion(outs)
+        return outs
+
+    def _congestion(self, outs):
+        """Count the departure windows of a micro-batch within its own flights, as create_congestion_features does."""
+        if len(outs) < 2:
+            return
+        # day slot and minute of every departure, with -1 for flights without a valid time
+        times = []
+        for out in outs:
+            month, day_of_month, dep_time = out['Month'], out['DayofMonth'], out['DepTime']
+            if 0 <= month < MONTH_SLOTS and 0 <= day_of_month < DAY_SLOTS and dep_time >= 0:
+                times += (month * DAY_SLOTS + day_of_month, min((dep_time // 100) * 60 + dep_time % 100,
+                                                                 MINUTES_PER_DAY - 1))
+            else:
+                times += (-1, 0)
+        times = np.array(times, dtype=np.int64).reshape(-1, 2)
+        day, minute = times[:, 0], times[:, 1]
+
+        # positions of the key values among those of the batch (-1 when missing)
+        codes = {}
+        for col in {col for keys in CONGESTION_KEYS.values() for col in keys}:
+            positions = {}
+            values = [-1 if _missing(out[col]) else positions.setdefault(out[col], len(positions)) for out in outs]
+            codes[col] = (np.array(values, dtype=np.int64), len(positions))
+
+        for name, keys in CONGESTION_KEYS.items():
+            key = np.zeros(len(outs), dtype=np.int64)
+            known = day >= 0
+            for col in keys:
+                position, size = codes[col]
+                known &= position >= 0
+                key = key * size + np.maximum(position, 0)
+            starts = (key * DAY_SLOTS * MONTH_SLOTS + day) * MINUTES_PER_DAY
+            departures = np.sort((starts + minute)[known])
+            starts[~known] = -MINUTES_PER_DAY
+            for window, count in zip(CONGESTION_WINDOWS, window_counts(departures, starts, minute, CONGESTION_WINDOWS)):
+                # every window holds the flight's own departure
+                column = congestion_column(name, window)
+                for out, value in zip(outs, np.where(known, count - 1, 0).tolist()):
+                    out[column] = value
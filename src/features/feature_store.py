@@ -0,0 +1,252 @@
+# src/features/feature_store.py
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+from joblib import effective_n_jobs
+import numpy as np
+import pandas as pd
+
+from ..data.table_io import read_table, write_table
+
+from .aggregation import FLIGHT_KEYS, count_flights, merge_flight_counts, plain_keys
+from .spatial_features import airport_statistics_from_counts
+from .carrier_features import carrier_statistics_from_counts
+from .network_features import network_statistics_from_counts
+from .graph_features import graph_statistics_from_counts
+from .interaction_features import interaction_statistics_from_counts
+from .target_encoding import smoothed_delay_rates
+
+FEATURE_STORE_FILENAME = 'feature_store.joblib'
+LEGACY_REFERENCE_FILENAME = 'train_reference.csv'
+
+# supported store formats, in the order load_feature_store looks for them
+STORE_FORMATS = ['joblib', 'parquet', 'feather']
+MANIFEST_FILENAME = 'manifest.json'
+COUNTS_FILENAME = 'flight_counts'
+# manifest entry holding the store settings rather than a statistics module
+SETTINGS_KEY = '_settings'
+
+def feature_store_file(feature_store_path, store_format='joblib'):
+    """Path of the store inside a feature store directory for the given format."""
+    if store_format not in STORE_FORMATS:
+        raise ValueError(f"Unknown feature store format '{store_format}'; expected one of {STORE_FORMATS}")
+    return os.path.join(feature_store_path, f'feature_store.{store_format}')
+
+class FeatureStore:
+    """
+    Fitted reference statistics for the feature pipeline.
+    
+    Fitting scans the training data once into flight counts per (carrier,
+    route, hour) key and derives the compact lookup tables (one row per
+    airport, carrier, route, ...) from them, so that transforming new data
+    never needs the training frame itself. The counts are kept as well, so
+    partial_fit can fold in new batches without rescanning the history.
+    
+    Attributes:
+    -----------
+    statistics : dict
+        Lookup tables per feature module ('airport', 'carrier', 'network', 'graph',
+        'interaction')
+    counts : pandas.DataFrame or None
+        Sufficient statistics from count_flights (None for stores saved before
+        they were kept)
+    smoothing : float
+        Weight, in flights, of the global delay rate the per-key delay rates are
+        shrunk toward (0 for plain rates)
+    """
+    
+    def __init__(self, statistics=None, counts=None, smoothing=0.0):
+        self.statistics = statistics if statistics is not None else {}
+        self.counts = counts
+        self.smoothing = smoothing
+    
+    @property
+    def is_fitted(self):
+        return bool(self.statistics)
+    
+    def fit(self, df, n_jobs=1, modules=None):
+        """
+        Compute all reference statistics from a training frame.
+        
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            Training data after convert_data_types and create_temporal_features
+            (needs Origin, Dest, UniqueCarrier, dep_hour and dep_delayed_15min)
+        n_jobs : int, default=1
+            Derive the independent module statistics on this many threads
+        modules : collection of str, optional
+            Only derive the statistics of these modules (e.g. those of the
+            stages project_stages keeps); all by default
+            
+        Returns:
+        --------
+        FeatureStore
+            The fitted store (self)
+        """
+        self.counts = None
+        self.statistics = {}
+        return self.partial_fit(df, n_jobs=n_jobs, modules=modules)
+    
+    def partial_fit(self, df, n_jobs=1, modules=None):
+        """
+        Update the reference statistics with a new batch of training data.
+        
+        Only the new batch is scanned; its flight counts are merged into the
+        stored ones and the lookup tables re-derived from the (batch-size
+        independent) count table. The result is identical to fitting on all
+        batches at once.
+        
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            New training data, prepared as for fit
+        n_jobs : int, default=1
+            Derive the independent module statistics on this many threads
+        modules : collection of str, optional
+            Only derive the statistics of these modules; all by default
+            
+        Returns:
+        --------
+        FeatureStore
+            The updated store (self)
+        """
+        if self.is_fitted and self.counts is None:
+            raise ValueError("This feature store was saved without flight counts; refit it before partial_fit")
+        
+        counts = count_flights(df)
+        if self.counts is not None:
+            counts = merge_flight_counts(self.counts, counts)
+        self.counts = counts
+        
+        derivations = {
+            'airport': airport_statistics_from_counts,
+            'carrier': carrier_statistics_from_counts,
+            'network': network_statistics_from_counts,
+            'graph': graph_statistics_from_counts,
+            'interaction': interaction_statistics_from_counts,
+        }
+        if modules is not None:
+            derivations = {name: derive for name, derive in derivations.items() if name in modules}
+        n_jobs = effective_n_jobs(n_jobs)
+        if n_jobs == 1:
+            self.statistics = {name: derive(counts) for name, derive in derivations.items()}
+        else:
+            with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+                futures = {name: pool.submit(derive, counts) for name, derive in derivations.items()}
+                self.statistics = {name: future.result() for name, future in futures.items()}
+        
+        if self.smoothing and 'labelled' in counts.columns:
+            for (module, name), table in smoothed_delay_rates(counts, self.smoothing).items():
+                if module in self.statistics:
+                    self.statistics[module][name] = table
+        return self
+    
+    def save(self, path):
+        """
+        Persist the fitted statistics.
+        
+        A path ending in .joblib is written as a single joblib file. A path ending
+        in .parquet or .feather becomes a directory with one columnar table per
+        statistic (keys dictionary-encoded), the flight counts and a JSON
+        manifest for the scalars.
+        """
+        store_format = os.path.splitext(str(path))[1].lstrip('.')
+        if store_format == 'joblib':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            joblib.dump({'statistics': self.statistics, 'counts': self.counts, 'smoothing': self.smoothing}, path)
+        else:
+            _save_tables(self.statistics, path, store_format, {'smoothing': self.smoothing})
+            if self.counts is not None:
+                write_table(self.counts.reset_index(), os.path.join(path, f'{COUNTS_FILENAME}.{store_format}'))
+    
+    @classmethod
+    def load(cls, path):
+        """Load statistics previously written by save."""
+        if os.path.isdir(path):
+            counts = None
+            store_format = os.path.splitext(str(path))[1].lstrip('.')
+            counts_path = os.path.join(path, f'{COUNTS_FILENAME}.{store_format}')
+            if os.path.exists(counts_path):
+                counts = plain_keys(read_table(counts_path).set_index(FLIGHT_KEYS))
+            statistics, settings = _load_tables(path)
+            return cls(statistics, counts, **settings)
+        payload = joblib.load(path)
+        return cls(payload['statistics'], payload.get('counts'), payload.get('smoothing', 0.0))
+
+def _save_tables(statistics, path, store_format, settings):
+    """Write every statistic as a Parquet/Feather table plus a manifest (which also holds the store settings)."""
+    os.makedirs(path, exist_ok=True)
+    manifest = {SETTINGS_KEY: settings}
+    for module, tables in statistics.items():
+        manifest[module] = {}
+        for name, value in tables.items():
+            if isinstance(value, pd.Series):
+                index_names = [level if level is not None else f'level_{i}'
+                               for i, level in enumerate(value.index.names)]
+                frame = value.rename('value').rename_axis(index_names).reset_index()
+                entry = {'kind': 'series', 'index': index_names, 'name': value.name}
+            elif isinstance(value, pd.Index):
+                frame = pd.DataFrame({'value': value})
+                entry = {'kind': 'index', 'name': value.name}
+            else:
+                manifest[module][name] = {'kind': 'scalar', 'value': float(value)}
+                continue
+            entry['file'] = f'{module}__{name}.{store_format}'
+            write_table(frame, os.path.join(path, entry['file']))
+            manifest[module][name] = entry
+    
+    with open(os.path.join(path, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def _load_tables(path):
+    """Read the tables and settings written by _save_tables."""
+    with open(os.path.join(path, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+    settings = manifest.pop(SETTINGS_KEY, {})
+    
+    statistics = {}
+    for module, entries in manifest.items():
+        statistics[module] = {}
+        for name, entry in entries.items():
+            if entry['kind'] == 'scalar':
+                value = np.float64(entry['value'])
+            else:
+                frame = read_table(os.path.join(path, entry['file']))
+                if entry['kind'] == 'index':
+                    value = pd.Index(frame['value'], name=entry['name'])
+                else:
+                    value = frame.set_index(entry['index'])['value'].rename(entry['name'])
+            statistics[module][name] = value
+    return statistics, settings
+
+def load_feature_store(feature_store_path):
+    """
+    Load the fitted feature store from a feature store directory.
+    
+    Looks for feature_store.joblib, .parquet and .feather in that order, and
+    falls back to fitting from a legacy train_reference.csv when the directory
+    was written by an older version of the pipeline.
+    
+    Parameters:
+    -----------
+    feature_store_path : str
+        Directory containing the saved store (or train_reference.csv)
+        
+    Returns:
+    --------
+    FeatureStore or None
+        The fitted store, or None if nothing was found
+    """
+    for store_format in STORE_FORMATS:
+        store_path = feature_store_file(feature_store_path, store_format)
+        if os.path.exists(store_path):
+            return FeatureStore.load(store_path)
+    
+    legacy_path = os.path.join(feature_store_path, LEGACY_REFERENCE_FILENAME)
+    if os.path.exists(legacy_path):
+        return FeatureStore().fit(pd.read_csv(legacy_path))
+    
+    return None
@@ -0,0 +1,251 @@
+# src/features/graph_features.py
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .aggregation import count_reference_flights
+from .lookup import lookup
+from .projection import requested
+
+# PageRank damping factor (probability of following a flight rather than jumping to a random airport)
+PAGERANK_DAMPING = 0.85
+
+# L1 change of the score vectors below which the power iterations stop
+GRAPH_TOLERANCE = 1e-10
+GRAPH_MAX_ITER = 1000
+
+# airport scores of the graph statistics, looked up for both ends of a flight
+AIRPORT_SCORES = ['pagerank', 'out_degree', 'in_degree', 'hub_score', 'authority_score']
+
+def fit_graph_statistics(reference_data):
+    """
+    Compute the airport graph scores used by create_graph_features.
+
+    Parameters:
+    -----------
+    reference_data : pandas.DataFrame
+        Training data with Origin, Dest and UniqueCarrier
+
+    Returns:
+    --------
+    dict
+        Score tables keyed by name, indexed by airport or (carrier, airport)
+    """
+    return graph_statistics_from_counts(count_reference_flights(reference_data))
+
+def flight_graph(counts):
+    """
+    Weighted airport-to-airport flight graph of a count table.
+
+    Parameters:
+    -----------
+    counts : pandas.DataFrame
+        Flight counts from aggregation.count_flights with Origin and Dest key levels
+
+    Returns:
+    --------
+    airports : pandas.Index
+        Sorted airports, the row and column order of the adjacency matrix
+    adjacency : scipy.sparse.csr_matrix
+        Number of flights from every origin (row) to every destination (column)
+    """
+    index = counts.index
+    airports = _observed_level(index, 'Origin').union(_observed_level(index, 'Dest')).rename('airport')
+    rows, cols = _positions(index, 'Origin', airports), _positions(index, 'Dest', airports)
+    known = (rows >= 0) & (cols >= 0)
+    # duplicate (origin, dest) entries of the carrier and hour keys are summed by the conversion
+    adjacency = sparse.coo_matrix(
+        (counts['flights'].to_numpy(dtype=np.float64)[known], (rows[known], cols[known])),
+        shape=(len(airports), len(airports)),
+    ).tocsr()
+    return airports, adjacency
+
+def pagerank(adjacency, damping=PAGERANK_DAMPING, tol=GRAPH_TOLERANCE, max_iter=GRAPH_MAX_ITER):
+    """
+    PageRank of a weighted directed graph by power iteration.
+
+    A random walker follows an outgoing edge with probability proportional to
+    its weight, or jumps to a uniformly random node with probability
+    1 - damping (always, from nodes without outgoing edges).
+
+    Parameters:
+    -----------
+    adjacency : scipy.sparse matrix
+        Edge weights, from row to column
+    damping : float, default=PAGERANK_DAMPING
+        Probability of following an edge
+    tol : float, default=GRAPH_TOLERANCE
+        Stop once the L1 change of the scores is below this
+    max_iter : int, default=GRAPH_MAX_ITER
+        Maximum number of iterations
+
+    Returns:
+    --------
+    numpy.ndarray
+        Score of every node, summing to 1
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    # column-stochastic transition matrix, so one step is a single sparse product
+    transition = (sparse.diags(inverse) @ adjacency).T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = rank
+        rank = damping * (transition @ rank + previous[dangling].sum() / n) + (1.0 - damping) / n
+        if np.abs(rank - previous).sum() < tol:
+            break
+    return rank
+
+def hits(adjacency, tol=GRAPH_TOLERANCE, max_iter=GRAPH_MAX_ITER):
+    """
+    Hub and authority scores of a weighted directed graph (HITS) by power iteration.
+
+    A good hub has heavy edges to good authorities and a good authority heavy
+    edges from good hubs; the scores are the principal singular vectors of
+    the adjacency matrix, each normalized to sum to 1.
+
+    Parameters:
+    -----------
+    adjacency : scipy.sparse matrix
+        Edge weights, from row to column
+    tol : float, default=GRAPH_TOLERANCE
+        Stop once the L1 change of the hub scores is below this
+    max_iter : int, default=GRAPH_MAX_ITER
+        Maximum number of iterations
+
+    Returns:
+    --------
+    hubs, authorities : numpy.ndarray
+        Scores of every node (all zero for a graph without edges)
+    """
+    n = adjacency.shape[0]
+    adjacency = adjacency.tocsr()
+    transposed = adjacency.T.tocsr()
+    hub = np.full(n, 1.0 / n) if n else np.zeros(0)
+    authority = np.zeros(n)
+    for _ in range(max_iter):
+        authority = _normalized(transposed @ hub)
+        previous, hub = hub, _normalized(adjacency @ authority)
+        if np.abs(hub - previous).sum() < tol:
+            break
+    return hub, authority
+
+def graph_statistics_from_counts(counts):
+    """
+    Airport graph scores from mergeable flight counts.
+
+    Builds the weighted flight graph as a sparse matrix and derives, per
+    airport, its PageRank, weighted out- and in-degree (flights departing and
+    arriving), HITS hub and authority scores, and per carrier and airport the
+    number of distinct airports the carrier flies to from it and from which
+    it flies into it.
+
+    Parameters:
+    -----------
+    counts : pandas.DataFrame
+        Flight counts from aggregation.count_flights, with UniqueCarrier,
+        Origin and Dest key levels
+
+    Returns:
+    --------
+    dict
+        Score tables keyed by name, indexed by airport or (carrier, airport)
+    """
+    airports, adjacency = flight_graph(counts)
+    hub, authority = hits(adjacency)
+    scores = {
+        'pagerank': pagerank(adjacency),
+        'out_degree': np.asarray(adjacency.sum(axis=1)).ravel(),
+        'in_degree': np.asarray(adjacency.sum(axis=0)).ravel(),
+        'hub_score': hub,
+        'authority_score': authority,
+    }
+    statistics = {name: pd.Series(values, index=airports, name=name) for name, values in scores.items()}
+    statistics['carrier_out_degree'] = _carrier_degree(counts, 'Origin', 'Dest', airports)
+    statistics['carrier_in_degree'] = _carrier_degree(counts, 'Dest', 'Origin', airports)
+    return statistics
+
+def create_graph_features(df, train_data=None, statistics=None, copy=True, features=None):
+    """
+    Add the airport graph scores of both ends of every flight.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Input DataFrame with Origin, Dest and UniqueCarrier
+    train_data : pandas.DataFrame, optional
+        Training data for extracting statistics (for test data transform)
+    statistics : dict, optional
+        Pre-computed tables from fit_graph_statistics (takes precedence over train_data)
+    copy : bool, default=True
+        Work on a copy of df; set to False to add the columns to df in place
+    features : collection of str, optional
+        Only compute these of the function's columns (all by default)
+
+    Returns:
+    --------
+    pandas.DataFrame
+        DataFrame with the graph features added
+    """
+    # Use fitted statistics, provided data or itself as reference
+    if statistics is None:
+        statistics = fit_graph_statistics(train_data if train_data is not None else df)
+    df_out = df.copy() if copy else df
+
+    # airports outside the reference graph have no flights and so no score
+    for end in ['Origin', 'Dest']:
+        for score in AIRPORT_SCORES:
+            col = f'{end.lower()}_{score}'
+            if requested(features, col):
+                df_out[col] = lookup(df_out, [end], statistics[score], 0.0)
+
+    # distinct airports the flight's carrier connects its origin to, and its destination from
+    if requested(features, 'origin_carrier_degree'):
+        df_out['origin_carrier_degree'] = lookup(df_out, ['UniqueCarrier', 'Origin'],
+                                                 statistics['carrier_out_degree'], 0)
+    if requested(features, 'dest_carrier_degree'):
+        df_out['dest_carrier_degree'] = lookup(df_out, ['UniqueCarrier', 'Dest'],
+                                               statistics['carrier_in_degree'], 0)
+
+    return df_out
+
+def _observed_level(index, name):
+    """Sorted distinct non-missing values of one level of a count table's MultiIndex."""
+    i = index.names.index(name)
+    codes = np.asarray(index.codes[i])
+    return index.levels[i][np.unique(codes[codes >= 0])].sort_values()
+
+def _positions(index, name, level):
+    """Position in level of every row's value of one MultiIndex level (-1 if missing or not in level)."""
+    i = index.names.index(name)
+    # remap the (few) level values once, then gather by code; code -1 (missing) hits the appended -1
+    return np.append(level.get_indexer(index.levels[i]), -1)[index.codes[i]]
+
+def _normalized(values):
+    """values scaled to sum to 1 (unchanged if they sum to 0)."""
+    total = values.sum()
+    return values / total if total > 0 else values
+
+def _carrier_degree(counts, end, other, airports):
+    """Distinct other-end airports per (carrier, end airport), from a sparse carrier-airport by airport indicator."""
+    index = counts.index
+    carriers = _observed_level(index, 'UniqueCarrier')
+    carrier = _positions(index, 'UniqueCarrier', carriers)
+    rows, cols = _positions(index, end, airports), _positions(index, other, airports)
+    known = (carrier >= 0) & (rows >= 0) & (cols >= 0)
+    indicator = sparse.csr_matrix(
+        (np.ones(known.sum()), (carrier[known] * len(airports) + rows[known], cols[known])),
+        shape=(len(carriers) * len(airports), len(airports)),
+    )
+    # the conversion sums duplicate entries, so every stored entry is one distinct (carrier, end, other) triple
+    degree = np.diff(indicator.indptr).astype(np.int64)
+    served = np.flatnonzero(degree)
+    index = pd.MultiIndex.from_arrays([carriers[served // len(airports)], airports[served % len(airports)]],
+                                      names=['UniqueCarrier', end])
+    return pd.Series(degree[served], index=index, name=None)
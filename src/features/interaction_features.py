@@ -3,7 +3,70 @@
 import pandas as pd
 import numpy as np
 
-def create_interaction_features(df):
+from .aggregation import count_flights
+from .projection import requested
+
+# Define northern hubs (this is a simplified approach)
+NORTHERN_HUBS = ['ORD', 'DTW', 'MSP', 'BOS', 'JFK', 'LGA', 'EWR', 'CLE', 'PIT', 'SEA']
+WINTER_MONTHS = [11, 12, 1, 2, 3]  # Nov-Mar
+
+def _row_weighted_mean(rates, counts):
+    """Mean of a per-key rate over the rows it is mapped to, skipping keys without a rate."""
+    known = rates.notna()
+    return (rates[known] * counts[known]).sum() / counts[known].sum()
+
+def fit_interaction_statistics(reference_data):
+    """
+    Compute the reference means used by the high risk combination feature.
+    
+    Parameters:
+    -----------
+    reference_data : pandas.DataFrame
+        Training data, either with the delay-rate features already added or
+        with the raw dep_delayed_15min target to derive them from
+        
+    Returns:
+    --------
+    dict
+        Mean of each per-row delay-rate feature over the reference rows
+    """
+    statistics = {}
+    
+    if 'carrier_delay_rate' in reference_data.columns:
+        statistics['carrier_delay_rate_mean'] = reference_data['carrier_delay_rate'].mean()
+    elif 'dep_delayed_15min' in reference_data.columns:
+        statistics.update(interaction_statistics_from_counts(count_flights(reference_data, ['UniqueCarrier'])))
+    
+    if 'route_delay_rate' in reference_data.columns:
+        statistics['route_delay_rate_mean'] = reference_data['route_delay_rate'].mean()
+    
+    return statistics
+
+def interaction_statistics_from_counts(counts):
+    """
+    Reference means of fit_interaction_statistics derivable from the raw target, from mergeable flight counts.
+    
+    Parameters:
+    -----------
+    counts : pandas.DataFrame
+        Flight counts from aggregation.count_flights, indexed by (at least)
+        UniqueCarrier
+        
+    Returns:
+    --------
+    dict
+        Mean of each per-row delay-rate feature over the reference rows
+    """
+    statistics = {}
+    
+    if 'labelled' in counts.columns:
+        # mean over the rows of the per-row value create_carrier_features maps from the carrier delay rates
+        sums = counts[['flights', 'delays', 'labelled']].groupby(level='UniqueCarrier').sum()
+        statistics['carrier_delay_rate_mean'] = _row_weighted_mean(sums['delays'] / sums['labelled'], sums['flights'])
+    
+    return statistics
+
+def create_interaction_features(df, statistics=None, copy=True, features=None):
     """
     Create interaction features based on EDA insights.
     
@@ -11,62 +74,72 @@ def create_interaction_features(df):
     -----------
     df : pandas.DataFrame
         Input DataFrame with existing features
+    statistics : dict, optional
+        Reference means from fit_interaction_statistics (defaults to the means of df itself)
+    copy : bool, default=True
+        Work on a copy of df; set to False to add the columns to df in place
+    features : collection of str, optional
+        Only compute these of the function's columns (all by default)
         
     Returns:
     --------
     pandas.DataFrame
         DataFrame with interaction features added
     """
-    df_out = df.copy()
+    if statistics is None:
+        statistics = fit_interaction_statistics(df)
+    df_out = df.copy() if copy else df
     
     # Hub-to-hub flights
-    if 'origin_is_hub' in df_out.columns and 'dest_is_hub' in df_out.columns:
+    if 'origin_is_hub' in df_out.columns and 'dest_is_hub' in df_out.columns and requested(features, 'hub_to_hub'):
         df_out['hub_to_hub'] = df_out['origin_is_hub'] * df_out['dest_is_hub']
     
     # Peak travel season on weekend
-    if 'is_weekend' in df_out.columns and 'is_peak_travel_season' in df_out.columns:
+    if ('is_weekend' in df_out.columns and 'is_peak_travel_season' in df_out.columns
+            and requested(features, 'peak_weekend')):
         df_out['peak_weekend'] = df_out['is_weekend'] * df_out['is_peak_travel_season']
     
     # Evening flights on weekend
-    if 'time_period' in df_out.columns and 'is_weekend' in df_out.columns:
+    if 'time_period' in df_out.columns and 'is_weekend' in df_out.columns and requested(features, 'evening_weekend'):
         df_out['evening_weekend'] = ((df_out['time_period'] == 'Evening') | 
                                     (df_out['time_period'] == 'Night')).astype(int) * df_out['is_weekend']
     
     # Major carrier at hub airport
-    if 'carrier_size_rank' in df_out.columns and 'origin_is_hub' in df_out.columns:
+    if ('carrier_size_rank' in df_out.columns and 'origin_is_hub' in df_out.columns
+            and requested(features, 'major_carrier_at_hub')):
         df_out['major_carrier_at_hub'] = (df_out['carrier_size_rank'] > 0.8).astype(int) * df_out['origin_is_hub']
     
     # Long distance during peak travel season
-    if 'distance_category' in df_out.columns and 'is_peak_travel_season' in df_out.columns:
+    if ('distance_category' in df_out.columns and 'is_peak_travel_season' in df_out.columns
+            and requested(features, 'long_distance_peak')):
         df_out['long_distance_peak'] = ((df_out['distance_category'] == 'Long') | 
                                       (df_out['distance_category'] == 'Very Long')).astype(int) * df_out['is_peak_travel_season']
     
     # High risk combinations: problematic carrier on problematic route
-    if 'carrier_delay_rate' in df_out.columns and 'route_delay_rate' in df_out.columns:
-        carrier_mean = df_out['carrier_delay_rate'].mean()
-        route_mean = df_out['route_delay_rate'].mean()
+    if ('carrier_delay_rate' in df_out.columns and 'route_delay_rate' in df_out.columns
+            and requested(features, 'high_risk_combo')):
+        carrier_mean = statistics.get('carrier_delay_rate_mean', df_out['carrier_delay_rate'].mean())
+        route_mean = statistics.get('route_delay_rate_mean', df_out['route_delay_rate'].mean())
         df_out['high_risk_combo'] = ((df_out['carrier_delay_rate'] > carrier_mean) & 
                                     (df_out['route_delay_rate'] > route_mean)).astype(int)
     
     # Morning rush hour (6-9 AM)
     if 'dep_hour' in df_out.columns:
-        df_out['morning_rush'] = df_out['dep_hour'].between(6, 9).astype(int)
+        if requested(features, 'morning_rush'):
+            df_out['morning_rush'] = df_out['dep_hour'].between(6, 9).astype(int)
         
         # Evening rush hour (4-7 PM)
-        df_out['evening_rush'] = df_out['dep_hour'].between(16, 19).astype(int)
+        if requested(features, 'evening_rush'):
+            df_out['evening_rush'] = df_out['dep_hour'].between(16, 19).astype(int)
         
         # Rush hour at busy airport
-        if 'origin_freq_rank' in df_out.columns:
+        if 'origin_freq_rank' in df_out.columns and requested(features, 'rush_at_busy_airport'):
             df_out['rush_at_busy_airport'] = (df_out['morning_rush'] | df_out['evening_rush']).astype(int) * (df_out['origin_freq_rank'] > 0.8).astype(int)
     
     # Weather risk: winter months in northern hubs
-    if 'Month' in df_out.columns and 'Origin' in df_out.columns:
-        # Define northern hubs (this is a simplified approach)
-        northern_hubs = ['ORD', 'DTW', 'MSP', 'BOS', 'JFK', 'LGA', 'EWR', 'CLE', 'PIT', 'SEA']
-        winter_months = [11, 12, 1, 2, 3]  # Nov-Mar
-        
-        df_out['winter_in_north'] = ((df_out['Month'].isin(winter_months)) & 
-                                    (df_out['Origin'].isin(northern_hubs))).astype(int)
+    if 'Month' in df_out.columns and 'Origin' in df_out.columns and requested(features, 'winter_in_north'):
+        df_out['winter_in_north'] = ((df_out['Month'].isin(WINTER_MONTHS)) & 
+                                    (df_out['Origin'].isin(NORTHERN_HUBS))).astype(int)
     
     # Departure delay risk score - combining multiple risk factors
     risk_factors = []
@@ -74,7 +147,7 @@ def create_interaction_features(df):
         if col in df_out.columns:
             risk_factors.append(col)
     
-    if risk_factors:
+    if risk_factors and requested(features, 'delay_risk_score'):
         df_out['delay_risk_score'] = df_out[risk_factors].sum(axis=1)
     
     return df_out
\ No newline at end of file
@@ -0,0 +1,172 @@
+# src/features/lookup.py
+
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# largest dense table (number of cells) before falling back to a sorted search
+MAX_DENSE_CELLS = 2 ** 24
+
+# KeyLookup of every (table, default) resolved by lookup, kept until the table is garbage collected
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+class KeyLookup:
+    """
+    Vectorized lookup of a (multi-)key statistics table.
+
+    Every key level is integer-coded once against the table's index levels, so
+    resolving a batch of rows is a handful of `get_indexer` calls followed by a
+    single gather into a dense NumPy array (or a `searchsorted` over the sorted
+    flat codes when the dense array would be too large).
+
+    Parameters:
+    -----------
+    table : pandas.Series
+        Statistic values indexed by an Index or MultiIndex of keys
+    default : scalar, default=np.nan
+        Value returned for keys that are not in the table
+    """
+
+    def __init__(self, table, default=np.nan):
+        index = table.index
+        if isinstance(index, pd.MultiIndex):
+            self.levels = list(index.levels)
+            codes = [np.asarray(c, dtype=np.int64) for c in index.codes]
+        else:
+            self.levels = [index]
+            codes = [np.arange(len(index), dtype=np.int64)]
+
+        self.default = default
+        default_dtype = np.float64 if pd.isna(default) else np.min_scalar_type(default)
+        self.dtype = np.result_type(table.dtype, default_dtype)
+        self.shape = tuple(max(len(level), 1) for level in self.levels)
+        values = np.asarray(table.values, dtype=self.dtype)
+
+        n_cells = int(np.prod(self.shape, dtype=np.float64))
+        self.dense = n_cells <= MAX_DENSE_CELLS
+        if self.dense:
+            self.values = np.full(n_cells, default, dtype=self.dtype)
+            if len(values):
+                self.values[np.ravel_multi_index(codes, self.shape)] = values
+        else:
+            flat = np.ravel_multi_index(codes, self.shape) if len(values) else np.empty(0, dtype=np.int64)
+            order = np.argsort(flat, kind='stable')
+            self.flat_keys = flat[order]
+            self.values = values[order]
+
+    def codes(self, *key_columns):
+        """Integer-code each key column against the table levels (-1 if unseen)."""
+        return [_level_codes(level, col) for level, col in zip(self.levels, key_columns)]
+
+    def __call__(self, *key_columns):
+        """
+        Resolve the statistic for every row.
+
+        Parameters:
+        -----------
+        *key_columns : array-like
+            One column per key level, all of the same length
+
+        Returns:
+        --------
+        numpy.ndarray
+            Looked-up values, with the default for unseen keys
+        """
+        codes = self.codes(*key_columns)
+        n_rows = len(codes[0])
+        found = np.ones(n_rows, dtype=bool)
+        for c in codes:
+            found &= c >= 0
+
+        out = np.full(n_rows, self.default, dtype=self.dtype)
+        if not found.any():
+            return out
+
+        flat = np.ravel_multi_index([c[found] for c in codes], self.shape)
+        if self.dense:
+            out[found] = self.values[flat]
+        else:
+            pos = np.searchsorted(self.flat_keys, flat)
+            pos[pos == len(self.flat_keys)] = 0
+            hit = self.flat_keys[pos] == flat if len(self.flat_keys) else np.zeros(len(flat), dtype=bool)
+            matched = np.flatnonzero(found)[hit]
+            out[matched] = self.values[pos[hit]]
+        return out
+
+def _level_codes(level, col):
+    """Positions of col in level; categoricals are resolved once per category."""
+    if isinstance(getattr(col, 'dtype', None), pd.CategoricalDtype):
+        # append -1 so that missing values (code -1) stay unseen
+        category_codes = np.append(level.get_indexer(col.cat.categories), -1)
+        return category_codes[np.asarray(col.cat.codes)]
+    return level.get_indexer(np.asarray(col))
+
+def route_labels(origin, dest):
+    """
+    Build 'Origin_Dest' route labels as a categorical.
+
+    The string concatenation is done once per distinct pair instead of once per
+    row, and works for both object and categorical airport columns.
+
+    Parameters:
+    -----------
+    origin, dest : pandas.Series
+        Airport codes of each flight
+
+    Returns:
+    --------
+    pandas.Series
+        Categorical route labels aligned with origin
+    """
+    codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([origin, dest]))
+    labels = [f'{o}_{d}' for o, d in pairs]
+    # distinct pairs can only collide if airport codes contain '_'
+    label_codes, categories = pd.factorize(np.asarray(labels, dtype=object))
+    route_codes = np.where(codes >= 0, np.append(label_codes, -1)[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(route_codes, categories=categories), index=origin.index)
+
+def lookup(df, keys, table, default=np.nan):
+    """
+    Map the rows of a DataFrame onto a (multi-)key statistics table.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Rows to resolve
+    keys : list of str
+        Columns of df matching the levels of the table index, in order
+    table : pandas.Series
+        Statistic values indexed by the key columns
+    default : scalar, default=np.nan
+        Value for keys that are not in the table
+
+    Returns:
+    --------
+    pandas.Series
+        Looked-up values aligned with df
+    """
+    values = compiled_lookup(table, default)(*[df[key] for key in keys])
+    return pd.Series(values, index=df.index)
+
+def compiled_lookup(table, default=np.nan):
+    """
+    KeyLookup of table, built on first use and reused while the table is alive.
+
+    Fitted statistics are looked up again for every chunk or request they
+    transform, so the coding of the table index is done once per table rather
+    than once per call. Tables are treated as immutable: a table modified in
+    place keeps resolving to its old values.
+    """
+    key = (id(table), repr(default))
+    entry = _compiled.get(key)
+    if entry is None or entry[0]() is not table:
+        with _compiled_lock:
+            entry = _compiled.get(key)
+            if entry is None or entry[0]() is not table:
+                # the entry goes away with the table, so a later table with the same id is compiled afresh
+                entry = (weakref.ref(table, lambda _, key=key: _compiled.pop(key, None)), KeyLookup(table, default))
+                _compiled[key] = entry
+    return entry[1]
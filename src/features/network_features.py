@@ -3,7 +3,75 @@
 import pandas as pd
 import numpy as np
 
-def create_network_features(df, train_data=None):
+from .aggregation import count_reference_flights
+from .lookup import lookup
+from .projection import requested
+from .ranking import pct_rank
+
+def fit_network_statistics(reference_data):
+    """
+    Compute the traffic and connectivity tables used by create_network_features.
+    
+    The reference data is scanned once into flight counts and the tables are
+    derived from those by network_statistics_from_counts.
+    
+    Parameters:
+    -----------
+    reference_data : pandas.DataFrame
+        Training data to extract network statistics from
+        
+    Returns:
+    --------
+    dict
+        Lookup tables keyed by name, indexed by airport, carrier or route combinations
+    """
+    return network_statistics_from_counts(count_reference_flights(reference_data))
+
+def network_statistics_from_counts(counts):
+    """
+    Traffic and connectivity tables from mergeable flight counts.
+    
+    Parameters:
+    -----------
+    counts : pandas.DataFrame
+        Flight counts from aggregation.count_flights, indexed by
+        (UniqueCarrier, Origin, Dest, dep_hour)
+        
+    Returns:
+    --------
+    dict
+        Lookup tables keyed by name, indexed by airport, carrier or route combinations
+    """
+    statistics = {}
+    flights = counts['flights']
+    
+    # number of departures per airport per hour and per carrier per hour
+    statistics['airport_hourly_traffic'] = flights.groupby(level=['Origin', 'dep_hour']).sum().rename(None)
+    statistics['carrier_hourly'] = flights.groupby(level=['UniqueCarrier', 'dep_hour']).sum().rename(None)
+    # congestion percentile of each airport-hour among the airport's flights
+    hourly_traffic = statistics['airport_hourly_traffic']
+    statistics['origin_congestion_rank'] = pct_rank(hourly_traffic, ['Origin'], weights=hourly_traffic)
+    
+    # number of destinations served from each origin; every key in counts was seen at least once, so distinct destinations come straight from the index
+    keys = counts.index.to_frame(index=False)
+    statistics['origin_connectivity'] = keys.groupby('Origin')['Dest'].nunique()
+    
+    # delay rates by hour at each airport
+    if 'labelled' in counts.columns:
+        sums = counts[['delays', 'labelled']].groupby(level=['Origin', 'dep_hour']).sum()
+        statistics['airport_hourly_delays'] = (sums['delays'] / sums['labelled']).rename('dep_delayed_15min')
+    
+    # flights per route per hour
+    route_hourly = flights.groupby(level=['Origin', 'Dest', 'dep_hour']).sum().rename(None)
+    statistics['route_hourly'] = route_hourly
+    statistics['route_counts'] = route_hourly.groupby(level=['Origin', 'Dest'], observed=True).sum()
+    
+    # congestion percentile of each route-hour among the route's flights (0.5 for single-flight routes)
+    statistics['route_congestion_rank'] = pct_rank(route_hourly, ['Origin', 'Dest'], weights=route_hourly, singleton=0.5)
+    
+    return statistics
+
+def create_network_features(df, train_data=None, statistics=None, copy=True, features=None):
     """
     Create features that capture network effects in flight delays.
     
@@ -13,75 +81,56 @@ def create_network_features(df, train_data=None):
         Input DataFrame with existing features
     train_data : pandas.DataFrame, optional
         Training data for extracting statistics (for test data transform)
+    statistics : dict, optional
+        Pre-computed tables from fit_network_statistics (takes precedence over train_data)
+    copy : bool, default=True
+        Work on a copy of df; set to False to add the columns to df in place
+    features : collection of str, optional
+        Only compute these of the function's columns (all by default)
         
     Returns:
     --------
     pandas.DataFrame
         DataFrame with network effect features added
     """
-    # Use provided data or itself as reference
-    reference_data = train_data if train_data is not None else df
-    df_out = df.copy()
+    # Use fitted statistics, provided data or itself as reference
+    if statistics is None:
+        statistics = fit_network_statistics(train_data if train_data is not None else df)
+    df_out = df.copy() if copy else df
     
     # 1. Airport congestion features
     # Calculate number of departures per airport per hour
-    if 'dep_hour' in reference_data.columns:
-        # Group by origin and hour
-        airport_hourly_traffic = reference_data.groupby(['Origin', 'dep_hour']).size().reset_index(name='origin_hourly_flights')
-        
-        # Create a dictionary for faster lookups
-        airport_hour_map = dict(zip(zip(airport_hourly_traffic['Origin'], airport_hourly_traffic['dep_hour']), 
-                                 airport_hourly_traffic['origin_hourly_flights']))
-        
-        # Map to dataframe
-        df_out['origin_hourly_flights'] = df_out.apply(
-            lambda x: airport_hour_map.get((x['Origin'], x['dep_hour']), 0), axis=1
+    if 'airport_hourly_traffic' in statistics and requested(features, 'origin_hourly_flights'):
+        df_out['origin_hourly_flights'] = lookup(
+            df_out, ['Origin', 'dep_hour'], statistics['airport_hourly_traffic'], 0
         )
-        
-        # Calculate congestion percentile for each airport-hour combination
-        df_out['origin_congestion_rank'] = df_out.groupby('Origin')['origin_hourly_flights'].transform(
-            lambda x: x.rank(pct=True)
+    
+    # Calculate congestion percentile for each airport-hour combination
+    # (unseen hours at a known airport rank below all its flights, unseen airports are neutral)
+    if 'airport_hourly_traffic' in statistics and requested(features, 'origin_congestion_rank'):
+        origin_rank = lookup(df_out, ['Origin', 'dep_hour'], statistics['origin_congestion_rank'], np.nan)
+        known_origin = df_out['Origin'].isin(statistics['origin_connectivity'].index)
+        df_out['origin_congestion_rank'] = origin_rank.fillna(
+            pd.Series(np.where(known_origin, 0.0, 0.5), index=df_out.index)
         )
     
     # 2. Hub connectivity
     # Number of destinations served from each origin
-    origin_connectivity = reference_data.groupby('Origin')['Dest'].nunique().reset_index(name='origin_num_connections')
-    df_out = pd.merge(df_out, origin_connectivity, on='Origin', how='left')
+    if requested(features, 'origin_num_connections'):
+        df_out['origin_num_connections'] = lookup(df_out, ['Origin'], statistics['origin_connectivity'])
     
     # 3. Carrier load at time of day
     # Number of flights by carrier per hour
-    if 'dep_hour' in reference_data.columns:
-        carrier_hourly = reference_data.groupby(['UniqueCarrier', 'dep_hour']).size().reset_index(name='carrier_hourly_flights')
-        
-        # Create mapping
-        carrier_hour_map = dict(zip(zip(carrier_hourly['UniqueCarrier'], carrier_hourly['dep_hour']), 
-                                   carrier_hourly['carrier_hourly_flights']))
-        
-        # Apply mapping
-        df_out['carrier_hourly_flights'] = df_out.apply(
-            lambda x: carrier_hour_map.get((x['UniqueCarrier'], x['dep_hour']), 0), axis=1
+    if 'carrier_hourly' in statistics and requested(features, 'carrier_hourly_flights'):
+        df_out['carrier_hourly_flights'] = lookup(
+            df_out, ['UniqueCarrier', 'dep_hour'], statistics['carrier_hourly'], 0
         )
     
     # 4. Airport delay propagation effect
     # If we have delay information in the reference data
-    if 'dep_delayed_15min' in reference_data.columns:
-        # Convert if needed
-        if reference_data['dep_delayed_15min'].dtype == object:
-            ref_delay = reference_data.copy()
-            ref_delay['dep_delayed_15min'] = ref_delay['dep_delayed_15min'].map({'Y': 1, 'N': 0})
-        else:
-            ref_delay = reference_data
-            
-        # Calculate recent delay rates by hour at each airport
-        airport_hourly_delays = ref_delay.groupby(['Origin', 'dep_hour'])['dep_delayed_15min'].mean().reset_index(name='origin_hour_delay_rate')
-        
-        # Create mapping
-        airport_hour_delay_map = dict(zip(zip(airport_hourly_delays['Origin'], airport_hourly_delays['dep_hour']), 
-                                       airport_hourly_delays['origin_hour_delay_rate']))
-        
-        # Apply mapping
-        df_out['origin_hour_delay_rate'] = df_out.apply(
-            lambda x: airport_hour_delay_map.get((x['Origin'], x['dep_hour']), np.nan), axis=1
+    if 'airport_hourly_delays' in statistics and requested(features, 'origin_hour_delay_rate'):
+        df_out['origin_hour_delay_rate'] = lookup(
+            df_out, ['Origin', 'dep_hour'], statistics['airport_hourly_delays'], np.nan
         )
         
         # Fill missing with overall airport delay rate
@@ -89,22 +138,17 @@ def create_network_features(df, train_data=None):
             df_out['origin_hour_delay_rate'] = df_out['origin_hour_delay_rate'].fillna(df_out['origin_delay_rate'])
     
     # 5. Route congestion
-    route_hourly = reference_data.groupby(['Origin', 'Dest', 'dep_hour']).size().reset_index(name='route_hourly_flights')
-    
-    # Merge this information
-    df_out = pd.merge(
-        df_out,
-        route_hourly,
-        on=['Origin', 'Dest', 'dep_hour'],
-        how='left'
-    )
-    
-    # Fill NAs with 0
-    df_out['route_hourly_flights'] = df_out['route_hourly_flights'].fillna(0)
+    if requested(features, 'route_hourly_flights'):
+        df_out['route_hourly_flights'] = lookup(
+            df_out, ['Origin', 'Dest', 'dep_hour'], statistics['route_hourly'], 0
+        )
     
-    # Calculate route congestion rank
-    df_out['route_congestion_rank'] = df_out.groupby(['Origin', 'Dest'])['route_hourly_flights'].transform(
-        lambda x: x.rank(pct=True) if len(x) > 1 else 0.5
-    )
+    # Calculate route congestion rank (same fallbacks as the airport congestion rank)
+    if requested(features, 'route_congestion_rank'):
+        route_rank = lookup(df_out, ['Origin', 'Dest', 'dep_hour'], statistics['route_congestion_rank'], np.nan)
+        known_route = lookup(df_out, ['Origin', 'Dest'], statistics['route_counts'], 0) > 0
+        df_out['route_congestion_rank'] = route_rank.fillna(
+            pd.Series(np.where(known_route, 0.0, 0.5), index=df_out.index)
+        )
     
-    return df_out
\ No newline at end of file
+    return df_out
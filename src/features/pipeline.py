@@ -0,0 +1,301 @@
+# src/features/pipeline.py
+
+import logging
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+from joblib import effective_n_jobs
+
+from .profiling import profiled
+from .projection import requested
+from .temporal_features import create_temporal_features
+from .spatial_features import create_airport_features
+from .carrier_features import create_carrier_features
+from .cyclical_features import create_cyclical_features
+from .interaction_features import create_interaction_features
+from .network_features import create_network_features
+from .graph_features import AIRPORT_SCORES, create_graph_features
+from .congestion_features import (CONGESTION_KEYS, CONGESTION_TIME_COLUMNS, CONGESTION_WINDOWS, congestion_column,
+                                  congestion_columns, create_congestion_features)
+
+logger = logging.getLogger(__name__)
+
+# a feature stage: func(df, statistics, features) appends the requested outputs to df
+# in place; bump version whenever the stage's output changes so cached results are
+# invalidated. requires maps every output to the columns it is computed from (inputs
+# or earlier outputs of the stage); outputs without an entry need all the inputs
+Stage = namedtuple('Stage', ['name', 'func', 'inputs', 'outputs', 'statistics', 'version', 'requires'],
+                   defaults=(1, None))
+
+def _create_basic_interaction_features(df, statistics=None, features=None):
+    if requested(features, 'hub_to_hub'):
+        df['hub_to_hub'] = df['origin_is_hub'] * df['dest_is_hub']
+    if requested(features, 'peak_weekend'):
+        df['peak_weekend'] = df['is_weekend'] * df['is_peak_travel_season']
+    return df
+
+# day table columns of the temporal stage, all looked up from the date
+_DAY_REQUIRES = {col: ('Month', 'DayofMonth') for col in
+                 ['season', 'month_day', 'is_holiday', 'is_peak_travel_season', 'days_to_holiday']}
+
+# statistics entries built from the data being transformed rather than fitted (the
+# departure schedule of a file transformed in chunks); they grow with the number of
+# flights, so are never saved in the store, and hashing them for every chunk would
+# cost more than the stages reading them, so those stages are not cached
+TRANSIENT_STATISTICS = {'schedule'}
+
+# every stage of create_features in output column order, with the columns it reads and writes
+FEATURE_STAGES = [
+    Stage('temporal',
+          lambda df, statistics, features: create_temporal_features(df, copy=False, features=features),
+          inputs=('Month', 'DayofMonth', 'DayOfWeek', 'DepTime'),
+          outputs=('dep_hour', 'dep_minute', 'time_period', 'is_weekend', 'season', 'month_day',
+                   'is_holiday', 'is_peak_travel_season', 'days_to_holiday'),
+          statistics=None, version=2,
+          requires={'dep_hour': ('DepTime',), 'dep_minute': ('DepTime',), 'time_period': ('DepTime',),
+                    'is_weekend': ('DayOfWeek',), **_DAY_REQUIRES}),
+    Stage('airport',
+          lambda df, statistics, features: create_airport_features(df, statistics=statistics, copy=False,
+                                                                   features=features),
+          inputs=('Origin', 'Dest', 'Distance'),
+          outputs=('origin_freq_rank', 'dest_freq_rank', 'origin_delay_rate', 'dest_delay_rate',
+                   'origin_is_hub', 'dest_is_hub', 'route', 'route_freq_rank', 'distance_category'),
+          statistics='airport',
+          requires={'origin_freq_rank': ('Origin',), 'dest_freq_rank': ('Dest',), 'origin_delay_rate': ('Origin',),
+                    'dest_delay_rate': ('Dest',), 'origin_is_hub': ('Origin',), 'dest_is_hub': ('Dest',),
+                    'route': ('Origin', 'Dest'), 'route_freq_rank': ('Origin', 'Dest'),
+                    'distance_category': ('Distance',)}),
+    Stage('carrier',
+          lambda df, statistics, features: create_carrier_features(df, statistics=statistics, copy=False,
+                                                                   features=features),
+          inputs=('UniqueCarrier', 'Origin', 'Dest', 'dep_hour'),
+          outputs=('carrier_size_rank', 'carrier_delay_rate', 'carrier_hour_performance', 'route_carrier_count'),
+          statistics='carrier',
+          requires={'carrier_size_rank': ('UniqueCarrier',), 'carrier_delay_rate': ('UniqueCarrier',),
+                    'carrier_hour_performance': ('UniqueCarrier', 'dep_hour'),
+                    'route_carrier_count': ('UniqueCarrier', 'Origin', 'Dest')}),
+    Stage('basic_interaction',
+          _create_basic_interaction_features,
+          inputs=('origin_is_hub', 'dest_is_hub', 'is_weekend', 'is_peak_travel_season'),
+          outputs=('hub_to_hub', 'peak_weekend'),
+          statistics=None,
+          requires={'hub_to_hub': ('origin_is_hub', 'dest_is_hub'),
+                    'peak_weekend': ('is_weekend', 'is_peak_travel_season')}),
+    Stage('cyclical',
+          lambda df, statistics, features: create_cyclical_features(df, copy=False, features=features),
+          inputs=('dep_hour', 'DepTime', 'DayOfWeek', 'Month', 'DayofMonth'),
+          outputs=('dep_hour_sin', 'dep_hour_cos', 'day_of_week_sin', 'day_of_week_cos', 'month_sin',
+                   'month_cos', 'day_of_month_sin', 'day_of_month_cos', 'time_of_day_sin', 'time_of_day_cos'),
+          statistics=None, version=2,
+          requires={'dep_hour_sin': ('dep_hour',), 'dep_hour_cos': ('dep_hour',),
+                    'day_of_week_sin': ('DayOfWeek',), 'day_of_week_cos': ('DayOfWeek',),
+                    'month_sin': ('Month',), 'month_cos': ('Month',),
+                    'day_of_month_sin': ('DayofMonth',), 'day_of_month_cos': ('DayofMonth',),
+                    'time_of_day_sin': ('DepTime',), 'time_of_day_cos': ('DepTime',)}),
+    # create_interaction_features recomputes hub_to_hub and peak_weekend; listing them as
+    # inputs keeps them owned by basic_interaction when the stage runs on its own frame
+    Stage('interaction',
+          lambda df, statistics, features: create_interaction_features(df, statistics=statistics, copy=False,
+                                                                       features=features),
+          inputs=('hub_to_hub', 'peak_weekend', 'origin_is_hub', 'dest_is_hub', 'is_weekend', 'is_peak_travel_season', 'time_period',
+                  'carrier_size_rank', 'distance_category', 'carrier_delay_rate', 'route_delay_rate',
+                  'dep_hour', 'origin_freq_rank', 'Month', 'Origin'),
+          outputs=('evening_weekend', 'major_carrier_at_hub', 'long_distance_peak', 'high_risk_combo',
+                   'morning_rush', 'evening_rush', 'rush_at_busy_airport', 'winter_in_north', 'delay_risk_score'),
+          statistics='interaction',
+          requires={'evening_weekend': ('time_period', 'is_weekend'),
+                    'major_carrier_at_hub': ('carrier_size_rank', 'origin_is_hub'),
+                    'long_distance_peak': ('distance_category', 'is_peak_travel_season'),
+                    'high_risk_combo': ('carrier_delay_rate', 'route_delay_rate'),
+                    'morning_rush': ('dep_hour',), 'evening_rush': ('dep_hour',),
+                    'rush_at_busy_airport': ('dep_hour', 'morning_rush', 'evening_rush', 'origin_freq_rank'),
+                    'winter_in_north': ('Month', 'Origin'),
+                    'delay_risk_score': ('high_risk_combo', 'rush_at_busy_airport', 'winter_in_north', 'peak_weekend')}),
+    Stage('network',
+          lambda df, statistics, features: create_network_features(df, statistics=statistics, copy=False,
+                                                                   features=features),
+          inputs=('Origin', 'Dest', 'UniqueCarrier', 'dep_hour', 'origin_delay_rate'),
+          outputs=('origin_hourly_flights', 'origin_congestion_rank', 'origin_num_connections',
+                   'carrier_hourly_flights', 'origin_hour_delay_rate', 'route_hourly_flights',
+                   'route_congestion_rank'),
+          statistics='network',
+          requires={'origin_hourly_flights': ('Origin', 'dep_hour'), 'origin_congestion_rank': ('Origin', 'dep_hour'),
+                    'origin_num_connections': ('Origin',), 'carrier_hourly_flights': ('UniqueCarrier', 'dep_hour'),
+                    'origin_hour_delay_rate': ('Origin', 'dep_hour', 'origin_delay_rate'),
+                    'route_hourly_flights': ('Origin', 'Dest', 'dep_hour'),
+                    'route_congestion_rank': ('Origin', 'Dest', 'dep_hour')}),
+    Stage('graph',
+          lambda df, statistics, features: create_graph_features(df, statistics=statistics, copy=False,
+                                                                 features=features),
+          inputs=('Origin', 'Dest', 'UniqueCarrier'),
+          outputs=tuple(f'{end}_{score}' for end in ['origin', 'dest'] for score in AIRPORT_SCORES)
+                  + ('origin_carrier_degree', 'dest_carrier_degree'),
+          statistics='graph',
+          requires={**{f'origin_{score}': ('Origin',) for score in AIRPORT_SCORES},
+                    **{f'dest_{score}': ('Dest',) for score in AIRPORT_SCORES},
+                    'origin_carrier_degree': ('UniqueCarrier', 'Origin'),
+                    'dest_carrier_degree': ('UniqueCarrier', 'Dest')}),
+    # counted within the frame's own departures, or those of the whole file it is a chunk of
+    Stage('congestion',
+          lambda df, statistics, features: create_congestion_features(df, schedule=statistics, copy=False,
+                                                                      features=features),
+          inputs=('Origin', 'Dest', 'UniqueCarrier') + CONGESTION_TIME_COLUMNS,
+          outputs=tuple(congestion_columns()),
+          statistics='schedule', version=2,
+          requires={congestion_column(name, window): keys + CONGESTION_TIME_COLUMNS
+                    for name, keys in CONGESTION_KEYS.items() for window in CONGESTION_WINDOWS}),
+]
+
+def project_stages(features, stages=FEATURE_STAGES):
+    """
+    The stages needed to compute features, each narrowed to the outputs needed.
+
+    Walks the declared dependencies backwards from the requested columns: a
+    stage is kept only if one of its outputs is requested or read by a later
+    kept output, and its outputs and inputs are cut down to those. Columns no
+    stage produces (e.g. raw columns) are left for the caller to check.
+
+    Parameters:
+    -----------
+    features : collection of str
+        Columns wanted in the output
+    stages : list of Stage, default=FEATURE_STAGES
+        Stages in output column order
+
+    Returns:
+    --------
+    list of Stage
+        Narrowed stages in the original order (their outputs include the
+        intermediate columns later stages need)
+    """
+    needed = set(features)
+    projected = []
+    for stage in reversed(stages):
+        requires = stage.requires or {}
+        outputs = set()
+        pending = [col for col in stage.outputs if col in needed]
+        # outputs may be computed from earlier outputs of the same stage
+        while pending:
+            col = pending.pop()
+            if col in outputs:
+                continue
+            outputs.add(col)
+            pending.extend(dep for dep in requires.get(col, stage.inputs) if dep in stage.outputs)
+        if not outputs:
+            continue
+        inputs = {dep for col in outputs for dep in requires.get(col, stage.inputs)} - set(stage.outputs)
+        needed |= inputs
+        projected.append(stage._replace(inputs=tuple(col for col in stage.inputs if col in inputs),
+                                        outputs=tuple(col for col in stage.outputs if col in outputs)))
+    return projected[::-1]
+
+def stage_dependencies(stages=FEATURE_STAGES):
+    """Map each stage name to the names of the earlier stages producing one of its inputs."""
+    producers = {}
+    dependencies = {}
+    for stage in stages:
+        dependencies[stage.name] = {producers[col] for col in stage.inputs if col in producers}
+        for col in stage.outputs:
+            producers.setdefault(col, stage.name)
+    return dependencies
+
+def run_stages(df, statistics, stages=FEATURE_STAGES, n_jobs=1, cache=None, profiler=None):
+    """
+    Run feature stages on df, appending their columns in place.
+
+    With n_jobs=1 the stages run one after another on df. Otherwise every stage
+    gets a shallow frame of just its input columns and is submitted to a thread
+    pool as soon as the stages it depends on have finished, so independent stages
+    (e.g. temporal and airport, or cyclical, carrier and basic interactions) run
+    concurrently; the heavy lifting happens in NumPy and pandas kernels that
+    release the GIL. The new columns are then appended in stage order, so the
+    result is identical to the sequential run.
+
+    With a cache, a stage whose inputs and fitted statistics were seen before
+    loads its columns from disk instead of running. Stages that would fit their
+    statistics on df itself, or read TRANSIENT_STATISTICS, are never cached.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Flight data after convert_data_types
+    statistics : dict
+        Reference statistics per stage (FeatureStore.statistics); missing entries
+        make that stage use df itself as reference
+    stages : list of Stage, default=FEATURE_STAGES
+        Stages in output column order
+    n_jobs : int, default=1
+        Number of stages run at the same time (-1 for all cores, as in joblib)
+    cache : StageCache, optional
+        Cache of stage outputs to reuse and fill
+    profiler : PipelineProfiler, optional
+        Record the time, memory and columns added of every stage
+
+    Returns:
+    --------
+    pandas.DataFrame
+        df with the stage outputs added
+    """
+    n_jobs = effective_n_jobs(n_jobs)
+    column_hashes = {}
+    if n_jobs == 1:
+        for stage in stages:
+            # a stage that runs appends to df itself; only cached columns still need adding
+            added = _run_stage(stage, df, statistics.get(stage.statistics), cache, column_hashes, profiler)
+            for col, values in added.items():
+                if col not in df.columns:
+                    df[col] = values
+        return df
+
+    dependencies = stage_dependencies(stages)
+    columns = {col: df[col] for col in df.columns}
+    results = {}
+    pending = {}
+    waiting = list(stages)
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        while waiting or pending:
+            for stage in [stage for stage in waiting if dependencies[stage.name] <= results.keys()]:
+                waiting.remove(stage)
+                stage_statistics = statistics.get(stage.statistics)
+                # without fitted statistics the stage fits on the frame itself, so it sees every column
+                names = stage.inputs if stage.statistics is None or stage_statistics is not None else columns
+                frame = pd.DataFrame({col: columns[col] for col in names if col in columns}, copy=False)
+                future = pool.submit(_run_stage, stage, frame, stage_statistics, cache, column_hashes, profiler)
+                pending[future] = stage
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = pending.pop(future)
+                results[stage.name] = future.result()
+                columns.update(results[stage.name])
+
+    for stage in stages:
+        for col, values in results[stage.name].items():
+            df[col] = values
+    return df
+
+def _cache_key(cache, stage, df, statistics, column_hashes):
+    """Cache key for running stage on df, or None when the stage is not cacheable."""
+    if cache is None or stage.statistics in TRANSIENT_STATISTICS:
+        return None
+    if stage.statistics is not None and statistics is None:
+        return None
+    return cache.key(stage, df, statistics, column_hashes)
+
+def _run_stage(stage, frame, statistics, cache, column_hashes, profiler):
+    """Columns a stage adds to its input frame, from the cache if possible."""
+    with profiled(profiler, stage.name, len(frame)) as record:
+        key = _cache_key(cache, stage, frame, statistics, column_hashes)
+        added = cache.load(key, frame.index) if key is not None else None
+        if added is not None:
+            logger.info("Loading cached %s features", stage.name)
+            record['cached'] = True
+        else:
+            logger.info("Creating %s features", stage.name)
+            inputs = set(frame.columns)
+            frame = stage.func(frame, statistics, stage.outputs)
+            added = {col: frame[col] for col in frame.columns if col not in inputs}
+            if key is not None:
+                cache.save(key, added)
+        record['columns_added'] = list(added)
+    return added
@@ -0,0 +1,5 @@
+# src/features/projection.py
+
+def requested(features, column):
+    """Whether a feature function asked for only `features` (None for all of them) should compute column."""
+    return features is None or column in features
@@ -0,0 +1,81 @@
+# src/features/ranking.py
+
+import numpy as np
+import pandas as pd
+
+def pct_rank(values, groups=None, weights=None, singleton=None):
+    """
+    Percentile rank of every value within its group, with one sort.
+
+    Same result as values.rank(pct=True) (or groupby(level=groups).rank(pct=True))
+    with ties getting the average rank, and missing values left missing. With
+    weights, each value stands for that many tied rows, so ranking a table of
+    counts weighted by the counts equals ranking the rows they were counted
+    from, without expanding them.
+
+    The values are sorted once by group and value (np.lexsort over the index
+    level codes); group sizes, ties and the rows below each run of ties then
+    come from a cumulative sum of the weights.
+
+    Parameters:
+    -----------
+    values : pandas.Series
+        Values to rank
+    groups : list of str, optional
+        Index levels the ranks are computed within (all values form one group by default)
+    weights : array-like, optional
+        Number of rows each value stands for (1 by default)
+    singleton : float, optional
+        Rank given to groups standing for a single row (instead of 1.0)
+
+    Returns:
+    --------
+    pandas.Series
+        Ranks in (0, 1], indexed like values
+    """
+    ranked = np.asarray(values, dtype=np.float64)
+    weights = np.ones(len(ranked)) if weights is None else np.asarray(weights, dtype=np.float64)
+    keys = [_level_codes(values.index, level) for level in groups or []]
+
+    out = np.full(len(ranked), np.nan)
+    valid = np.flatnonzero(~np.isnan(ranked))
+    if len(valid) == 0:
+        return pd.Series(out, index=values.index, name=values.name)
+    # np.lexsort sorts by the last key first
+    order = valid[np.lexsort([ranked[valid]] + [key[valid] for key in reversed(keys)])]
+    sorted_values = ranked[order]
+    sorted_weights = weights[order]
+
+    new_group = np.zeros(len(order), dtype=bool)
+    new_group[0] = True
+    for key in keys:
+        sorted_key = key[order]
+        new_group[1:] |= sorted_key[1:] != sorted_key[:-1]
+    new_run = new_group.copy()
+    new_run[1:] |= sorted_values[1:] != sorted_values[:-1]
+
+    # rows up to and including each position, and before each group and run
+    cumulative = np.cumsum(sorted_weights)
+    before = cumulative - sorted_weights
+    group_starts = np.flatnonzero(new_group)
+    group_ends = np.append(group_starts[1:], len(order)) - 1
+    run_starts = np.flatnonzero(new_run)
+    run_ends = np.append(run_starts[1:], len(order)) - 1
+    run_group = np.cumsum(new_group)[run_starts] - 1
+
+    group_size = (cumulative[group_ends] - before[group_starts])[run_group]
+    tied = cumulative[run_ends] - before[run_starts]
+    below = before[run_starts] - before[group_starts][run_group]
+    # average rank of the tied rows, as in rank(method='average', pct=True)
+    run_rank = (below + (tied + 1) / 2) / group_size
+    if singleton is not None:
+        run_rank[group_size == 1] = singleton
+
+    out[order] = np.repeat(run_rank, run_ends - run_starts + 1)
+    return pd.Series(out, index=values.index, name=values.name)
+
+def _level_codes(index, level):
+    """Integer codes of an index level (equal codes for equal keys)."""
+    if isinstance(index, pd.MultiIndex):
+        return np.asarray(index.codes[index.names.index(level)], dtype=np.int64)
+    return pd.factorize(index)[0]
@@ -0,0 +1,658 @@
+# src/features/runtime.py
+
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+# only NumPy is imported up front: loading a runtime and transforming with it never
+# touches pandas, which (with the feature modules) is imported lazily by
+# compile_runtime and by the fallbacks for values outside the precomputed tables
+
+logger = logging.getLogger(__name__)
+
+# file of the compiled transform, saved next to the model it was compiled for
+RUNTIME_EXTENSION = '.runtime.npz'
+
+# dtype of the feature matrix (matrix_io.MATRIX_DTYPE)
+RUNTIME_DTYPE = np.float32
+
+NAN = float('nan')
+
+# fitted lookup tables used by the runtime: statistics module, table name, the
+# feature looked up from it (None for tables only used by other features), its key
+# columns and the value of unseen keys, as passed to lookup by the feature modules
+RUNTIME_TABLES = [
+    ('airport', 'origin_ranks', 'origin_freq_rank', ('Origin',), NAN),
+    ('airport', 'dest_ranks', 'dest_freq_rank', ('Dest',), NAN),
+    ('airport', 'origin_delay_rates', 'origin_delay_rate', ('Origin',), NAN),
+    ('airport', 'dest_delay_rates', 'dest_delay_rate', ('Dest',), NAN),
+    ('airport', 'route_ranks', 'route_freq_rank', ('Origin', 'Dest'), NAN),
+    ('carrier', 'carrier_rank', 'carrier_size_rank', ('UniqueCarrier',), NAN),
+    ('carrier', 'carrier_delay_rates', 'carrier_delay_rate', ('UniqueCarrier',), NAN),
+    ('carrier', 'carrier_hour_delay', 'carrier_hour_performance', ('UniqueCarrier', 'dep_hour'), NAN),
+    ('carrier', 'carrier_route_counts', 'route_carrier_count', ('UniqueCarrier', 'Origin', 'Dest'), 0),
+    ('network', 'airport_hourly_traffic', 'origin_hourly_flights', ('Origin', 'dep_hour'), 0),
+    ('network', 'origin_congestion_rank', None, ('Origin', 'dep_hour'), NAN),
+    ('network', 'origin_connectivity', 'origin_num_connections', ('Origin',), NAN),
+    ('network', 'carrier_hourly', 'carrier_hourly_flights', ('UniqueCarrier', 'dep_hour'), 0),
+    ('network', 'airport_hourly_delays', None, ('Origin', 'dep_hour'), NAN),
+    ('network', 'route_hourly', 'route_hourly_flights', ('Origin', 'Dest', 'dep_hour'), 0),
+    ('network', 'route_counts', None, ('Origin', 'Dest'), 0),
+    ('network', 'route_congestion_rank', None, ('Origin', 'Dest', 'dep_hour'), NAN),
+    ('graph', 'pagerank', 'origin_pagerank', ('Origin',), 0.0),
+    ('graph', 'out_degree', 'origin_out_degree', ('Origin',), 0.0),
+    ('graph', 'in_degree', 'origin_in_degree', ('Origin',), 0.0),
+    ('graph', 'hub_score', 'origin_hub_score', ('Origin',), 0.0),
+    ('graph', 'authority_score', 'origin_authority_score', ('Origin',), 0.0),
+    ('graph', 'pagerank', 'dest_pagerank', ('Dest',), 0.0),
+    ('graph', 'out_degree', 'dest_out_degree', ('Dest',), 0.0),
+    ('graph', 'in_degree', 'dest_in_degree', ('Dest',), 0.0),
+    ('graph', 'hub_score', 'dest_hub_score', ('Dest',), 0.0),
+    ('graph', 'authority_score', 'dest_authority_score', ('Dest',), 0.0),
+    ('graph', 'carrier_out_degree', 'origin_carrier_degree', ('UniqueCarrier', 'Origin'), 0),
+    ('graph', 'carrier_in_degree', 'dest_carrier_degree', ('UniqueCarrier', 'Dest'), 0),
+]
+
+# vocabulary the values of every key column are looked up in
+KEY_VOCABULARIES = {'Origin': 'airport', 'Dest': 'airport', 'UniqueCarrier': 'carrier', 'dep_hour': 'hour'}
+
+# largest table (number of key combinations) looked up by a gather instead of a binary search
+MAX_DENSE_CELLS = 2 ** 20
+
+# statistics modules the runtime cannot do without when the layout has one of their features
+REQUIRED_MODULES = ['airport', 'carrier', 'network', 'graph']
+
+def runtime_file(model_path):
+    """Path of the compiled transform saved next to a model."""
+    return os.path.splitext(str(model_path))[0] + RUNTIME_EXTENSION
+
+def compile_runtime(store, layout):
+    """
+    Compile a fitted feature store and a matrix layout into a FeatureRuntime.
+
+    Every string key (airport, carrier) is replaced by its position in one
+    sorted vocabulary, so each fitted table becomes a sorted array of integer
+    keys with a value array, and every categorical output a code table over
+    the vocabulary, the day slots or the departure hours. Compiling needs
+    pandas and the feature modules; the result does not.
+
+    Parameters:
+    -----------
+    store : FeatureStore
+        Fitted reference statistics
+    layout : dict
+        Feature matrix layout (columns and categories), e.g. the .features.json
+        saved next to a model
+
+    Returns:
+    --------
+    FeatureRuntime
+        Transform producing the feature matrix of the layout from raw columns
+    """
+    import pandas as pd
+
+    from .calendar_table import DAY_SLOTS, MONTH_SLOTS, default_calendar
+    from .congestion_features import CONGESTION_KEYS, CONGESTION_WINDOWS, MINUTES_PER_DAY, congestion_column
+    from .cyclical_features import CYCLICAL_ENCODINGS, cyclical_tables
+    from .interaction_features import NORTHERN_HUBS, WINTER_MONTHS
+    from .pipeline import FEATURE_STAGES
+    from .spatial_features import DISTANCE_BINS, DISTANCE_LABELS
+    from .temporal_features import DAY_COLUMNS, TIME_PERIOD_BINS, TIME_PERIOD_LABELS
+
+    if store is None or not store.is_fitted:
+        raise ValueError("compile_runtime needs a fitted feature store")
+    columns = list(layout['columns'])
+    categories = {col: list(values) for col, values in layout.get('categories', {}).items()}
+    statistics = store.statistics
+    stage_modules = {col: stage.statistics for stage in FEATURE_STAGES for col in stage.outputs}
+    missing = sorted({stage_modules[col] for col in columns if stage_modules.get(col) in REQUIRED_MODULES
+                      and stage_modules[col] not in statistics})
+    if missing:
+        raise ValueError(f"The feature store has no {missing} statistics for the features of the layout")
+    congestion_columns = {congestion_column(name, window): [name, window]
+                          for name in CONGESTION_KEYS for window in CONGESTION_WINDOWS}
+    unsupported = [col for col in columns if col in stage_modules and col not in congestion_columns
+                   and col not in _FEATURES and col not in _TABLE_FEATURES]
+    if unsupported:
+        raise ValueError(f"Features {unsupported} are not supported by the runtime")
+
+    # one entry per fitted table; optional tables the store was fitted without are left out
+    tables = {}
+    for module, name, _, keys, default in RUNTIME_TABLES:
+        if name in statistics.get(module, {}):
+            tables[name] = (statistics[module][name], [KEY_VOCABULARIES[key] for key in keys], default)
+
+    # a route label can only be split into its airports at a '_', and at any '_' if codes contain one
+    route_pairs = [(label[:i], label[i + 1:], code) for code, label in enumerate(categories.get('route', []))
+                   for i, char in enumerate(label) if char == '_']
+
+    # every value a table, flag or category of an airport or carrier can match
+    def observed(values):
+        values = pd.Index(values)
+        return {str(value) for value in values[values.notna()].unique()}
+
+    vocabularies = {'airport': set(NORTHERN_HUBS), 'carrier': set()}
+    for table, levels, _ in tables.values():
+        for i, kind in enumerate(levels):
+            if kind in vocabularies:
+                vocabularies[kind] |= observed(table.index.get_level_values(i))
+    for name in ['top_origins', 'top_dests']:
+        vocabularies['airport'] |= observed(statistics['airport'][name])
+    vocabularies['airport'] |= {airport for origin, dest, _ in route_pairs for airport in (origin, dest)}
+    vocabularies = {kind: np.array(sorted(values), dtype=str) for kind, values in vocabularies.items()}
+
+    # departure hours past every tabulated one can match nothing
+    hours = TIME_PERIOD_BINS[-1] + 1
+    for table, levels, _ in tables.values():
+        if 'hour' in levels and len(table):
+            hours = max(hours, int(np.nanmax(table.index.get_level_values(levels.index('hour')))) + 1)
+    sizes = {'airport': len(vocabularies['airport']), 'carrier': len(vocabularies['carrier']), 'hour': hours}
+
+    def positions(kind, values):
+        if kind == 'hour':
+            return _int_positions(values, hours)
+        return _string_positions(vocabularies[kind], values)
+
+    def codes_of(col, labels):
+        """Code of every label in the layout categories of col (NaN where it has none)."""
+        index = {value: i for i, value in enumerate(categories.get(col, []))}
+        return np.array([index.get(label, NAN) if isinstance(label, str) else NAN for label in labels],
+                        dtype=np.float64)
+
+    arrays = {f'vocabulary.{kind}': values for kind, values in vocabularies.items()}
+    manifest = {'columns': columns, 'categories': categories, 'sizes': sizes, 'tables': {},
+                'day_slots': DAY_SLOTS, 'month_slots': MONTH_SLOTS}
+
+    def add_table(name, levels, keys, values, default):
+        known = np.logical_and.reduce([key >= 0 for key in keys])
+        flat = np.ravel_multi_index([key[known] for key in keys], [sizes[kind] for kind in levels])
+        order = np.argsort(flat)
+        arrays[f'{name}.keys'] = flat[order].astype(np.int64)
+        arrays[f'{name}.values'] = np.asarray(values, dtype=np.float64)[known][order]
+        manifest['tables'][name] = {'levels': levels, 'default': None if np.isnan(default) else default}
+
+    for name, (table, levels, default) in tables.items():
+        keys = [positions(kind, np.asarray(table.index.get_level_values(i))) for i, kind in enumerate(levels)]
+        add_table(name, levels, keys, table.to_numpy(dtype=np.float64), default)
+    origins, dests, route_codes = (np.array(values) for values in zip(*route_pairs)) if route_pairs else ([], [], [])
+    add_table('route', ['airport', 'airport'], [positions('airport', np.asarray(origins, dtype=str)),
+                                                positions('airport', np.asarray(dests, dtype=str))],
+              route_codes, NAN)
+
+    # raw categorical columns: sorted categories and their layout codes
+    for col, values in categories.items():
+        if col in columns and col not in stage_modules:
+            labels = np.array([str(value) for value in values], dtype=str)
+            order = np.argsort(labels)
+            arrays[f'category.{col}'] = labels[order]
+            arrays[f'category.{col}.codes'] = np.append(order.astype(np.float64), NAN)
+
+    # airport flags, with a trailing slot for airports outside the vocabulary
+    for name, members in [('origin_is_hub', statistics['airport']['top_origins']),
+                          ('dest_is_hub', statistics['airport']['top_dests']),
+                          ('northern_hub', NORTHERN_HUBS)]:
+        arrays[f'flag.{name}'] = np.append(np.isin(vocabularies['airport'], [str(value) for value in members]),
+                                           False)
+
+    # time periods of the departure hours and distance bins, labelled as pd.cut labels them
+    periods = np.asarray(pd.cut(np.arange(hours), bins=TIME_PERIOD_BINS, labels=TIME_PERIOD_LABELS).astype(object))
+    arrays['hour.time_period'] = np.append(codes_of('time_period', periods), NAN)
+    arrays['hour.evening'] = np.append(np.isin(periods, ['Evening', 'Night']), False)
+    arrays['distance.bins'] = np.asarray(DISTANCE_BINS, dtype=np.float64)
+    arrays['distance.category'] = np.append(codes_of('distance_category', DISTANCE_LABELS), NAN)
+    arrays['distance.long'] = np.append(np.isin(DISTANCE_LABELS, ['Long', 'Very Long']), False)
+    arrays['month.winter'] = np.append(np.isin(np.arange(MONTH_SLOTS), WINTER_MONTHS), False)
+
+    # day table, one row per (month, day) slot
+    calendar = default_calendar().table
+    for col in DAY_COLUMNS:
+        if col in categories or calendar[col].dtype == object:
+            arrays[f'day.{col}'] = codes_of(col, calendar[col].tolist())
+        else:
+            arrays[f'day.{col}'] = calendar[col].to_numpy(dtype=np.float64)
+
+    tabulated = cyclical_tables()
+    manifest['cyclical'] = {}
+    for name, source, lowest, _, _ in CYCLICAL_ENCODINGS:
+        _, arrays[f'cyclical.{name}.sin'], arrays[f'cyclical.{name}.cos'] = tabulated[name]
+        manifest['cyclical'][name] = {'source': source, 'lowest': int(lowest)}
+
+    # congestion windows are counted within each transformed batch, so need no tables
+    manifest['congestion'] = {
+        'minutes_per_day': MINUTES_PER_DAY,
+        'keys': {name: list(keys) for name, keys in CONGESTION_KEYS.items()},
+        'columns': {col: spec for col, spec in congestion_columns.items() if col in columns},
+    }
+
+    return FeatureRuntime(arrays, manifest)
+
+class FeatureRuntime:
+    """
+    Apply a fitted feature transform to NumPy arrays, without pandas.
+
+    A runtime is compiled once from a feature store and a model's matrix
+    layout (see compile_runtime) and saved as a single .npz of plain arrays.
+    Loading it needs only NumPy, and transform maps a struct of raw column
+    arrays straight into a preallocated float32 matrix with the columns and
+    category codes of the layout: the same matrix FeatureMatrixEncoder
+    produces from the output of create_features with that store.
+
+    Parameters:
+    -----------
+    arrays : dict
+        Compiled tables, by name
+    manifest : dict
+        Columns, categories, table levels and sizes of the compiled transform
+    """
+
+    def __init__(self, arrays, manifest):
+        self.arrays = arrays
+        self.manifest = manifest
+        self.columns = list(manifest['columns'])
+        self.categories = manifest['categories']
+        self._category_positions = {}
+        self._dense = {}
+
+    @classmethod
+    def load(cls, path):
+        """Load a runtime written by save."""
+        with np.load(path, allow_pickle=False) as payload:
+            arrays = {name: payload[name] for name in payload.files}
+        manifest = json.loads(str(arrays.pop('manifest')))
+        return cls(arrays, manifest)
+
+    def save(self, path):
+        """Write the runtime as a single uncompressed .npz."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, manifest=np.array(json.dumps(self.manifest)), **self.arrays)
+
+    def transform(self, data, out=None):
+        """
+        Feature matrix of a batch of raw flights.
+
+        Parameters:
+        -----------
+        data : dict
+            Array of every raw column (Month, DayofMonth, DayOfWeek, DepTime,
+            UniqueCarrier, Origin, Dest, Distance), all of the same length;
+            the calendar columns may use the "c-" string encoding
+        out : numpy.ndarray, optional
+            Preallocated rows x columns float32 matrix to fill
+
+        Returns:
+        --------
+        numpy.ndarray
+            Row-major float32 matrix in the column order of the layout
+        """
+        batch = _Batch(self, data)
+        shape = (batch.n_rows, len(self.columns))
+        if out is None:
+            out = np.empty(shape, dtype=RUNTIME_DTYPE)
+        elif out.shape != shape or out.dtype != RUNTIME_DTYPE:
+            raise ValueError(f"out must be a {np.dtype(RUNTIME_DTYPE).name} array of shape {shape}")
+        for i, col in enumerate(self.columns):
+            out[:, i] = batch.get(col)
+        return out
+
+    def lookup(self, name, *codes):
+        """Value of every row in a compiled table, from the vocabulary codes of its key levels (-1 if unseen)."""
+        spec = self.manifest['tables'].get(name)
+        n_rows = len(codes[0])
+        if spec is None:
+            # an optional table the store was fitted without: the feature is missing
+            return np.full(n_rows, NAN)
+        sizes = [self.manifest['sizes'][kind] for kind in spec['levels']]
+        flat = np.zeros(n_rows, dtype=np.int64)
+        found = np.ones(n_rows, dtype=bool)
+        for size, code in zip(sizes, codes):
+            found &= code >= 0
+            flat = flat * size + code
+        dense = self._dense_table(name, spec, sizes)
+        if dense is not None:
+            # unseen keys gather the trailing default
+            return dense[np.where(found, flat, -1)]
+        keys, values = self.arrays[f'{name}.keys'], self.arrays[f'{name}.values']
+        out = np.full(n_rows, NAN if spec['default'] is None else spec['default'], dtype=np.float64)
+        if len(keys):
+            position = np.minimum(np.searchsorted(keys, flat), len(keys) - 1)
+            found &= keys[position] == flat
+            out[found] = values[position[found]]
+        return out
+
+    def _dense_table(self, name, spec, sizes):
+        """Values of a small table by flat key with the default appended, built on first use (None for large tables)."""
+        if name not in self._dense:
+            n_cells = int(np.prod(sizes, dtype=np.float64))
+            dense = None
+            if n_cells <= MAX_DENSE_CELLS:
+                dense = np.full(n_cells + 1, NAN if spec['default'] is None else spec['default'], dtype=np.float64)
+                dense[self.arrays[f'{name}.keys']] = self.arrays[f'{name}.values']
+            self._dense[name] = dense
+        return self._dense[name]
+
+    def category_positions(self, col):
+        """Position of every category of col in the layout, by label."""
+        if col not in self._category_positions:
+            self._category_positions[col] = {value: i for i, value in enumerate(self.categories.get(col, []))}
+        return self._category_positions[col]
+
+class _Batch:
+    """Raw columns of one transform call and the features computed from them so far."""
+
+    def __init__(self, runtime, data):
+        self.runtime = runtime
+        self.arrays = runtime.arrays
+        self.manifest = runtime.manifest
+        self.data = data
+        self.values = {}
+        self.n_rows = len(next(iter(data.values()))) if data else 0
+
+    def get(self, col):
+        """Values of a raw column or feature, computed once."""
+        if col not in self.values:
+            if col in _TABLE_FEATURES:
+                name, keys = _TABLE_FEATURES[col]
+                self.values[col] = self.runtime.lookup(name, *[self.key(key) for key in keys])
+            elif col in _FEATURES:
+                self.values[col] = _FEATURES[col](self, col)
+            elif col in self.manifest.get('congestion', {}).get('columns', {}):
+                self.values[col] = _congestion(self, col)
+            else:
+                self.values[col] = self.raw(col)
+        return self.values[col]
+
+    def raw(self, col):
+        """A raw column, as numbers or (for categorical columns of the layout) category codes."""
+        if col not in self.data:
+            raise KeyError(f"Missing raw column {col!r}")
+        values = np.asarray(self.data[col])
+        if f'category.{col}' in self.arrays:
+            return self.arrays[f'category.{col}.codes'][_string_positions(self.arrays[f'category.{col}'], values)]
+        if col in ('Month', 'DayofMonth', 'DayOfWeek'):
+            return _calendar_field(values)
+        return values
+
+    def key(self, col):
+        """Vocabulary positions of the values of a key column (-1 outside the vocabulary)."""
+        name = f'key.{col}'
+        if name not in self.values:
+            kind = KEY_VOCABULARIES[col]
+            if kind == 'hour':
+                self.values[name] = _int_positions(self.get(col), self.manifest['sizes']['hour'])
+            else:
+                self.values[name] = _string_positions(self.arrays[f'vocabulary.{kind}'], self.data[col])
+        return self.values[name]
+
+# features computed from the raw columns and other features of a _Batch, besides
+# the table lookups of RUNTIME_TABLES and the congestion window counts
+
+def _dep_hour(batch, col):
+    return batch.get('DepTime') // 100
+
+def _dep_minute(batch, col):
+    return batch.get('DepTime') % 100
+
+def _hour_table(batch, name):
+    """Entry of a departure hour table for every row (the trailing entry for hours outside it)."""
+    table = batch.arrays[name]
+    return table[_int_positions(batch.get('dep_hour'), len(table) - 1)]
+
+def _time_period(batch, col):
+    return _hour_table(batch, 'hour.time_period')
+
+def _is_weekend(batch, col):
+    return (batch.get('DayOfWeek') >= 6).astype(int)
+
+def _day_columns(batch, col):
+    """Day table columns by slot; dates outside the table are resolved by the calendar itself."""
+    month, day = batch.get('Month'), batch.get('DayofMonth')
+    day_slots, month_slots = batch.manifest['day_slots'], batch.manifest['month_slots']
+    if month.dtype.kind in 'iu' and day.dtype.kind in 'iu':
+        outside = (month < 0) | (month >= month_slots) | (day < 0) | (day >= day_slots)
+        slots = np.where(outside, 0, month.astype(np.int64) * day_slots + day)
+        outside = np.flatnonzero(outside)
+    else:
+        # non-integer dates never hit the table (see Calendar.lookup)
+        slots = np.zeros(len(month), dtype=np.int64)
+        outside = np.arange(len(month))
+    for name in _DAY_COLUMNS:
+        batch.values[name] = batch.arrays[f'day.{name}'][slots]
+    if len(outside):
+        from .calendar_table import default_calendar
+
+        computed = default_calendar().lookup(month[outside], day[outside], _DAY_COLUMNS)
+        for name in _DAY_COLUMNS:
+            values = computed[name]
+            if values.dtype == object:
+                positions = batch.runtime.category_positions(name)
+                values = [positions.get(value, NAN) if isinstance(value, str) else NAN for value in values.tolist()]
+            batch.values[name][outside] = values
+    return batch.values[col]
+
+def _hub(batch, col):
+    return batch.arrays[f'flag.{col}'][batch.key('Origin' if col == 'origin_is_hub' else 'Dest')].astype(int)
+
+def _route(batch, col):
+    return batch.runtime.lookup('route', batch.key('Origin'), batch.key('Dest'))
+
+def _distance_table(batch, name):
+    """Entry of a distance bin table for every row, binned right-inclusive as by pd.cut (the trailing entry outside the bins)."""
+    bins = batch.arrays['distance.bins']
+    position = np.searchsorted(bins, np.asarray(batch.get('Distance'), dtype=np.float64), side='left') - 1
+    return batch.arrays[name][np.where((position >= 0) & (position < len(bins) - 1), position, -1)]
+
+def _distance_category(batch, col):
+    return _distance_table(batch, 'distance.category')
+
+def _hub_to_hub(batch, col):
+    return batch.get('origin_is_hub') * batch.get('dest_is_hub')
+
+def _peak_weekend(batch, col):
+    return batch.get('is_weekend') * batch.get('is_peak_travel_season')
+
+def _cyclical(batch, col):
+    """sin and cos of one cyclical feature, gathered from its tables (computed directly outside them)."""
+    name = col.rsplit('_', 1)[0]
+    spec = batch.manifest['cyclical'][name]
+    values = np.asarray(batch.get(spec['source']))
+    sin, cos = batch.arrays[f'cyclical.{name}.sin'], batch.arrays[f'cyclical.{name}.cos']
+    out_sin, out_cos = np.empty(len(values), dtype=sin.dtype), np.empty(len(values), dtype=cos.dtype)
+    positions = values.astype(np.int64) - spec['lowest'] if values.dtype.kind in 'iu' else None
+    if positions is not None and ((positions >= 0) & (positions < len(sin))).all():
+        np.take(sin, positions, out=out_sin)
+        np.take(cos, positions, out=out_cos)
+    else:
+        from .cyclical_features import CYCLICAL_ENCODINGS, _encode
+
+        angle = {encoding[0]: encoding[4] for encoding in CYCLICAL_ENCODINGS}[name]
+        _encode(values, spec['lowest'], angle, sin, cos, out_sin, out_cos)
+    batch.values[f'{name}_sin'], batch.values[f'{name}_cos'] = out_sin, out_cos
+    return batch.values[col]
+
+def _evening_weekend(batch, col):
+    return _hour_table(batch, 'hour.evening').astype(int) * batch.get('is_weekend')
+
+def _major_carrier_at_hub(batch, col):
+    return (batch.get('carrier_size_rank') > 0.8).astype(int) * batch.get('origin_is_hub')
+
+def _long_distance_peak(batch, col):
+    return _distance_table(batch, 'distance.long').astype(int) * batch.get('is_peak_travel_season')
+
+def _morning_rush(batch, col):
+    hour = batch.get('dep_hour')
+    return ((hour >= 6) & (hour <= 9)).astype(int)
+
+def _evening_rush(batch, col):
+    hour = batch.get('dep_hour')
+    return ((hour >= 16) & (hour <= 19)).astype(int)
+
+def _rush_at_busy_airport(batch, col):
+    rush = batch.get('morning_rush') | batch.get('evening_rush')
+    return rush * (batch.get('origin_freq_rank') > 0.8).astype(int)
+
+def _winter_in_north(batch, col):
+    winter = batch.arrays['month.winter']
+    winter = winter[_int_positions(batch.get('Month'), len(winter) - 1)]
+    return (winter & batch.arrays['flag.northern_hub'][batch.key('Origin')]).astype(int)
+
+def _delay_risk_score(batch, col):
+    # high_risk_combo needs a route delay rate, which no stage creates
+    return batch.get('rush_at_busy_airport') + batch.get('winter_in_north') + batch.get('peak_weekend')
+
+def _origin_congestion_rank(batch, col):
+    # unseen hours at a known airport rank below all its flights, unseen airports are neutral
+    rank = batch.runtime.lookup('origin_congestion_rank', batch.key('Origin'), batch.key('dep_hour'))
+    known = ~np.isnan(batch.runtime.lookup('origin_connectivity', batch.key('Origin')))
+    return np.where(np.isnan(rank), np.where(known, 0.0, 0.5), rank)
+
+def _origin_hour_delay_rate(batch, col):
+    rate = batch.runtime.lookup('airport_hourly_delays', batch.key('Origin'), batch.key('dep_hour'))
+    return np.where(np.isnan(rate), batch.get('origin_delay_rate'), rate)
+
+def _route_congestion_rank(batch, col):
+    rank = batch.runtime.lookup('route_congestion_rank', batch.key('Origin'), batch.key('Dest'),
+                                batch.key('dep_hour'))
+    known = batch.runtime.lookup('route_counts', batch.key('Origin'), batch.key('Dest')) > 0
+    return np.where(np.isnan(rank), np.where(known, 0.0, 0.5), rank)
+
+def _congestion(batch, col):
+    """Other departures of the batch within the windows of every flight, counted as by create_congestion_features."""
+    spec = batch.manifest['congestion']
+    name, _ = spec['columns'][col]
+    windows = {window: column for column, (key_name, window) in spec['columns'].items() if key_name == name}
+    day_slots, month_slots = batch.manifest['day_slots'], batch.manifest['month_slots']
+    minutes_per_day = spec['minutes_per_day']
+
+    month, day, dep_time = (np.asarray(batch.get(key), dtype=np.float64) for key in ('Month', 'DayofMonth', 'DepTime'))
+    valid = np.isfinite(month) & np.isfinite(day) & np.isfinite(dep_time)
+    month, day, dep_time = (np.where(valid, values, 0).astype(np.int64) for values in (month, day, dep_time))
+    valid &= (month >= 0) & (month < month_slots) & (day >= 0) & (day < day_slots) & (dep_time >= 0)
+    minute = np.minimum((dep_time // 100) * 60 + dep_time % 100, minutes_per_day - 1)
+
+    # keys are coded by the batch's own values, so airports outside the vocabulary still meet
+    key = np.zeros(batch.n_rows, dtype=np.int64)
+    for key_col in spec['keys'][name]:
+        position, size = _batch_codes(batch.data[key_col])
+        valid &= position >= 0
+        key = key * size + np.maximum(position, 0)
+    start = (key * day_slots * month_slots + month * day_slots + day) * minutes_per_day
+    departures = np.sort((start + minute)[valid])
+    # sorted queries make consecutive binary searches walk the same cache lines
+    order = np.argsort(start + minute)
+    start, minute = start[order], minute[order]
+    for window, column in windows.items():
+        count = np.empty(batch.n_rows, dtype=np.int64)
+        count[order] = (np.searchsorted(departures, start + np.minimum(minute + window, minutes_per_day - 1),
+                                        side='right')
+                        - np.searchsorted(departures, start + np.maximum(minute - window, 0), side='left'))
+        # every window holds the flight's own departure
+        batch.values[column] = np.where(valid, count - 1, 0)
+    return batch.values[col]
+
+_DAY_COLUMNS = ['season', 'month_day', 'is_holiday', 'is_peak_travel_season', 'days_to_holiday']
+
+_FEATURES = {
+    'dep_hour': _dep_hour,
+    'dep_minute': _dep_minute,
+    'time_period': _time_period,
+    'is_weekend': _is_weekend,
+    **{col: _day_columns for col in _DAY_COLUMNS},
+    'origin_is_hub': _hub,
+    'dest_is_hub': _hub,
+    'route': _route,
+    'distance_category': _distance_category,
+    'hub_to_hub': _hub_to_hub,
+    'peak_weekend': _peak_weekend,
+    **{f'{name}_{part}': _cyclical for name in ['dep_hour', 'day_of_week', 'month', 'day_of_month', 'time_of_day']
+       for part in ['sin', 'cos']},
+    'evening_weekend': _evening_weekend,
+    'major_carrier_at_hub': _major_carrier_at_hub,
+    'long_distance_peak': _long_distance_peak,
+    'morning_rush': _morning_rush,
+    'evening_rush': _evening_rush,
+    'rush_at_busy_airport': _rush_at_busy_airport,
+    'winter_in_north': _winter_in_north,
+    'delay_risk_score': _delay_risk_score,
+    'origin_congestion_rank': _origin_congestion_rank,
+    'origin_hour_delay_rate': _origin_hour_delay_rate,
+    'route_congestion_rank': _route_congestion_rank,
+}
+
+# features that are a single lookup, with their table and key columns
+_TABLE_FEATURES = {col: (name, keys) for _, name, col, keys, _ in RUNTIME_TABLES if col is not None}
+
+def _string_positions(vocabulary, values):
+    """Position of every value in a sorted string vocabulary (-1 if it is not there)."""
+    values = np.asarray(values)
+    if values.dtype.kind != 'U':
+        values = values.astype(str)
+    if len(vocabulary) == 0:
+        return np.full(len(values), -1, dtype=np.int64)
+    position = np.minimum(np.searchsorted(vocabulary, values), len(vocabulary) - 1)
+    return np.where(vocabulary[position] == values, position, -1).astype(np.int64)
+
+def _batch_codes(values):
+    """Position of every value among the distinct values of a batch (-1 if missing) and their number."""
+    values = np.asarray(values)
+    missing = np.zeros(len(values), dtype=bool)
+    if values.dtype.kind == 'O':
+        missing = np.array([value is None or value != value for value in values.tolist()], dtype=bool)
+    elif values.dtype.kind == 'f':
+        missing = np.isnan(values)
+    uniques, codes = np.unique(np.where(missing, '', values.astype(str)), return_inverse=True)
+    return np.where(missing, -1, codes).astype(np.int64), len(uniques)
+
+def _int_positions(values, size):
+    """Integer values in [0, size) as positions (-1 for any other value)."""
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu':
+        return np.where((values >= 0) & (values < size), values, -1).astype(np.int64)
+    values = values.astype(np.float64)
+    with np.errstate(invalid='ignore'):
+        inside = (values >= 0) & (values < size) & (values == np.floor(values))
+    return np.where(inside, values, -1).astype(np.int64)
+
+def _calendar_field(values):
+    """Calendar column as integers, accepting the "c-" string encoding of the raw files."""
+    if values.dtype.kind in 'OUS':
+        return np.char.replace(values.astype(str), 'c-', '').astype(int)
+    return values
+
+def main():
+    """
+    Compile the fitted transform of a model into a NumPy-only runtime.
+    Example usage:
+        python -m src.features.runtime
+        python -m src.features.runtime --model models/xgboost_model.json --output models/xgboost_model.runtime.npz
+    """
+    parser = argparse.ArgumentParser(description='Compile a feature store and model layout into a NumPy-only runtime')
+    parser.add_argument('--model', default=None, help='saved model (defaults to models/lightgbm_model.txt)')
+    parser.add_argument('--feature-store', default=None, help='feature store directory (defaults to models/feature_store)')
+    parser.add_argument('--output', default=None, help='runtime file (defaults to the model path with .runtime.npz)')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    from .feature_store import load_feature_store
+    from ..models.train import model_layout_file
+
+    project_dir = Path(__file__).resolve().parents[2]
+    model_path = args.model or os.path.join(project_dir, 'models', 'lightgbm_model.txt')
+    feature_store_path = args.feature_store or os.path.join(project_dir, 'models', 'feature_store')
+    output_path = args.output or runtime_file(model_path)
+
+    store = load_feature_store(feature_store_path)
+    if store is None:
+        raise FileNotFoundError(f"No fitted feature store in {feature_store_path}")
+    with open(model_layout_file(model_path)) as f:
+        runtime = compile_runtime(store, json.load(f))
+    runtime.save(output_path)
+    logger.info("Wrote the runtime of %d features to %s", len(runtime.columns), output_path)
+
+if __name__ == '__main__':
+    main()
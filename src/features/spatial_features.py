@@ -3,7 +3,74 @@
 import pandas as pd
 import numpy as np
 
-def create_airport_features(df, train_data=None):
+from .aggregation import count_reference_flights
+from .lookup import lookup, route_labels
+from .projection import requested
+from .ranking import pct_rank
+
+# distance categories (right-inclusive mile bins)
+DISTANCE_BINS = [0, 300, 600, 1000, 2000, 5000]
+DISTANCE_LABELS = ['Very Short', 'Short', 'Medium', 'Long', 'Very Long']
+
+def fit_airport_statistics(reference_data):
+    """
+    Compute the airport and route lookup tables used by create_airport_features.
+    
+    The reference data is scanned once into flight counts and the tables are
+    derived from those by airport_statistics_from_counts.
+    
+    Parameters:
+    -----------
+    reference_data : pandas.DataFrame
+        Training data to extract airport statistics from
+        
+    Returns:
+    --------
+    dict
+        Lookup tables keyed by name, indexed by airport or (Origin, Dest)
+    """
+    return airport_statistics_from_counts(count_reference_flights(reference_data))
+
+def airport_statistics_from_counts(counts):
+    """
+    Airport and route lookup tables from mergeable flight counts.
+    
+    Parameters:
+    -----------
+    counts : pandas.DataFrame
+        Flight counts from aggregation.count_flights, indexed by (at least)
+        Origin and Dest
+        
+    Returns:
+    --------
+    dict
+        Lookup tables keyed by name, indexed by airport or (Origin, Dest)
+    """
+    statistics = {}
+    
+    origin_counts = counts['flights'].groupby(level='Origin').sum().rename(None)
+    dest_counts = counts['flights'].groupby(level='Dest').sum().rename(None)
+    # convert to percentile ranks for better generalization
+    statistics['origin_ranks'] = pct_rank(origin_counts)
+    statistics['dest_ranks'] = pct_rank(dest_counts)
+    
+    # airport delay statistics
+    if 'labelled' in counts.columns:
+        for name, level in [('origin_delay_rates', 'Origin'), ('dest_delay_rates', 'Dest')]:
+            sums = counts[['delays', 'labelled']].groupby(level=level).sum()
+            statistics[name] = (sums['delays'] / sums['labelled']).rename('dep_delayed_15min')
+    
+    # hub airport indicators (top 10 by frequency)
+    statistics['top_origins'] = origin_counts.nlargest(10).index
+    statistics['top_dests'] = dest_counts.nlargest(10).index
+    
+    # route statistics
+    route_counts = counts['flights'].groupby(level=['Origin', 'Dest']).sum().rename(None)
+    statistics['route_ranks'] = pct_rank(route_counts)
+    
+    return statistics
+
+def create_airport_features(df, train_data=None, statistics=None, copy=True, features=None):
     """
     Create airport and route-related features.
     
@@ -13,68 +80,55 @@ def create_airport_features(df, train_data=None):
         Input DataFrame with the raw flight data
     train_data : pandas.DataFrame, optional
         Training data to extract airport statistics (for test data transformation)
+    statistics : dict, optional
+        Pre-computed tables from fit_airport_statistics (takes precedence over train_data)
+    copy : bool, default=True
+        Work on a copy of df; set to False to add the columns to df in place
+    features : collection of str, optional
+        Only compute these of the function's columns (all by default)
         
     Returns:
     --------
     pandas.DataFrame
         DataFrame with airport features added
     """
-    # use the provided dataframe or itself as reference data
-    reference_data = train_data if train_data is not None else df
-    df_out = df.copy()
+    # use the fitted statistics, the provided dataframe or itself as reference data
+    if statistics is None:
+        statistics = fit_airport_statistics(train_data if train_data is not None else df)
+    df_out = df.copy() if copy else df
 
-    # airport frequency - how busy are these airports?
-    origin_counts = reference_data.groupby('Origin').size()
-    dest_counts = reference_data.groupby('Dest').size()
-
-    # convert to percentile ranks for better generalization
-    origin_ranks = origin_counts.rank(pct=True)
-    dest_ranks = dest_counts.rank(pct=True)
-
-    df_out['origin_freq_rank'] = df_out['Origin'].map(origin_ranks)
-    df_out['dest_freq_rank'] = df_out['Dest'].map(dest_ranks)
+    if requested(features, 'origin_freq_rank'):
+        df_out['origin_freq_rank'] = lookup(df_out, ['Origin'], statistics['origin_ranks'])
+    if requested(features, 'dest_freq_rank'):
+        df_out['dest_freq_rank'] = lookup(df_out, ['Dest'], statistics['dest_ranks'])
 
     # airport delay statistics
-    if 'dep_delayed_15min' in reference_data.columns:
-        if reference_data['dep_delayed_15min'].dtype == object:
-            # convert Y/N to 1/0 if not already done
-            reference_delay = reference_data.copy()
-            reference_delay['dep_delayed_15min'] = reference_delay['dep_delayed_15min'].map({'Y': 1, 'N': 0})
-        else:
-            reference_delay = reference_data
-            
-        origin_delay_rates = reference_delay.groupby('Origin')['dep_delayed_15min'].mean()
-        dest_delay_rates = reference_delay.groupby('Dest')['dep_delayed_15min'].mean()
-        
-        df_out['origin_delay_rate'] = df_out['Origin'].map(origin_delay_rates)
-        df_out['dest_delay_rate'] = df_out['Dest'].map(dest_delay_rates)
+    if 'origin_delay_rates' in statistics:
+        if requested(features, 'origin_delay_rate'):
+            df_out['origin_delay_rate'] = lookup(df_out, ['Origin'], statistics['origin_delay_rates'])
+        if requested(features, 'dest_delay_rate'):
+            df_out['dest_delay_rate'] = lookup(df_out, ['Dest'], statistics['dest_delay_rates'])
 
     # hub airport indicators (top 10 by frequency)
-    top_origins = origin_counts.nlargest(10).index
-    top_dests = dest_counts.nlargest(10).index
-    
-    df_out['origin_is_hub'] = df_out['Origin'].isin(top_origins).astype(int)
-    df_out['dest_is_hub'] = df_out['Dest'].isin(top_dests).astype(int)
+    if requested(features, 'origin_is_hub'):
+        df_out['origin_is_hub'] = df_out['Origin'].isin(statistics['top_origins']).astype(int)
+    if requested(features, 'dest_is_hub'):
+        df_out['dest_is_hub'] = df_out['Dest'].isin(statistics['top_dests']).astype(int)
     
     # create route features
-    df_out['route'] = df_out['Origin'] + '_' + df_out['Dest']
+    if requested(features, 'route'):
+        df_out['route'] = route_labels(df_out['Origin'], df_out['Dest'])
     
     # route statistics
-    route_counts = reference_data.groupby('route').size() if 'route' in reference_data.columns else reference_data.groupby(['Origin', 'Dest']).size()
-    route_ranks = route_counts.rank(pct=True)
-    
-    if 'route' in reference_data.columns:
-        df_out['route_freq_rank'] = df_out['route'].map(route_ranks)
-    else:
-        # handle test data that might not have the route column yet
-        route_map = {(o, d): r for (o, d), r in zip(route_ranks.index, route_ranks.values)}
-        df_out['route_freq_rank'] = df_out.apply(lambda x: route_map.get((x['Origin'], x['Dest']), np.nan), axis=1)
+    if requested(features, 'route_freq_rank'):
+        df_out['route_freq_rank'] = lookup(df_out, ['Origin', 'Dest'], statistics['route_ranks'], np.nan)
     
     # distance-based features
-    df_out['distance_category'] = pd.cut(
-        df_out['Distance'],
-        bins=[0, 300, 600, 1000, 2000, 5000],
-        labels=['Very Short', 'Short', 'Medium', 'Long', 'Very Long']
-    )
+    if requested(features, 'distance_category'):
+        df_out['distance_category'] = pd.cut(
+            df_out['Distance'],
+            bins=DISTANCE_BINS,
+            labels=DISTANCE_LABELS
+        )
     
-    return df_out
\ No newline at end of file
+    return df_out
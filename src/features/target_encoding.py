@@ -0,0 +1,106 @@
+# src/features/target_encoding.py
+
+import numpy as np
+import pandas as pd
+
+from .aggregation import FLIGHT_KEYS, count_flights
+from .lookup import lookup
+
+# delay-rate features: output column, statistics module and table it is looked up from, key columns
+DELAY_RATE_FEATURES = [
+    ('origin_delay_rate', 'airport', 'origin_delay_rates', ['Origin']),
+    ('dest_delay_rate', 'airport', 'dest_delay_rates', ['Dest']),
+    ('carrier_delay_rate', 'carrier', 'carrier_delay_rates', ['UniqueCarrier']),
+    ('carrier_hour_performance', 'carrier', 'carrier_hour_delay', ['UniqueCarrier', 'dep_hour']),
+    ('origin_hour_delay_rate', 'network', 'airport_hourly_delays', ['Origin', 'dep_hour']),
+]
+
+def _smoothed_rate(delays, labelled, prior, smoothing):
+    """delays / labelled, shrunk toward prior as if smoothing flights at the prior rate were added."""
+    if smoothing:
+        return (delays + smoothing * prior) / (labelled + smoothing)
+    return delays / labelled
+
+def smoothed_delay_rates(counts, smoothing):
+    """
+    Delay-rate tables of the feature store shrunk toward the global delay rate.
+
+    Parameters:
+    -----------
+    counts : pandas.DataFrame
+        Flight counts from aggregation.count_flights, with delays and labelled
+    smoothing : float
+        Weight of the global rate, in flights
+
+    Returns:
+    --------
+    dict
+        Table per (statistics module, table name), as in DELAY_RATE_FEATURES
+    """
+    prior = counts['delays'].sum() / counts['labelled'].sum()
+    tables = {}
+    for _, module, name, keys in DELAY_RATE_FEATURES:
+        sums = counts[['delays', 'labelled']].groupby(level=keys).sum()
+        tables[module, name] = _smoothed_rate(sums['delays'], sums['labelled'], prior, smoothing).rename('dep_delayed_15min')
+    return tables
+
+def assign_folds(n_rows, n_folds, seed=0):
+    """Random fold of every row, with fold sizes differing by at most one."""
+    return np.random.default_rng(seed).permutation(n_rows) % n_folds
+
+def out_of_fold_delay_rates(df, n_folds=5, smoothing=0.0, seed=0, folds=None):
+    """
+    Delay-rate features of training rows, each estimated without its own fold.
+
+    The rows are counted once per (flight key, fold) with count_flights; for
+    every key combination the out-of-fold delays and labelled flights are the
+    key's totals minus its counts in the fold, so all folds cost about as much
+    as fitting the statistics once. Each fold is shrunk toward its own
+    out-of-fold global rate, and origin_hour_delay_rate falls back to
+    origin_delay_rate as in create_network_features.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Training data with dep_delayed_15min and the key columns (after
+        create_temporal_features for the per-hour rates)
+    n_folds : int, default=5
+        Number of folds
+    smoothing : float, default=0.0
+        Weight of the global rate, in flights (0 for the plain rate)
+    seed : int, default=0
+        Seed of the random fold assignment
+    folds : array-like, optional
+        Fold of every row (0..n_folds-1), instead of a random assignment
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The DELAY_RATE_FEATURES columns whose keys df has, aligned with df
+    """
+    if 'dep_delayed_15min' not in df.columns:
+        raise ValueError("Out-of-fold encoding needs the dep_delayed_15min target")
+    folds = assign_folds(len(df), n_folds, seed) if folds is None else np.asarray(folds)
+
+    keys = [key for key in FLIGHT_KEYS if key in df.columns]
+    frame = pd.DataFrame({col: df[col] for col in keys + ['dep_delayed_15min']}, index=df.index, copy=False)
+    frame['fold'] = folds
+    sums = count_flights(frame, keys + ['fold'])[['delays', 'labelled']]
+
+    fold_sums = sums.groupby(level='fold').sum()
+    out_of_fold = fold_sums.sum() - fold_sums
+    fold_prior = out_of_fold['delays'] / out_of_fold['labelled']
+
+    rates = {}
+    for column, _, _, columns in DELAY_RATE_FEATURES:
+        if not set(columns) <= set(keys):
+            continue
+        key_sums = sums.groupby(level=columns + ['fold']).sum()
+        key_out_of_fold = key_sums.groupby(level=columns).transform('sum') - key_sums
+        prior = fold_prior.reindex(key_sums.index.get_level_values('fold')).to_numpy()
+        table = _smoothed_rate(key_out_of_fold['delays'], key_out_of_fold['labelled'], prior, smoothing)
+        rates[column] = lookup(frame, columns + ['fold'], table)
+
+    if 'origin_hour_delay_rate' in rates and 'origin_delay_rate' in rates:
+        rates['origin_hour_delay_rate'] = rates['origin_hour_delay_rate'].fillna(rates['origin_delay_rate'])
+    return pd.DataFrame(rates, index=df.index)
@@ -4,14 +4,34 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
-def create_temporal_features(df):
+from .calendar_table import default_calendar
+from .projection import requested
+
+# time of day categories (right-inclusive hour bins)
+TIME_PERIOD_BINS = [0, 5, 11, 17, 23]
+TIME_PERIOD_LABELS = ['Night', 'Morning', 'Afternoon', 'Evening']
+
+# day table columns added to the frame, in output order
+DAY_COLUMNS = ['season', 'month_day', 'is_holiday', 'is_peak_travel_season', 'days_to_holiday']
+
+def create_temporal_features(df, copy=True, calendar=None, features=None):
     """
     Create time-based features from the flight data.
     
+    The day-level features (season, holidays, peak travel season) are looked
+    up per (Month, DayofMonth) in the precomputed day table of a Calendar.
+    
     Parameters:
     -----------
     df : pandas.DataFrame
         Input DataFrame with the raw flight data
+    copy : bool, default=True
+        Work on a copy of df; set to False to add the columns to df in place
+    calendar : Calendar, optional
+        Day table to use, e.g. Calendar(year) for the actual holidays of a year
+        (defaults to the year-independent calendar)
+    features : collection of str, optional
+        Only compute these of the function's columns (all by default)
         
     Returns:
     --------
@@ -19,65 +39,33 @@ def create_temporal_features(df):
         DataFrame with temporal features added
     """
     # create a copy to avoid modifying the original
-    df_out = df.copy()
+    df_out = df.copy() if copy else df
 
     # extract the hour and minute from departure time
-    df_out['dep_hour'] = df_out['DepTime'] // 100
-    df_out['dep_minute'] = df_out['DepTime'] % 100
+    if requested(features, 'dep_hour'):
+        df_out['dep_hour'] = df_out['DepTime'] // 100
+    if requested(features, 'dep_minute'):
+        df_out['dep_minute'] = df_out['DepTime'] % 100
 
     # time of day categories
-    df_out['time_period'] = pd.cut(
-        df_out['dep_hour'],
-        bins = [0, 5, 11, 17, 23],
-        labels = ['Night', 'Morning', 'Afternoon', 'Evening']
-    )
+    if requested(features, 'time_period'):
+        df_out['time_period'] = pd.cut(
+            df_out['dep_hour'] if 'dep_hour' in df_out.columns else df_out['DepTime'] // 100,
+            bins = TIME_PERIOD_BINS,
+            labels = TIME_PERIOD_LABELS
+        )
 
     # weekend indicator
-    df_out['is_weekend'] = (df_out['DayOfWeek'] >= 6).astype(int)
-
-    # season from month
-    seasons = {
-        1: 'Winter', 2: 'Winter', 3: 'Spring', 
-        4: 'Spring', 5: 'Spring', 6: 'Summer',
-        7: 'Summer', 8: 'Summer', 9: 'Fall', 
-        10: 'Fall', 11: 'Fall', 12: 'Winter'
-    }
-    df_out['season'] = df_out['Month'].map(seasons)
-
-    # create a month-day string for holiday detection
-    df_out['month_day'] = df_out['Month'].astype(str).str.zfill(2) + '-' + df_out['DayofMonth'].astype(str).str.zfill(2)
-
-    # US Holiday indicators (simplified)
-    us_holidays = [
-        '01-01',  # New Year's Day
-        '01-15',  # Martin Luther King Jr. Day (third Monday in January, approximated)
-        '02-14',  # Valentine's Day
-        '02-15',  # Presidents' Day (third Monday in February, approximated)
-        '03-17',  # St. Patrick's Day
-
-        # Easter varies by year but falls between March 22 and April 25
-        # I'll include common dates in this range
-        '04-05',  # Easter approximation (early April)
-        '04-15',  # Easter approximation (mid April)
-    
-        '05-05',  # Cinco de Mayo
-        '05-25',  # Memorial Day (last Monday in May, approximated)
-        '06-19',  # Juneteenth
-        '07-04',  # Independence Day
-        '09-01',  # Labor Day (first Monday in September, approximated)
-        '10-31',  # Halloween
-        '11-11',  # Veterans Day
-        '11-25',  # Thanksgiving (fourth Thursday in November, approximated)
-        '11-26',  # Black Friday
-        '12-24',  # Christmas Eve
-        '12-25',  # Christmas Day
-        '12-31',  # New Year's Eve
-    ]
-    df_out['is_holiday'] = df_out['month_day'].isin(us_holidays).astype(int)
+    if requested(features, 'is_weekend'):
+        df_out['is_weekend'] = (df_out['DayOfWeek'] >= 6).astype(int)
 
-    # peak travel seasons
-    summer_peak = (df_out['Month'] >= 6) & (df_out['Month'] <= 8)
-    winter_holiday = ((df_out['Month'] == 12) & (df_out['DayofMonth'] >= 15)) | (df_out['Month'] == 1 & (df_out['DayofMonth'] <= 5))
-    df_out['is_peak_travel_season'] = (summer_peak | winter_holiday).astype(int)
+    # season, month-day label, holiday and peak travel season flags and the
+    # distance to the nearest holiday, gathered from the day table
+    day_columns = [col for col in DAY_COLUMNS if requested(features, col)]
+    if day_columns:
+        calendar = calendar if calendar is not None else default_calendar()
+        days = calendar.lookup(df_out['Month'], df_out['DayofMonth'], day_columns)
+        for col in day_columns:
+            df_out[col] = days[col]
     
     return df_out
\ No newline at end of file
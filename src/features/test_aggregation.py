@@ -0,0 +1,38 @@
+# src/features/test_aggregation.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from . import aggregation
+from .aggregation import FLIGHT_KEYS, count_flights
+from .build_features import convert_data_types
+from .temporal_features import create_temporal_features
+from ..data.synthetic import make_flights
+
+def _groupby_counts(df):
+    """count_flights computed the straightforward way, with one pandas groupby."""
+    delay = df['dep_delayed_15min'].astype(float)
+    frame = pd.DataFrame({'flights': 1, 'delays': delay, 'labelled': delay.notna().astype(np.int64)}, index=df.index)
+    keys = [df[key].astype(object) if isinstance(df[key].dtype, pd.CategoricalDtype) else df[key] for key in FLIGHT_KEYS]
+    return frame.groupby(keys, dropna=False).sum()
+
+@pytest.mark.parametrize('dense', [True, False])
+@pytest.mark.parametrize('categorical', [False, True])
+def test_count_flights_matches_groupby(monkeypatch, dense, categorical):
+    """Bincount aggregation must equal a groupby, with missing keys and unsorted categories"""
+    if not dense:
+        # force the sort-based path over the distinct combined keys
+        monkeypatch.setattr(aggregation, 'MAX_DENSE_CELLS', 0)
+    df = create_temporal_features(convert_data_types(make_flights(5000, n_airports=40, seed=0)))
+    df.loc[df.index[:7], 'Origin'] = np.nan
+    df.loc[df.index[5:12], 'dep_delayed_15min'] = np.nan
+    if categorical:
+        df['Origin'] = df['Origin'].astype('category')
+        df['Origin'] = df['Origin'].cat.reorder_categories(df['Origin'].cat.categories[::-1])
+        df['UniqueCarrier'] = df['UniqueCarrier'].astype('category')
+
+    counts = count_flights(df)
+
+    pd.testing.assert_frame_equal(counts.reset_index(), _groupby_counts(df).reset_index(), check_exact=True)
+    assert counts['flights'].sum() == len(df)
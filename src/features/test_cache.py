@@ -0,0 +1,53 @@
+# src/features/test_cache.py
+
+import os
+
+import pandas as pd
+
+from .build_features import convert_data_types, create_features
+from .cache import StageCache
+from .feature_store import FeatureStore
+from .pipeline import FEATURE_STAGES, TRANSIENT_STATISTICS
+from ..data.synthetic import make_flights
+
+def test_cached_rerun_matches_and_hits_every_stage(tmp_path):
+    """A second run with unchanged inputs must load every cacheable stage from the cache and give the same frame"""
+    train = convert_data_types(make_flights(2000, n_airports=8, n_carriers=4, seed=0))
+    test = convert_data_types(make_flights(500, n_airports=8, n_carriers=4, seed=1).drop(columns='dep_delayed_15min'))
+    store = FeatureStore()
+    create_features(train, store, fit=True)
+    
+    expected = create_features(test, store)
+    cache = StageCache(str(tmp_path / 'cache'))
+    first = create_features(test, store, cache=cache)
+    # stages counting within the frame's own schedule always run
+    cached = [stage for stage in FEATURE_STAGES if stage.statistics not in TRANSIENT_STATISTICS]
+    assert (cache.hits, cache.misses) == (0, len(cached))
+    
+    # shifted row labels and a parallel run still hit
+    shifted = test.set_axis(test.index + 1000)
+    second = create_features(shifted, store, cache=cache, n_jobs=2)
+    assert cache.hits == len(cached)
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second.set_axis(test.index), expected)
+    
+    # different statistics must miss the stages that use them
+    # few airports, so the hub flags (inputs of the stateless stages) do not change with the sample
+    other_flights = convert_data_types(make_flights(2000, n_airports=8, n_carriers=4, seed=2))
+    other = FeatureStore().fit(create_features(other_flights, copy=False))
+    create_features(test, other, cache=cache)
+    stateless = sum(stage.statistics is None for stage in cached)
+    assert cache.hits == len(cached) + stateless
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Entries beyond the size bound are evicted oldest access first"""
+    cache = StageCache(str(tmp_path), max_bytes=10 ** 9)
+    columns = {'x': pd.Series(range(1000))}
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.save(key, columns)
+        os.utime(cache._entry(key), (i, i))
+    cache.load('a', columns['x'].index)
+    
+    cache.max_bytes = 2 * os.path.getsize(cache._entry('a'))
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ['a.pkl', 'c.pkl']
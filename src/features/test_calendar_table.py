@@ -0,0 +1,39 @@
+# src/features/test_calendar_table.py
+
+import numpy as np
+import pandas as pd
+
+from .calendar_table import Calendar, US_HOLIDAYS, day_attributes, us_holidays
+from .temporal_features import create_temporal_features
+
+def test_us_holidays_on_actual_dates():
+    """Movable holidays must land on their real dates"""
+    holidays = us_holidays(2006)
+    for date in ['01-16', '02-20', '04-16', '05-29', '09-04', '11-23', '11-24', '07-04', '12-25']:
+        assert date in holidays
+    assert '01-15' not in holidays and '04-05' not in holidays
+    assert {'01-21', '02-18', '03-23', '05-26', '09-01', '11-27'} <= set(us_holidays(2008))
+
+def test_calendar_lookup_matches_day_attributes():
+    """Gathering from the day table must equal computing every row, also for values outside the table"""
+    rng = np.random.default_rng(0)
+    month = np.concatenate([rng.integers(1, 13, 1000), [0, 13, -1, 2, 4]])
+    day = np.concatenate([rng.integers(1, 32, 1000), [3, 5, 1, 30, 40]])
+    calendar = Calendar()
+
+    days = calendar.lookup(month, day, ['season', 'month_day', 'is_holiday', 'is_peak_travel_season'])
+    expected = day_attributes(month, day, US_HOLIDAYS)
+    for col, values in days.items():
+        pd.testing.assert_series_equal(pd.Series(values, name=col), expected[col], check_exact=True)
+
+def test_days_to_holiday_wraps_around_the_year():
+    """Distance to the nearest holiday counts across the year end and uses the calendar's holidays"""
+    df = pd.DataFrame({'Month': [12, 12, 1, 3, 2], 'DayofMonth': [28, 31, 3, 1, 29], 'DayOfWeek': 1, 'DepTime': 900})
+
+    out = create_temporal_features(df, calendar=Calendar(holidays=['01-01']))
+    assert out['days_to_holiday'].tolist() == [4.0, 1.0, 2.0, 60.0, 59.0]
+    assert out['is_holiday'].sum() == 0
+
+    # 2006 has no February 29
+    out = create_temporal_features(df, calendar=Calendar(2006))
+    assert np.isnan(out['days_to_holiday'].iloc[-1])
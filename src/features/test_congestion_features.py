@@ -0,0 +1,107 @@
+# src/features/test_congestion_features.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from . import build_features
+from .build_features import SCHEDULE_COLUMNS, convert_data_types, create_features, read_schedule, transform_chunks
+from .congestion_features import (CONGESTION_KEYS, congestion_column, congestion_columns, create_congestion_features,
+                                  departure_schedule, merge_departure_schedules)
+from .feature_store import FeatureStore
+from .temporal_features import create_temporal_features
+from ..data.synthetic import make_flights
+
+WINDOWS = (0, 5, 30)
+
+def brute_force_counts(df, keys, window):
+    """Other departures of df with the same keys and date within window minutes, flight by flight."""
+    minutes = ((df['DepTime'] // 100) * 60 + df['DepTime'] % 100).to_numpy()
+    counts = []
+    for (_, row), minute in zip(df.iterrows(), minutes):
+        same = np.ones(len(df), dtype=bool)
+        for col in keys + ('Month', 'DayofMonth'):
+            same &= (df[col] == row[col]).to_numpy()
+        counts.append(int((same & (np.abs(minutes - minute) <= window)).sum()) - 1)
+    return np.array(counts)
+
+@pytest.fixture(scope='module')
+def flights():
+    # few airports and dates, so that windows hold several departures
+    df = convert_data_types(make_flights(1000, n_airports=5, seed=0))
+    df['Month'] = df['Month'] % 2 + 1
+    df['DayofMonth'] = df['DayofMonth'] % 3 + 1
+    return df
+
+@pytest.mark.parametrize('name', list(CONGESTION_KEYS))
+def test_window_counts_match_brute_force(flights, name):
+    """Each count is the number of other flights of the frame with the same key and date within the window"""
+    result = create_congestion_features(flights, windows=WINDOWS)
+    for window in WINDOWS:
+        expected = brute_force_counts(flights, CONGESTION_KEYS[name], window)
+        np.testing.assert_array_equal(result[congestion_column(name, window)].to_numpy(), expected)
+    assert result[congestion_column(name, 30)].sum() > 0
+
+def test_windows_stop_at_midnight_and_missing_keys_count_nothing():
+    df = pd.DataFrame({
+        'Origin': ['A', 'A', 'A', 'A', 'A', None], 'Dest': ['B', 'B', 'C', 'B', 'B', 'B'],
+        'UniqueCarrier': ['X', 'Y', 'X', 'X', 'X', 'X'],
+        'Month': [1, 1, 1, 1, 1, 1], 'DayofMonth': [1, 1, 1, 2, 2, 1], 'DepTime': [2350, 2355, 10, 5, 1, 2350],
+    })
+    result = create_congestion_features(df, windows=(15,))
+    assert result['origin_departures_15m'].tolist() == [1, 1, 0, 1, 1, 0]
+    assert result['origin_carrier_departures_15m'].tolist() == [0, 0, 0, 1, 1, 0]
+    assert result['route_departures_15m'].tolist() == [1, 1, 0, 1, 1, 0]
+
+def test_train_and_test_frames_are_counted_alike(flights):
+    """A flight sees the same counts whichever frame it is featurized in, as long as its schedule is the same"""
+    train = create_congestion_features(flights)
+    test = create_congestion_features(flights.copy())
+    pd.testing.assert_frame_equal(train, test)
+    # a lone flight has no other departures, in training data as well
+    alone = create_congestion_features(flights.iloc[:1])
+    assert (alone[congestion_columns()] == 0).all(axis=None)
+
+def test_chunks_counted_in_the_whole_file_schedule(flights):
+    store = FeatureStore().fit(create_temporal_features(flights))
+    expected = create_features(flights.copy(), store)
+    schedule = departure_schedule(flights)
+    chunks = (flights.iloc[start:start + 300].copy() for start in range(0, len(flights), 300))
+    chunked = pd.concat(transform_chunks(chunks, store, schedule=schedule))
+    pd.testing.assert_frame_equal(chunked, expected)
+
+def test_file_schedule_is_indexed_chunk_by_chunk(flights, tmp_path, monkeypatch):
+    """read_schedule merges per-chunk schedules of the schedule columns, never holding the whole file"""
+    path = tmp_path / 'flights.parquet'
+    flights.to_parquet(path)
+    seen = []
+    def recording_schedule(df):
+        seen.append((len(df), list(df.columns)))
+        return departure_schedule(df)
+    monkeypatch.setattr(build_features, 'departure_schedule', recording_schedule)
+    monkeypatch.setattr(build_features, 'read_flights', None)
+
+    schedule = read_schedule(str(path), 300)
+    assert [rows for rows, _ in seen] == [300, 300, 300, 100]
+    assert all(columns == SCHEDULE_COLUMNS for _, columns in seen)
+    expected = departure_schedule(flights)
+    assert schedule.keys() == expected.keys()
+    for name, values in expected.items():
+        np.testing.assert_array_equal(np.asarray(schedule[name]), np.asarray(values))
+    assert read_schedule(str(path), 300, features=['dep_hour']) is None
+
+def test_merged_schedules_equal_indexing_at_once(flights):
+    parts = [departure_schedule(flights.iloc[start:start + 300]) for start in range(0, len(flights), 300)]
+    merged = merge_departure_schedules(parts)
+    for name, values in departure_schedule(flights).items():
+        np.testing.assert_array_equal(np.asarray(merged[name]), np.asarray(values))
+
+def test_store_holds_no_departures(flights):
+    """The store keeps nothing that grows with the number of flights"""
+    def store_rows(df):
+        store = FeatureStore().fit(create_temporal_features(df))
+        assert 'congestion' not in store.statistics and 'schedule' not in store.statistics
+        return sum(np.size(table) for tables in store.statistics.values() for table in tables.values())
+
+    # the same airports, carriers and routes with twice the flights
+    assert store_rows(pd.concat([flights, flights], ignore_index=True)) == store_rows(flights)
@@ -0,0 +1,42 @@
+# src/features/test_cyclical_features.py
+
+import numpy as np
+import pandas as pd
+
+from .cyclical_features import create_cyclical_features
+
+def test_table_encoding_matches_direct_computation():
+    """Gathered sin/cos must equal np.sin/np.cos of the angles, exactly in float64 and rounded in float32"""
+    rng = np.random.default_rng(0)
+    dep_time = np.concatenate([rng.integers(0, 24, 1000) * 100 + rng.integers(0, 60, 1000), [2400, 2600, -5]])
+    df = pd.DataFrame({
+        'DepTime': dep_time,
+        'dep_hour': dep_time // 100,
+        'DayOfWeek': rng.integers(1, 8, len(dep_time)),
+        'Month': rng.integers(1, 13, len(dep_time)),
+        'DayofMonth': rng.integers(1, 32, len(dep_time)),
+    })
+    time_of_day = ((df['DepTime'] // 100) * 60 + df['DepTime'] % 100) / (24 * 60)
+    angles = {
+        'dep_hour': 2 * np.pi * df['dep_hour'] / 24,
+        'day_of_week': 2 * np.pi * (df['DayOfWeek'] - 1) / 7,
+        'month': 2 * np.pi * (df['Month'] - 1) / 12,
+        'day_of_month': 2 * np.pi * (df['DayofMonth'] - 1) / 31,
+        'time_of_day': 2 * np.pi * time_of_day,
+    }
+
+    exact = create_cyclical_features(df, dtype=np.float64)
+    compact = create_cyclical_features(df)
+    for name, angle in angles.items():
+        for func in ['sin', 'cos']:
+            expected = getattr(np, func)(angle)
+            np.testing.assert_array_equal(exact[f'{name}_{func}'], expected)
+            assert compact[f'{name}_{func}'].dtype == np.float32
+            np.testing.assert_array_equal(compact[f'{name}_{func}'], expected.astype(np.float32))
+
+def test_missing_values_are_computed_directly():
+    """Non-integer source columns (e.g. with NaN) fall back to computing every value"""
+    df = pd.DataFrame({'DepTime': [930.0, np.nan, 1445.0]})
+    out = create_cyclical_features(df)
+    assert out['dep_hour_sin'].isna().tolist() == [False, True, False]
+    assert out['time_of_day_cos'].iloc[0] == np.float32(np.cos(2 * np.pi * (9 * 60 + 30) / (24 * 60)))
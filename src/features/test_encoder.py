@@ -0,0 +1,40 @@
+# src/features/test_encoder.py
+
+import pandas as pd
+
+from .build_features import convert_data_types, create_features
+from .congestion_features import congestion_columns
+from .encoder import FeatureEncoder
+from .feature_store import FeatureStore
+from ..data.synthetic import make_flights
+
+def test_transform_one_matches_batch_pipeline():
+    """The online encoder must reproduce the batch feature rows exactly"""
+    train = make_flights(3000, seed=0)
+    test = make_flights(1000, seed=1).drop(columns='dep_delayed_15min')
+    
+    store = FeatureStore()
+    expected_train = create_features(convert_data_types(train), store, fit=True)
+    expected_test = create_features(convert_data_types(test), store)
+    # one date, so the congestion windows of the micro-batch hold many departures
+    dense = test.assign(Month='c-7', DayofMonth='c-4')
+    expected_dense = create_features(convert_data_types(dense), store)
+    encoder = FeatureEncoder(store)
+    
+    for raw, expected in [(train, expected_train), (test, expected_test), (dense, expected_dense)]:
+        actual = pd.DataFrame(encoder.transform_many(raw.to_dict('records')), index=expected.index)
+        assert list(actual.columns) == list(expected.columns)
+        
+        for col in expected.columns:
+            if pd.api.types.is_numeric_dtype(expected[col]):
+                pd.testing.assert_series_equal(actual[col], expected[col], check_dtype=False, check_exact=True)
+            else:
+                # categorical/object columns: compare labels, with NaN for missing
+                pd.testing.assert_series_equal(actual[col].astype(object), expected[col].astype(object))
+
+def test_transform_one_counts_no_other_departures():
+    store = FeatureStore()
+    create_features(convert_data_types(make_flights(1000, seed=0)), store, fit=True)
+    record = make_flights(1, seed=1).to_dict('records')[0]
+    out = FeatureEncoder(store).transform_one(record)
+    assert all(out[col] == 0 for col in congestion_columns())
@@ -0,0 +1,80 @@
+# src/features/test_feature_store.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .build_features import convert_data_types, build_features
+from .temporal_features import create_temporal_features
+from .spatial_features import create_airport_features
+from .carrier_features import create_carrier_features
+from .network_features import create_network_features
+from .feature_store import FeatureStore
+from ..data.synthetic import make_flights
+from ..data.table_io import read_table
+
+def _transform(df, train_data=None, statistics=None):
+    statistics = statistics or {}
+    df = create_airport_features(df, train_data, statistics.get('airport'))
+    df = create_carrier_features(df, train_data, statistics.get('carrier'))
+    return create_network_features(df, train_data, statistics.get('network'))
+
+def test_feature_store_round_trip_matches_reference_frame(tmp_path):
+    """Transforming with a saved store must equal transforming against the training frame"""
+    train = create_temporal_features(convert_data_types(make_flights(2000, seed=0)))
+    test = create_temporal_features(convert_data_types(make_flights(500, seed=1).drop(columns='dep_delayed_15min')))
+    
+    store_path = tmp_path / 'feature_store.joblib'
+    FeatureStore().fit(train).save(store_path)
+    store = FeatureStore.load(store_path)
+    
+    expected = _transform(test, train_data=train)
+    actual = _transform(test, statistics=store.statistics)
+    
+    pd.testing.assert_frame_equal(actual, expected)
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_chunked_build_matches_batch_build(tmp_path, fmt):
+    """Streaming the files in chunks, and running stages or chunks in parallel, must not change the output"""
+    make_flights(3000, seed=0).to_csv(tmp_path / 'train.csv', index=False)
+    make_flights(1000, seed=1).drop(columns='dep_delayed_15min').to_csv(tmp_path / 'test.csv', index=False)
+    store_format = 'joblib' if fmt == 'csv' else fmt
+    
+    modes = [('batch', None, 1), ('threaded', None, 3), ('chunked', 333, 1), ('multiprocess', 333, 2)]
+    for mode, chunksize, n_jobs in modes:
+        store_dir = str(tmp_path / mode / 'feature_store')
+        for name, is_train in [('train', True), ('test', False)]:
+            build_features(str(tmp_path / f'{name}.csv'), str(tmp_path / mode / f'{name}.{fmt}'),
+                           is_train, store_dir, chunksize=chunksize, store_format=store_format, n_jobs=n_jobs)
+    
+    for name in ['train', 'test']:
+        batch = read_table(tmp_path / 'batch' / f'{name}.{fmt}')
+        threaded = read_table(tmp_path / 'threaded' / f'{name}.{fmt}')
+        pd.testing.assert_frame_equal(threaded, batch)
+        for mode in ['chunked', 'multiprocess']:
+            chunked = read_table(tmp_path / mode / f'{name}.{fmt}')
+            pd.testing.assert_frame_equal(chunked, batch, check_dtype=False, check_categorical=False)
+
+@pytest.mark.parametrize('store_format', ['joblib', 'parquet'])
+def test_partial_fit_matches_full_fit(tmp_path, store_format):
+    """Folding in batches one by one (across a save/load) must equal fitting on all of them at once"""
+    batches = [create_temporal_features(convert_data_types(make_flights(1000, seed=seed))) for seed in range(3)]
+    # an unlabelled batch still counts towards traffic and connectivity
+    batches[2] = batches[2].drop(columns='dep_delayed_15min')
+    
+    store_path = tmp_path / f'feature_store.{store_format}'
+    FeatureStore().fit(batches[0]).partial_fit(batches[1]).save(store_path)
+    incremental = FeatureStore.load(store_path).partial_fit(batches[2])
+    full = FeatureStore().fit(pd.concat(batches, ignore_index=True))
+    
+    for module, tables in full.statistics.items():
+        assert incremental.statistics[module].keys() == tables.keys()
+        for name, expected in tables.items():
+            actual = incremental.statistics[module][name]
+            if isinstance(expected, pd.Series):
+                pd.testing.assert_series_equal(actual, expected, check_exact=True, check_index_type=False,
+                                               check_categorical=False)
+            elif isinstance(expected, pd.Index):
+                assert actual.tolist() == expected.tolist()
+            else:
+                assert actual == expected
@@ -1,70 +1,47 @@
 # src/features/test_features.py
 
-import pandas as pd
 import os
 from pathlib import Path
 
 # Import main feature builder
 from .build_features import build_features
+from .pipeline import FEATURE_STAGES
+from ..data.synthetic import make_flights
 
-def test_feature_engineering():
-    """Test the feature engineering pipeline with a small sample"""
-    # Project directory
-    project_dir = Path(__file__).resolve().parents[2]
-    
-    # Define paths
-    raw_data_dir = os.path.join(project_dir, 'data', 'raw')
-    test_dir = os.path.join(project_dir, 'data', 'test')
+def run_feature_engineering(test_dir):
+    """Build the features of a small synthetic training sample in test_dir."""
     os.makedirs(test_dir, exist_ok=True)
-    
-    # Load a small sample of training data
-    train_input = os.path.join(raw_data_dir, 'flight_delays_train.csv')
-    df = pd.read_csv(train_input)
-    sample = df.sample(1000, random_state=42)  # Take 1000 rows for quick testing
-    
+
+    # Generate a small synthetic sample of training data
+    sample = make_flights(1000, seed=42)
+
     # Save the sample
     sample_path = os.path.join(test_dir, 'sample_train.csv')
     sample.to_csv(sample_path, index=False)
-    
+
     # Process the sample
     output_path = os.path.join(test_dir, 'sample_processed.csv')
     feature_store = os.path.join(test_dir, 'feature_store')
-    
+
     # Run feature engineering
     processed_df = build_features(sample_path, output_path, True, feature_store)
-    
-    # Print feature summary
-    print(f"\nProcessed data shape: {processed_df.shape}")
-    print("\nNew features added:")
-    
-    # Original features in sample
-    orig_cols = set(sample.columns)
-    # New features
-    new_cols = set(processed_df.columns) - orig_cols
-    
-    # Group features by type for better organization
-    cyclical_features = [col for col in new_cols if 'sin' in col or 'cos' in col]
-    network_features = [col for col in new_cols if 'hourly' in col or 'congestion' in col or 'connections' in col]
-    interaction_features = [col for col in new_cols if 'combo' in col or 'rush' in col or 'winter' in col or 'risk' in col]
-    
-    print("\nCyclical Features:")
-    for col in sorted(cyclical_features):
-        print(f"- {col}")
-    
-    print("\nNetwork Features:")
-    for col in sorted(network_features):
-        print(f"- {col}")
-    
-    print("\nInteraction Features:")
-    for col in sorted(interaction_features):
-        print(f"- {col}")
-    
-    print("\nOther New Features:")
-    other_features = new_cols - set(cyclical_features) - set(network_features) - set(interaction_features)
-    for col in sorted(other_features):
-        print(f"- {col}")
-    
-    print("\nFeature engineering test completed successfully!")
-    
+    return sample, processed_df, output_path
+
+def test_feature_engineering(tmp_path):
+    """Test the feature engineering pipeline with a small sample"""
+    sample, processed_df, output_path = run_feature_engineering(str(tmp_path))
+
+    # every row is kept, with the raw columns followed by every stage output in order
+    # (high_risk_combo needs a route delay rate, which no stage creates)
+    expected = list(sample.columns) + [col for stage in FEATURE_STAGES for col in stage.outputs
+                                       if col not in sample.columns and col != 'high_risk_combo']
+    assert len(processed_df) == len(sample)
+    assert list(processed_df.columns) == expected
+    assert os.path.exists(output_path)
+    assert os.listdir(os.path.join(tmp_path, 'feature_store'))
+
 if __name__ == "__main__":
-    test_feature_engineering()
\ No newline at end of file
+    # run as a script, the outputs are kept in data/test for inspection
+    project_dir = Path(__file__).resolve().parents[2]
+    sample, processed_df, output_path = run_feature_engineering(os.path.join(project_dir, 'data', 'test'))
+    print(f"Processed data shape: {processed_df.shape}, written to {output_path}")
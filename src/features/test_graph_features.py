@@ -0,0 +1,71 @@
+# src/features/test_graph_features.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from .build_features import convert_data_types
+from .graph_features import create_graph_features, fit_graph_statistics, hits, pagerank
+from ..data.synthetic import make_flights
+
+@pytest.fixture(scope='module')
+def flights():
+    return convert_data_types(make_flights(5000, n_airports=60, seed=0))
+
+def dense_pagerank(weights, damping=0.85):
+    """Stationary distribution of the PageRank walk, from the dense transition matrix."""
+    n = len(weights)
+    out = weights.sum(axis=1, keepdims=True)
+    transition = np.where(out > 0, weights / np.where(out > 0, out, 1), 1.0 / n)
+    google = damping * transition + (1 - damping) / n
+    values, vectors = np.linalg.eig(google.T)
+    rank = np.real(vectors[:, np.argmax(np.real(values))])
+    return rank / rank.sum()
+
+def test_scores_match_dense_solutions(flights):
+    statistics = fit_graph_statistics(flights)
+    airports = statistics['pagerank'].index
+    routes = flights.groupby(['Origin', 'Dest']).size()
+    weights = np.zeros((len(airports), len(airports)))
+    weights[airports.get_indexer(routes.index.get_level_values(0)),
+            airports.get_indexer(routes.index.get_level_values(1))] = routes.to_numpy()
+
+    np.testing.assert_allclose(statistics['pagerank'].to_numpy(), dense_pagerank(weights), atol=1e-9)
+    np.testing.assert_allclose(statistics['out_degree'].to_numpy(), weights.sum(axis=1))
+    np.testing.assert_allclose(statistics['in_degree'].to_numpy(), weights.sum(axis=0))
+
+    # hubs and authorities are the principal eigenvectors of W W^T and W^T W
+    for score, product in [('hub_score', weights @ weights.T), ('authority_score', weights.T @ weights)]:
+        values, vectors = np.linalg.eigh(product)
+        expected = np.abs(vectors[:, -1]) / np.abs(vectors[:, -1]).sum()
+        np.testing.assert_allclose(statistics[score].to_numpy(), expected, atol=1e-8)
+
+def test_carrier_degree_counts_distinct_airports(flights):
+    statistics = fit_graph_statistics(flights)
+    expected_out = flights.groupby(['UniqueCarrier', 'Origin'])['Dest'].nunique()
+    expected_in = flights.groupby(['UniqueCarrier', 'Dest'])['Origin'].nunique()
+    pd.testing.assert_series_equal(statistics['carrier_out_degree'], expected_out.rename(None), check_index_type=False)
+    pd.testing.assert_series_equal(statistics['carrier_in_degree'], expected_in.rename(None), check_index_type=False)
+
+def test_features_look_up_both_ends(flights):
+    statistics = fit_graph_statistics(flights)
+    test = pd.DataFrame({'Origin': ['ATL', 'NEW'], 'Dest': ['ORD', 'ATL'], 'UniqueCarrier': ['WN', 'WN']})
+    result = create_graph_features(test, statistics=statistics)
+    assert result['origin_pagerank'].tolist() == [statistics['pagerank']['ATL'], 0.0]
+    assert result['dest_in_degree'].tolist() == [statistics['in_degree']['ORD'], statistics['in_degree']['ATL']]
+    assert result['origin_carrier_degree'].tolist() == [statistics['carrier_out_degree'][('WN', 'ATL')], 0]
+
+def test_iterations_on_small_graphs():
+    # a cycle is symmetric, so every node gets the same rank
+    cycle = sparse.csr_matrix(np.roll(np.eye(4), 1, axis=1))
+    np.testing.assert_allclose(pagerank(cycle), 0.25)
+    # a star: the center is the only hub, the leaves the authorities
+    star = sparse.csr_matrix(([1.0, 1.0, 2.0], ([0, 0, 0], [1, 2, 3])), shape=(4, 4))
+    hub, authority = hits(star)
+    np.testing.assert_allclose(hub, [1, 0, 0, 0])
+    np.testing.assert_allclose(authority, [0, 0.25, 0.25, 0.5])
+    # no edges at all
+    hub, authority = hits(sparse.csr_matrix((3, 3)))
+    assert not hub.any() and not authority.any()
+    np.testing.assert_allclose(pagerank(sparse.csr_matrix((3, 3))), 1 / 3)
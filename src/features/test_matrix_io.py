@@ -0,0 +1,44 @@
+# src/features/test_matrix_io.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .build_features import build_features
+from ..data.matrix_io import load_feature_matrix
+from ..data.synthetic import make_flights
+from ..data.table_io import read_table
+
+@pytest.mark.parametrize('chunksize', [None, 700])
+def test_feature_matrix_matches_table_output(tmp_path, chunksize):
+    """The mapped matrix must hold the table's values, strings as codes in one train/test layout"""
+    make_flights(3000, seed=0).to_csv(tmp_path / 'train.csv', index=False)
+    make_flights(1000, seed=1).drop(columns='dep_delayed_15min').to_csv(tmp_path / 'test.csv', index=False)
+
+    for name, is_train in [('train', True), ('test', False)]:
+        for fmt in ['parquet', 'npy']:
+            build_features(str(tmp_path / f'{name}.csv'), str(tmp_path / fmt / f'{name}.{fmt}'), is_train=is_train,
+                           feature_store_path=str(tmp_path / fmt / 'feature_store'), chunksize=chunksize)
+
+    train = load_feature_matrix(tmp_path / 'npy' / 'train.npy')
+    assert isinstance(train.features, np.memmap) and train.features.dtype == np.float32
+    for name in ['train', 'test']:
+        table = read_table(tmp_path / 'parquet' / f'{name}.parquet')
+        matrix = load_feature_matrix(tmp_path / 'npy' / f'{name}.npy')
+        assert matrix.columns == train.columns and matrix.categories == train.categories
+        assert matrix.features.shape == (len(table), len(train.columns))
+        if name == 'train':
+            np.testing.assert_array_equal(matrix.labels, table['dep_delayed_15min'].astype(np.float32))
+        else:
+            assert matrix.labels is None
+
+        for i, col in enumerate(matrix.columns):
+            values = matrix.features[:, i]
+            if col in matrix.categories:
+                # codes decode to the strings; test values unseen in training are missing
+                decoded = pd.Series(pd.Categorical.from_codes(np.nan_to_num(values, nan=-1).astype(int),
+                                                              matrix.categories[col]), dtype=object)
+                expected = table[col].astype(object).where(table[col].isin(matrix.categories[col]))
+                pd.testing.assert_series_equal(decoded, expected, check_names=False)
+            else:
+                np.testing.assert_array_equal(values, table[col].to_numpy(dtype=np.float32, na_value=np.nan))
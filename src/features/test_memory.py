@@ -0,0 +1,27 @@
+# src/features/test_memory.py
+
+import tracemalloc
+
+from .build_features import convert_data_types, create_features
+from .feature_store import FeatureStore
+from ..data.synthetic import make_flights
+
+def test_copy_free_pipeline_peak_memory():
+    """Peak memory of the in-place pipeline must stay within input plus final output"""
+    df = convert_data_types(make_flights(50000, n_airports=8, n_carriers=4))
+    input_bytes = df.memory_usage(deep=True).sum()
+    
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        out = create_features(df, FeatureStore(), fit=True, copy=False)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    
+    output_bytes = out.memory_usage(deep=True).sum()
+    assert out is df
+    # the input is already resident, so input + peak must fit in input + output
+    assert peak <= output_bytes, (
+        f"peak {peak / 1e6:.1f}MB on top of input {input_bytes / 1e6:.1f}MB exceeds output {output_bytes / 1e6:.1f}MB"
+    )
@@ -0,0 +1,50 @@
+# src/features/test_pipeline.py
+
+import pandas as pd
+import pytest
+
+from .build_features import convert_data_types, create_features
+from .feature_store import FeatureStore
+from .pipeline import FEATURE_STAGES, project_stages
+from ..data.synthetic import make_flights
+
+FEATURES = [col for stage in FEATURE_STAGES for col in stage.outputs]
+
+@pytest.fixture(scope='module')
+def flights():
+    train = convert_data_types(make_flights(3000, n_airports=40, seed=0))
+    test = convert_data_types(make_flights(1000, n_airports=40, seed=1).drop(columns='dep_delayed_15min'))
+    store = FeatureStore()
+    full_train = create_features(train, store, fit=True)
+    return train, test, store, full_train, create_features(test, store)
+
+@pytest.mark.parametrize('feature', FEATURES)
+def test_projected_feature_matches_full_pipeline(flights, feature):
+    """Computing one feature alone must give the column of the full run, and nothing else"""
+    train, test, store, full_train, full_test = flights
+    if feature not in full_test.columns:
+        pytest.skip(f'{feature} is not created from this data')
+
+    projected = create_features(test, store, features=[feature])
+    assert list(projected.columns) == list(test.columns) + [feature]
+    pd.testing.assert_series_equal(projected[feature], full_test[feature])
+
+    fitted = create_features(train, FeatureStore(), fit=True, features=[feature], n_jobs=2)
+    pd.testing.assert_series_equal(fitted[feature], full_train[feature])
+
+def test_projection_skips_unused_stages_and_statistics():
+    """Only the stages (and store modules) on the path to the requested features run"""
+    stages = project_stages(['dep_hour_sin', 'origin_hour_delay_rate'])
+    assert {stage.name: stage.outputs for stage in stages} == {
+        'temporal': ('dep_hour',),
+        'airport': ('origin_delay_rate',),
+        'cyclical': ('dep_hour_sin',),
+        'network': ('origin_hour_delay_rate',),
+    }
+
+    store = FeatureStore()
+    create_features(convert_data_types(make_flights(500, seed=0)), store, fit=True, features=['route_carrier_count'])
+    assert set(store.statistics) == {'carrier'}
+
+    with pytest.raises(ValueError, match='not_a_feature'):
+        create_features(convert_data_types(make_flights(10, seed=0)), store, features=['not_a_feature'])
@@ -0,0 +1,36 @@
+# src/features/test_profiling.py
+
+import json
+
+import pytest
+
+from .build_features import build_features
+from .pipeline import FEATURE_STAGES
+from .profiling import PipelineProfiler
+from ..data.synthetic import make_flights
+
+@pytest.mark.parametrize('chunksize, n_jobs', [(None, 1), (None, 2), (400, 1), (400, 2)])
+def test_profile_report_covers_every_stage(tmp_path, chunksize, n_jobs):
+    """The report must account for every stage and every column the pipeline adds"""
+    make_flights(1000, seed=0).to_csv(tmp_path / 'train.csv', index=False)
+    seen = []
+    profiler = PipelineProfiler(callbacks=[seen.append])
+    
+    build_features(str(tmp_path / 'train.csv'), str(tmp_path / 'out' / 'train.csv'), True,
+                   str(tmp_path / 'feature_store'), chunksize=chunksize, n_jobs=n_jobs, profiler=profiler)
+    profiler.save(tmp_path / 'profile.json')
+    
+    with open(tmp_path / 'profile.json') as f:
+        report = json.load(f)
+    stages = {summary['stage']: summary for summary in report['stages']}
+    assert {stage.name for stage in FEATURE_STAGES} | {'load', 'convert', 'fit', 'write'} <= stages.keys()
+    assert len(seen) == len(profiler.records)
+    
+    added = [col for stage in FEATURE_STAGES for col in stages[stage.name]['columns_added']]
+    with open(tmp_path / 'out' / 'train.csv') as f:
+        header = f.readline().strip().split(',')
+    assert sorted(added) == sorted(set(header) - set(make_flights(1).columns))
+    
+    transform_rows = stages['network']['rows']
+    assert transform_rows == 1000
+    assert all(summary['wall_s'] >= 0 and summary['peak_memory_delta_bytes'] >= 0 for summary in report['stages'])
@@ -0,0 +1,41 @@
+# src/features/test_ranking.py
+
+import numpy as np
+import pandas as pd
+
+from .ranking import pct_rank
+
+def _random_counts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_arrays(
+        [rng.choice(['ORD', 'ATL', 'DFW', 'SEA'], n), rng.choice(['JFK', 'LAX', 'BOS'], n), np.arange(n)],
+        names=['Origin', 'Dest', 'dep_hour'],
+    )
+    # few distinct values, so there are plenty of ties
+    return pd.Series(rng.integers(1, 5, n).astype(float), index=index)
+
+def test_pct_rank_matches_pandas_rank():
+    """Global and grouped ranks must equal pandas' average-tie ranks, keeping missing values missing"""
+    values = _random_counts(500)
+    values.iloc[[3, 40]] = np.nan
+
+    pd.testing.assert_series_equal(pct_rank(values), values.rank(pct=True), check_exact=True)
+    pd.testing.assert_series_equal(
+        pct_rank(values, ['Origin', 'Dest']),
+        values.groupby(level=['Origin', 'Dest']).rank(pct=True),
+        check_exact=True,
+    )
+
+def test_weighted_pct_rank_matches_expanded_rows():
+    """Weighting counts by themselves must equal ranking the rows they count, with the singleton rule"""
+    counts = _random_counts(300, seed=1).astype(np.int64)
+    # a single-flight route
+    counts = pd.concat([counts, pd.Series([1], index=pd.MultiIndex.from_tuples([('SEA', 'SEA', 0)], names=counts.index.names))])
+
+    ranks = pct_rank(counts, ['Origin', 'Dest'], weights=counts, singleton=0.5)
+
+    rows = counts.index.repeat(counts.values)
+    row_ranks = counts.reindex(rows).groupby(level=['Origin', 'Dest']).rank(pct=True)
+    expected = row_ranks.groupby(level=list(range(3))).first().reindex(counts.index)
+    expected[('SEA', 'SEA', 0)] = 0.5
+    pd.testing.assert_series_equal(ranks, expected, check_exact=True, check_names=False)
@@ -0,0 +1,97 @@
+# src/features/test_runtime.py
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from .build_features import convert_data_types, create_features
+from .feature_store import FeatureStore
+from .runtime import FeatureRuntime, compile_runtime
+from ..data.matrix_io import FeatureMatrixEncoder
+from ..data.synthetic import make_flights
+
+@pytest.fixture(scope='module')
+def fitted(tmp_path_factory):
+    """A store and matrix layout fitted on training flights, and the runtime compiled from them (saved and reloaded)."""
+    store = FeatureStore()
+    encoder = FeatureMatrixEncoder()
+    encoder.encode(create_features(convert_data_types(make_flights(3000, seed=0)), store, fit=True))
+    layout = encoder.layout()
+    path = tmp_path_factory.mktemp('runtime') / 'model.runtime.npz'
+    compile_runtime(store, layout).save(path)
+    return store, layout, path
+
+def _expected(df, store, layout):
+    """Feature matrix of the pandas path."""
+    features = create_features(convert_data_types(df), store, features=layout['columns'])
+    return FeatureMatrixEncoder(layout).encode(features)
+
+def _arrays(df):
+    return {col: df[col].to_numpy() for col in df.columns}
+
+def test_runtime_matches_pandas_path(fitted):
+    """The runtime must produce exactly the matrix of create_features and FeatureMatrixEncoder"""
+    store, layout, path = fitted
+    runtime = FeatureRuntime.load(path)
+    test = make_flights(1000, seed=1).drop(columns='dep_delayed_15min')
+    # unseen airports and carriers, dates and times outside the tables, distances on the bin edges
+    edge = test.head(8).copy()
+    edge['Month'] = ['c-13', 'c-0', 'c-2', 'c-12', 'c-1', 'c-7', 'c-3', 'c-11']
+    edge['DayofMonth'] = ['c-32', 'c-0', 'c-30', 'c-25', 'c-1', 'c-4', 'c-17', 'c-31']
+    edge['DepTime'] = [2530, 0, 2400, 2600, 5, 2359, 3000, 2459]
+    edge['Distance'] = [0, 300, 301, 5000, 5001, 1000, 2000, 600]
+    edge['Origin'] = ['ABC', 'ORD', 'NOP', 'ATL', 'ORD', 'JFK', 'SEA', 'BOS']
+    edge['UniqueCarrier'] = ['AA', 'QQ', 'UA', 'DL', 'WN', 'ZZ', 'AA', 'UA']
+
+    # one date, so the congestion windows hold many departures, some from an airport outside the vocabulary
+    dense = test.assign(Month='c-7', DayofMonth='c-4')
+    dense.loc[:99, 'Origin'] = 'ABC'
+
+    for df in [test, edge, dense]:
+        np.testing.assert_array_equal(runtime.transform(_arrays(df)), _expected(df, store, layout))
+
+def test_runtime_fills_preallocated_matrix(fitted):
+    store, layout, path = fitted
+    runtime = FeatureRuntime.load(path)
+    test = make_flights(50, seed=2).drop(columns='dep_delayed_15min')
+    # integer calendar fields as well as the "c-" encoding
+    data = _arrays(convert_data_types(test))
+    out = np.empty((len(test), len(layout['columns'])), dtype=np.float32)
+    assert runtime.transform(data, out=out) is out
+    np.testing.assert_array_equal(out, _expected(test, store, layout))
+
+    single = runtime.transform({col: values[:1] for col, values in data.items()})
+    np.testing.assert_array_equal(single, out[:1])
+
+    with pytest.raises(ValueError):
+        runtime.transform(data, out=np.empty((len(test), 2), dtype=np.float32))
+    with pytest.raises(KeyError):
+        runtime.transform({col: values for col, values in data.items() if col != 'Distance'})
+
+def test_runtime_does_not_import_pandas(fitted):
+    """Loading the runtime and transforming with it must leave pandas unimported"""
+    _, _, path = fitted
+    script = (
+        "import sys\n"
+        "import numpy as np\n"
+        "from src.features.runtime import FeatureRuntime\n"
+        "runtime = FeatureRuntime.load(sys.argv[1])\n"
+        "runtime.transform({'Month': np.array([7]), 'DayofMonth': np.array([4]), 'DayOfWeek': np.array([2]),\n"
+        "                   'DepTime': np.array([1430]), 'UniqueCarrier': np.array(['AA']),\n"
+        "                   'Origin': np.array(['ORD']), 'Dest': np.array(['ATL']), 'Distance': np.array([600])})\n"
+        "print(sorted(name for name in sys.modules if name.split('.')[0] in ('pandas', 'joblib', 'scipy')))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output = subprocess.run([sys.executable, '-c', script, str(path)], cwd=root, check=True,
+                            capture_output=True, text=True)
+    assert output.stdout.strip() == '[]'
+
+def test_compile_rejects_unfitted_store_and_unknown_features(fitted):
+    store, layout, _ = fitted
+    with pytest.raises(ValueError):
+        compile_runtime(FeatureStore(), layout)
+    with pytest.raises(ValueError):
+        compile_runtime(store, {**layout, 'columns': layout['columns'] + ['high_risk_combo']})
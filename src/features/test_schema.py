@@ -0,0 +1,71 @@
+# src/features/test_schema.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .build_features import build_features, convert_data_types
+from ..data.schema import BadRowReport, iter_flight_chunks, read_flights, validate_flights
+from ..data.synthetic import make_flights
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'feather'])
+def test_read_flights_parses_to_compact_dtypes(tmp_path, fmt):
+    """read_flights must give the values of convert_data_types, in compact dtypes, whole or in chunks"""
+    raw = make_flights(2000, seed=0)
+    path = tmp_path / f'flights.{fmt}'
+    getattr(raw, 'to_csv' if fmt == 'csv' else f'to_{fmt}')(path, **({'index': False} if fmt == 'csv' else {}))
+
+    df = read_flights(path)
+    expected = convert_data_types(raw)
+    assert list(df.columns) == list(raw.columns)
+    assert {col: str(df[col].dtype) for col in ['Month', 'DayofMonth', 'DepTime', 'dep_delayed_15min']} == \
+        {'Month': 'int8', 'DayofMonth': 'int8', 'DepTime': 'int16', 'dep_delayed_15min': 'int8'}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            assert (df[col].astype(object) == expected[col]).all()
+        else:
+            np.testing.assert_array_equal(df[col].to_numpy(), expected[col].to_numpy())
+
+    chunks = list(iter_flight_chunks(path, 700, columns=['Month', 'Origin', 'Nope']))
+    assert [len(chunk) for chunk in chunks] == [700, 700, 600]
+    chunked = pd.concat(chunks)
+    pd.testing.assert_index_equal(chunked.index, pd.RangeIndex(2000))
+    np.testing.assert_array_equal(chunked['Month'].to_numpy(), df['Month'].to_numpy())
+    assert (chunked['Origin'].astype(object) == df['Origin'].astype(object)).all()
+
+def test_bad_rows_are_reported_dropped_or_raised(tmp_path):
+    raw = make_flights(100, seed=1)
+    raw.loc[3, 'Month'] = 'c-13'
+    raw.loc[5, 'DepTime'] = 2500
+    raw.loc[7, 'DayofMonth'] = 'c-x'
+    raw.loc[7, 'dep_delayed_15min'] = 'Q'
+    raw.to_csv(tmp_path / 'flights.csv', index=False)
+
+    report = BadRowReport()
+    kept = read_flights(tmp_path / 'flights.csv', report=report)
+    assert len(kept) == 100 and np.isnan(kept.loc[7, 'DayofMonth'])
+    assert report.n_rows == 3 and report.n_values == 4
+    assert report.counts == {'Month': 1, 'DayofMonth': 1, 'DepTime': 1, 'dep_delayed_15min': 1}
+    issues = report.to_frame()
+    assert sorted(issues['row']) == [3, 5, 7, 7]
+    assert issues.loc[issues['column'] == 'DepTime', 'value'].tolist() == [2500.0]
+
+    dropped = read_flights(tmp_path / 'flights.csv', on_bad_rows='drop')
+    assert len(dropped) == 97 and not {3, 5, 7} & set(dropped.index)
+    assert dropped['DayofMonth'].dtype == np.int8 and len(validate_flights(dropped)) == 0
+
+    with pytest.raises(ValueError, match='3 bad rows'):
+        list(iter_flight_chunks(tmp_path / 'flights.csv', 50, on_bad_rows='raise'))
+
+    build_features(str(tmp_path / 'flights.csv'), str(tmp_path / 'out' / 'features.parquet'),
+                   feature_store_path=str(tmp_path / 'store'), on_bad_rows='drop',
+                   bad_rows_path=str(tmp_path / 'bad_rows.csv'))
+    assert sorted(pd.read_csv(tmp_path / 'bad_rows.csv')['row']) == [3, 5, 7, 7]
+
+def test_convert_data_types_accepts_mixed_encodings():
+    """Records may mix the "c-" strings with plain integers, as the scoring server receives them"""
+    df = pd.DataFrame({'Month': ['c-7', 7, '12'], 'DayofMonth': [1, 2, 3], 'dep_delayed_15min': ['Y', 'N', 'Y']})
+    converted = convert_data_types(df)
+    assert converted['Month'].tolist() == [7, 7, 12] and converted['Month'].dtype == np.int8
+    assert converted['DayofMonth'].dtype == np.int8
+    assert converted['dep_delayed_15min'].tolist() == [1, 0, 1]
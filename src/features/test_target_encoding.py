@@ -0,0 +1,57 @@
+# src/features/test_target_encoding.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .build_features import convert_data_types, create_features
+from .feature_store import FeatureStore
+from .target_encoding import DELAY_RATE_FEATURES, assign_folds, out_of_fold_delay_rates
+from .temporal_features import create_temporal_features
+from ..data.synthetic import make_flights
+
+def _naive_out_of_fold(df, folds, n_folds, smoothing):
+    """Refit every delay rate on the other folds, one fold at a time."""
+    expected = pd.DataFrame(index=df.index, columns=[col for col, *_ in DELAY_RATE_FEATURES], dtype=float)
+    for fold in range(n_folds):
+        train, held_out = df[folds != fold], df[folds == fold]
+        prior = train['dep_delayed_15min'].mean()
+        for col, _, _, keys in DELAY_RATE_FEATURES:
+            grouped = train.groupby(keys)['dep_delayed_15min'].agg(['sum', 'count'])
+            rates = (grouped['sum'] + smoothing * prior) / (grouped['count'] + smoothing)
+            keyed = pd.MultiIndex.from_frame(held_out[keys]) if len(keys) > 1 else pd.Index(held_out[keys[0]])
+            values = rates.reindex(keyed).to_numpy()
+            if smoothing:
+                # keys unseen outside the fold get the prior
+                values = np.where(np.isnan(values), prior, values)
+            expected.loc[held_out.index, col] = values
+    expected['origin_hour_delay_rate'] = expected['origin_hour_delay_rate'].fillna(expected['origin_delay_rate'])
+    return expected
+
+@pytest.mark.parametrize('smoothing', [0.0, 20.0])
+def test_out_of_fold_matches_refitting_each_fold(smoothing):
+    """One counting pass must give the rates of refitting on the other folds"""
+    df = create_temporal_features(convert_data_types(make_flights(3000, n_airports=60, seed=0)))
+    folds = assign_folds(len(df), 5, seed=1)
+
+    encoded = out_of_fold_delay_rates(df, 5, smoothing=smoothing, folds=folds)
+
+    pd.testing.assert_frame_equal(encoded, _naive_out_of_fold(df, folds, 5, smoothing), check_exact=False, rtol=1e-12)
+
+def test_create_features_out_of_fold_and_smoothed_store(tmp_path):
+    """The flag only changes the training delay rates; a smoothed store keeps its smoothing when saved"""
+    train = convert_data_types(make_flights(2000, n_airports=40, seed=0))
+    plain = create_features(train, FeatureStore(), fit=True)
+    store = FeatureStore(smoothing=10.0)
+    encoded = create_features(train, store, fit=True, out_of_fold=5)
+
+    rate_columns = [col for col, *_ in DELAY_RATE_FEATURES]
+    pd.testing.assert_frame_equal(encoded.drop(columns=rate_columns), plain.drop(columns=rate_columns))
+    assert not np.allclose(encoded['origin_delay_rate'], plain['origin_delay_rate'])
+
+    for path in [tmp_path / 'store.joblib', tmp_path / 'store.parquet']:
+        store.save(str(path))
+        loaded = FeatureStore.load(str(path))
+        assert loaded.smoothing == 10.0
+        assert (loaded.statistics['airport']['origin_delay_rates'].to_dict()
+                == store.statistics['airport']['origin_delay_rates'].to_dict())
@@ -0,0 +1,200 @@
+# src/models/predict.py
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from ..data.matrix_io import FeatureMatrixEncoder
+from ..data.schema import iter_flight_chunks
+from ..data.table_io import TableWriter
+from ..features.build_features import find_raw_file, read_schedule, transform_chunks
+from ..features.feature_store import load_feature_store
+from .train import model_layout_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 200_000
+
+# chunks each pipeline stage may run ahead of the next one
+DEFAULT_PREFETCH = 2
+
+PREDICTION_COLUMN = 'dep_delayed_15min'
+
+def load_model(model_path):
+    """
+    Prediction function of a booster saved by src.models.train.
+
+    Parameters:
+    -----------
+    model_path : str
+        LightGBM model (.txt) or XGBoost model (.json)
+
+    Returns:
+    --------
+    callable
+        Maps a float32 feature block to delay probabilities
+    """
+    if str(model_path).endswith('.txt'):
+        import lightgbm as lgb
+
+        return lgb.Booster(model_file=str(model_path)).predict
+
+    import xgboost as xgb
+
+    booster = xgb.Booster(model_file=str(model_path))
+    # in-place prediction reads the block directly instead of copying it into a DMatrix
+    return booster.inplace_predict
+
+def prefetch(items, depth=DEFAULT_PREFETCH):
+    """
+    Iterate over items while a background thread produces up to depth of them ahead.
+
+    Chaining prefetch over the stages of a stream (read, transform, predict)
+    runs them concurrently on separate threads, with at most depth finished
+    items waiting between two stages, so memory stays bounded however long
+    the stream is. Exceptions of the producer are raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # give up once the consumer is gone, instead of blocking on a full queue forever
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as exc:
+            put((done, exc))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, exc = buffer.get()
+            if exc is not None:
+                raise exc
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+def predict_file(input_filepath, output_filepath, model_path, feature_store_path, chunksize=DEFAULT_CHUNKSIZE,
+                 n_jobs=1, depth=DEFAULT_PREFETCH):
+    """
+    Score a raw flight file in a streaming pipeline.
+
+    Chunks are read, transformed with the fitted feature store (computing
+    only the features the model uses), encoded in the training matrix
+    layout, scored and appended to the output, with every stage on its own
+    thread (and the transform on n_jobs worker processes) so reading,
+    featurization, inference and writing overlap. Only a bounded
+    number of chunks is in memory at a time, so files larger than memory are
+    scored at a steady rate.
+
+    Parameters:
+    -----------
+    input_filepath : str
+        Raw flight data (.csv, .parquet or .feather)
+    output_filepath : str
+        Output table with the row id and the delay probability of every flight
+    model_path : str
+        Model saved by src.models.train, with its .features.json layout next to it
+    feature_store_path : str
+        Directory of the fitted feature store
+    chunksize : int, default=DEFAULT_CHUNKSIZE
+        Rows per chunk
+    n_jobs : int, default=1
+        Worker processes transforming chunks
+    depth : int, default=DEFAULT_PREFETCH
+        Chunks each stage may run ahead of the next one
+
+    Returns:
+    --------
+    dict
+        rows, seconds and rows_per_second of the run
+    """
+    store = load_feature_store(feature_store_path)
+    if store is None:
+        raise FileNotFoundError(f"No fitted feature store in {feature_store_path}")
+    with open(model_layout_file(model_path)) as f:
+        encoder = FeatureMatrixEncoder(json.load(f))
+    predict = load_model(model_path)
+
+    def encoded(chunks):
+        for chunk in chunks:
+            yield chunk.index.to_numpy(), encoder.encode(chunk)
+
+    def scored(blocks):
+        for ids, block in blocks:
+            yield pd.DataFrame({'id': ids, PREDICTION_COLUMN: predict(block)})
+
+    start = time.perf_counter()
+    # congestion windows count the departures of the whole file, not of each chunk
+    schedule = read_schedule(input_filepath, chunksize, encoder.columns)
+    chunks = prefetch(iter_flight_chunks(input_filepath, chunksize), depth)
+    # only the model's features are computed
+    blocks = prefetch(encoded(transform_chunks(chunks, store, n_jobs=n_jobs, features=encoder.columns,
+                                               schedule=schedule)), depth)
+    with TableWriter(output_filepath) as writer:
+        for predictions in prefetch(scored(blocks), depth):
+            writer.write(predictions)
+            seconds = time.perf_counter() - start
+            logger.info("Scored %d rows (%.0f rows/sec)", writer.n_rows, writer.n_rows / seconds)
+
+    seconds = time.perf_counter() - start
+    stats = {'rows': writer.n_rows, 'seconds': seconds, 'rows_per_second': writer.n_rows / seconds if seconds else 0.0}
+    logger.info("Wrote %d predictions to %s in %.2fs (%.0f rows/sec)", stats['rows'], output_filepath,
+                seconds, stats['rows_per_second'])
+    return stats
+
+def main():
+    """
+    Entry point for batch prediction.
+    Example usage:
+        python -m src.models.predict
+        python -m src.models.predict --input data/raw/schedule.parquet --output data/processed/schedule_predictions.parquet
+        python -m src.models.predict --model models/xgboost_model.json --chunksize 500000 --n-jobs 4
+    """
+    parser = argparse.ArgumentParser(description='Score flights with a trained delay model')
+    parser.add_argument('--input', default=None, help='raw flights to score (defaults to data/raw/flight_delays_test.*)')
+    parser.add_argument('--output', default=None,
+                        help='output table (defaults to data/processed/flight_delays_test_predictions.csv)')
+    parser.add_argument('--model', default=None, help='saved model (defaults to models/lightgbm_model.txt)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows per chunk')
+    parser.add_argument('--n-jobs', type=int, default=1, help='worker processes transforming chunks')
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH,
+                        help='chunks each pipeline stage may run ahead of the next one')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    # project base path
+    project_dir = Path(__file__).resolve().parents[2]
+    input_path = args.input or find_raw_file(os.path.join(project_dir, 'data', 'raw'), 'flight_delays_test')
+    output_path = args.output or os.path.join(project_dir, 'data', 'processed', 'flight_delays_test_predictions.csv')
+    model_path = args.model or os.path.join(project_dir, 'models', 'lightgbm_model.txt')
+    feature_store_path = os.path.join(project_dir, 'models', 'feature_store')
+
+    predict_file(input_path, output_path, model_path, feature_store_path, args.chunksize, args.n_jobs, args.prefetch)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+# src/models/serve.py
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from ..data.matrix_io import FeatureMatrixEncoder
+from ..features.build_features import convert_data_types, create_features
+from ..features.feature_store import load_feature_store
+from .predict import PREDICTION_COLUMN, load_model
+from .train import model_layout_file
+
+logger = logging.getLogger(__name__)
+
+# raw fields every flight of a request must have
+FLIGHT_FIELDS = ['Month', 'DayofMonth', 'DayOfWeek', 'DepTime', 'UniqueCarrier', 'Origin', 'Dest', 'Distance']
+
+DEFAULT_MAX_BATCH_SIZE = 256
+
+# longest a request waits for others to share its batch
+DEFAULT_MAX_LATENCY = 0.005
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+
+# largest accepted request body
+MAX_BODY_BYTES = 1 << 20
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class Scorer:
+    """
+    Featurize and score batches of raw flight records in one vectorized pass.
+
+    The fitted feature store, the model and its feature layout are loaded
+    once; every call builds one frame from the records, computes only the
+    features the model uses and scores them with a single model call. The
+    congestion windows count the other flights of the call, as they count
+    those of the frame in batch featurization; no schedule is kept beyond it.
+
+    Parameters:
+    -----------
+    model_path : str
+        Model saved by src.models.train, with its .features.json layout next to it
+    feature_store_path : str
+        Directory of the fitted feature store
+    """
+
+    def __init__(self, model_path, feature_store_path):
+        self.store = load_feature_store(feature_store_path)
+        if self.store is None:
+            raise FileNotFoundError(f"No fitted feature store in {feature_store_path}")
+        with open(model_layout_file(model_path)) as f:
+            self.encoder = FeatureMatrixEncoder(json.load(f))
+        self.predict = load_model(model_path)
+
+    def __call__(self, records):
+        """
+        Delay probability of every record.
+
+        Parameters:
+        -----------
+        records : list of dict
+            Raw flight fields (see FLIGHT_FIELDS)
+
+        Returns:
+        --------
+        list of float
+        """
+        # records may mix the "c-" encoding and plain integers; both parse to the schema dtypes
+        df = convert_data_types(pd.DataFrame.from_records(records, columns=FLIGHT_FIELDS), copy=False)
+        df = create_features(df, self.store, copy=False, features=self.encoder.columns)
+        return self.predict(self.encoder.encode(df)).tolist()
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-item calls into batched calls of func.
+
+    Items submitted while a batch is being collected or processed are queued;
+    a batch is closed when it holds max_batch_size items or when its first
+    item has waited max_latency seconds, and is then processed by func on a
+    worker thread so the event loop keeps accepting requests. Under load the
+    queue refills while a batch runs, so batches grow with the request rate
+    and the per-call overhead of func is shared by more requests.
+
+    Parameters:
+    -----------
+    func : callable
+        Maps a list of items to a list of results of the same length
+    max_batch_size : int, default=DEFAULT_MAX_BATCH_SIZE
+        Most items per call of func
+    max_latency : float, default=DEFAULT_MAX_LATENCY
+        Seconds an item may wait for others before its batch is processed
+    """
+
+    def __init__(self, func, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_latency=DEFAULT_MAX_LATENCY):
+        self.func = func
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._full = None
+        self._task = None
+        self._executor = None
+
+    def start(self):
+        """Start collecting batches on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batch')
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        """Stop collecting batches; queued items get a CancelledError."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait()[1].cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    async def submit(self, item):
+        """Result of func for item, computed in a batch with the items submitted around it."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        # the collecting batch already holds one item
+        if self._queue.qsize() >= self.max_batch_size - 1:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # the first item's deadline counts from its arrival, so items that queued up
+            # while the previous batch ran are not held back any longer
+            timeout = batch[0][2] + self.max_latency - time.perf_counter()
+            if timeout > 0 and self._queue.qsize() < self.max_batch_size - 1:
+                # wait on an event rather than on the queue, so a timeout never loses an item
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            results = await self._process(loop, [item for item, _, _ in batch])
+            self.batches += 1
+            self.items += len(batch)
+            logger.debug("Processed a batch of %d items", len(batch))
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _process(self, loop, items):
+        """Results of func for items; if the batch fails, items are retried alone so only the bad ones fail."""
+        try:
+            return await loop.run_in_executor(self._executor, self.func, items)
+        except Exception as exc:
+            if len(items) == 1:
+                return [exc]
+        results = []
+        for item in items:
+            try:
+                results.extend(await loop.run_in_executor(self._executor, self.func, [item]))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+class ScoringServer:
+    """
+    Local HTTP/1.1 server scoring flights with micro-batching.
+
+    Endpoints:
+        GET /health   -> {"status": "ok", "batches": ..., "flights": ...}
+        POST /predict -> a flight object gives {"dep_delayed_15min": p}, a
+                         list of flights gives {"dep_delayed_15min": [p, ...]}
+
+    Every flight of every request goes through one MicroBatcher, so concurrent
+    requests are featurized and scored together. Connections are kept alive
+    between requests unless the client asks to close them.
+
+    Parameters:
+    -----------
+    scorer : callable
+        Maps a list of flight records to their delay probabilities (e.g. a Scorer)
+    max_batch_size : int, default=DEFAULT_MAX_BATCH_SIZE
+        Most flights scored in one call
+    max_latency : float, default=DEFAULT_MAX_LATENCY
+        Seconds a flight may wait for others to share its batch
+    """
+
+    def __init__(self, scorer, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_latency=DEFAULT_MAX_LATENCY):
+        self.batcher = MicroBatcher(scorer, max_batch_size, max_latency)
+        self.server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None):
+        """Start listening on host:port, or on a Unix socket path if given; returns the asyncio server."""
+        self.batcher.start()
+        if unix_socket is not None:
+            self.server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    async def close(self):
+        """Stop listening and cancel the flights still waiting for a batch."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.close()
+
+    async def _handle(self, reader, writer):
+        """Serve the requests of one connection."""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._respond(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except _BadRequest as exc:
+            writer.write(_response(exc.status, {'error': str(exc)}, keep_alive=False))
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, path, body):
+        """Status and JSON payload of one request."""
+        if path == '/health':
+            return 200, {'status': 'ok', 'batches': self.batcher.batches, 'flights': self.batcher.items}
+        if path != '/predict':
+            return 404, {'error': f'no route {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        try:
+            flights = json.loads(body)
+            single = isinstance(flights, dict)
+            flights = [flights] if single else flights
+            _validate(flights)
+        except ValueError as exc:
+            return 400, {'error': str(exc)}
+        try:
+            scores = await asyncio.gather(*(self.batcher.submit(flight) for flight in flights))
+        except Exception as exc:
+            logger.exception("Scoring failed")
+            return 500, {'error': str(exc)}
+        return 200, {PREDICTION_COLUMN: scores[0] if single else scores}
+
+class _BadRequest(Exception):
+    """A request that cannot be parsed; the connection is closed after the error response."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def _validate(flights):
+    """Raise ValueError unless flights is a list of objects with every FLIGHT_FIELDS field."""
+    if not isinstance(flights, list) or not all(isinstance(flight, dict) for flight in flights):
+        raise ValueError('expected a flight object or a list of flight objects')
+    for flight in flights:
+        missing = [field for field in FLIGHT_FIELDS if field not in flight]
+        if missing:
+            raise ValueError(f'flight is missing {missing}')
+
+async def _read_request(reader):
+    """Method, path, lower-cased headers and body of the next request (None once the client is done)."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin1').split(' ', 2)
+    except ValueError:
+        raise _BadRequest('malformed request line')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise _BadRequest('malformed Content-Length')
+    if length > MAX_BODY_BYTES:
+        raise _BadRequest(f'body larger than {MAX_BODY_BYTES} bytes', status=413)
+    body = await reader.readexactly(length) if length else b''
+    return method, target.split('?', 1)[0], headers, body
+
+def _response(status, payload, keep_alive=True):
+    """Bytes of a JSON HTTP/1.1 response."""
+    body = json.dumps(payload).encode()
+    head = (f'HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode('latin1') + body
+
+async def serve(model_path, feature_store_path, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None,
+                max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_latency=DEFAULT_MAX_LATENCY):
+    """Load the store and model once and serve until cancelled."""
+    server = ScoringServer(Scorer(model_path, feature_store_path), max_batch_size, max_latency)
+    await server.start(host, port, unix_socket)
+    logger.info("Serving %s on %s (batches of up to %d flights, %.1f ms budget)", model_path,
+                unix_socket or f'http://{host}:{port}', max_batch_size, max_latency * 1000)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+def main():
+    """
+    Entry point for the scoring server.
+    Example usage:
+        python -m src.models.serve
+        python -m src.models.serve --port 8080 --max-batch-size 512 --max-latency-ms 10
+        python -m src.models.serve --unix-socket /tmp/flight_delays.sock
+        curl -X POST localhost:8080/predict -d '{"Month": 7, "DayofMonth": 4, "DayOfWeek": 5, "DepTime": 1830,
+             "UniqueCarrier": "AA", "Origin": "ATL", "Dest": "ORD", "Distance": 606}'
+    """
+    parser = argparse.ArgumentParser(description='Serve flight delay predictions over HTTP')
+    parser.add_argument('--model', default=None, help='saved model (defaults to models/lightgbm_model.txt)')
+    parser.add_argument('--feature-store', default=None,
+                        help='fitted feature store directory (defaults to models/feature_store)')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix-socket', default=None, help='listen on this Unix socket instead of host:port')
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help='most flights featurized and scored together')
+    parser.add_argument('--max-latency-ms', type=float, default=DEFAULT_MAX_LATENCY * 1000,
+                        help='longest a flight waits for others to share its batch')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    # project base path
+    project_dir = Path(__file__).resolve().parents[2]
+    model_path = args.model or os.path.join(project_dir, 'models', 'lightgbm_model.txt')
+    feature_store_path = args.feature_store or os.path.join(project_dir, 'models', 'feature_store')
+
+    try:
+        asyncio.run(serve(model_path, feature_store_path, args.host, args.port, args.unix_socket,
+                          args.max_batch_size, args.max_latency_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
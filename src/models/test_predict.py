@@ -0,0 +1,47 @@
+# src/models/test_predict.py
+
+import numpy as np
+import pytest
+
+from . import train
+from .predict import load_model, predict_file, prefetch
+from ..data.matrix_io import load_feature_matrix
+from ..data.synthetic import make_flights
+from ..data.table_io import read_table
+from ..features.build_features import build_features
+
+@pytest.mark.parametrize('model', train.MODELS)
+def test_streaming_predictions_match_batch_scoring(tmp_path, monkeypatch, model):
+    """Scoring chunk by chunk must give the model's predictions on the whole test matrix"""
+    monkeypatch.setattr(train, 'MAX_ROUNDS', 20)
+    make_flights(3000, seed=0).to_csv(tmp_path / 'train.csv', index=False)
+    make_flights(1000, seed=1).drop(columns='dep_delayed_15min').to_csv(tmp_path / 'test.csv', index=False)
+    store_dir = str(tmp_path / 'feature_store')
+    for name, is_train in [('train', True), ('test', False)]:
+        build_features(str(tmp_path / f'{name}.csv'), str(tmp_path / f'{name}.npy'), is_train=is_train,
+                       feature_store_path=store_dir)
+
+    matrix = train.load_training_matrix(str(tmp_path / 'train.npy'), str(tmp_path / 'cache'))
+    study, booster = train.tune(matrix, model, n_trials=1, cache_dir=str(tmp_path / 'cache'))
+    train.save_results(study, booster, model, str(tmp_path / 'models'), matrix)
+    model_path = tmp_path / 'models' / ('lightgbm_model.txt' if model == 'lightgbm' else 'xgboost_model.json')
+
+    stats = predict_file(str(tmp_path / 'test.csv'), str(tmp_path / 'predictions.csv'), str(model_path), store_dir,
+                         chunksize=300)
+    predictions = read_table(tmp_path / 'predictions.csv')
+    expected = load_model(model_path)(np.asarray(load_feature_matrix(tmp_path / 'test.npy').features))
+
+    assert stats['rows'] == 1000
+    np.testing.assert_array_equal(predictions['id'], np.arange(1000))
+    np.testing.assert_allclose(predictions['dep_delayed_15min'], expected, rtol=1e-6)
+
+def test_prefetch_keeps_order_and_raises_producer_errors():
+    """Items arrive in order and an exception in the producing thread reaches the consumer"""
+    assert list(prefetch(iter(range(100)), depth=3)) == list(range(100))
+
+    def failing():
+        yield 1
+        raise RuntimeError('read failed')
+
+    with pytest.raises(RuntimeError, match='read failed'):
+        list(prefetch(failing()))
@@ -0,0 +1,113 @@
+# src/models/test_serve.py
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from . import train
+from .predict import load_model
+from .serve import MicroBatcher, Scorer, ScoringServer
+from ..data.matrix_io import load_feature_matrix
+from ..data.synthetic import make_flights
+from ..features.build_features import build_features
+
+def test_micro_batcher_coalesces_concurrent_items():
+    """Concurrent items share calls of at most max_batch_size, and each gets its own result"""
+    batches = []
+
+    def double(items):
+        batches.append(len(items))
+        return [2 * item for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=8, max_latency=0.05)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+        finally:
+            await batcher.close()
+
+    assert asyncio.run(run()) == [2 * i for i in range(20)]
+    assert batches == [8, 8, 4]
+
+def test_micro_batcher_fails_only_bad_items():
+    def invert(items):
+        return [1 / item for item in items]
+
+    async def run():
+        batcher = MicroBatcher(invert, max_batch_size=4, max_latency=0.05)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in [1, 0, 2, 4]), return_exceptions=True)
+        finally:
+            await batcher.close()
+
+    first, failed, *rest = asyncio.run(run())
+    assert [first, *rest] == [1.0, 0.5, 0.25]
+    assert isinstance(failed, ZeroDivisionError)
+
+async def _request(connect, method, path, payload=None):
+    """One HTTP/1.1 request on a new connection; returns status and decoded JSON body."""
+    reader, writer = await connect()
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode()
+                 + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+    return status, json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+def test_server_scores_like_batch_prediction(tmp_path, monkeypatch):
+    """Concurrent single-flight requests get the model's predictions on the batch feature matrix"""
+    monkeypatch.setattr(train, 'MAX_ROUNDS', 20)
+    make_flights(3000, seed=0).to_csv(tmp_path / 'train.csv', index=False)
+    test = make_flights(200, seed=1).drop(columns='dep_delayed_15min')
+    test.to_csv(tmp_path / 'test.csv', index=False)
+    store_dir = str(tmp_path / 'feature_store')
+    for name, is_train in [('train', True), ('test', False)]:
+        build_features(str(tmp_path / f'{name}.csv'), str(tmp_path / f'{name}.npy'), is_train=is_train,
+                       feature_store_path=store_dir)
+    matrix = train.load_training_matrix(str(tmp_path / 'train.npy'), str(tmp_path / 'cache'))
+    study, booster = train.tune(matrix, 'lightgbm', n_trials=1, cache_dir=str(tmp_path / 'cache'))
+    train.save_results(study, booster, 'lightgbm', str(tmp_path / 'models'), matrix)
+    model_path = str(tmp_path / 'models' / 'lightgbm_model.txt')
+    expected = load_model(model_path)(np.asarray(load_feature_matrix(tmp_path / 'test.npy').features))
+
+    flights = test.to_dict('records')
+    # integer calendar fields are accepted as well as the "c-" encoding
+    flights[0] = {**flights[0], 'Month': int(flights[0]['Month'][2:])}
+    socket_path = str(tmp_path / 'serve.sock')
+
+    async def run():
+        server = ScoringServer(Scorer(model_path, store_dir), max_batch_size=64, max_latency=0.02)
+        tcp = await server.start(port=0)
+        port = tcp.sockets[0].getsockname()[1]
+        unix = ScoringServer(server.batcher.func)
+        await unix.start(unix_socket=socket_path)
+        try:
+            connect = lambda: asyncio.open_connection('127.0.0.1', port)
+            responses = await asyncio.gather(*(_request(connect, 'POST', '/predict', flight) for flight in flights))
+            batch = await _request(connect, 'POST', '/predict', flights[:5])
+            over_socket = await _request(lambda: asyncio.open_unix_connection(socket_path), 'POST', '/predict',
+                                         flights[0])
+            errors = [await _request(connect, 'POST', '/predict', {'Origin': 'ATL'}),
+                      await _request(connect, 'GET', '/predict'),
+                      await _request(connect, 'GET', '/nowhere')]
+            health = await _request(connect, 'GET', '/health')
+            return responses, batch, over_socket, errors, health
+        finally:
+            await server.close()
+            await unix.close()
+
+    responses, batch, over_socket, errors, health = asyncio.run(run())
+    assert {status for status, _ in responses} == {200}
+    np.testing.assert_allclose([body['dep_delayed_15min'] for _, body in responses], expected, rtol=1e-6)
+    np.testing.assert_allclose(batch[1]['dep_delayed_15min'], expected[:5], rtol=1e-6)
+    assert over_socket[1]['dep_delayed_15min'] == pytest.approx(expected[0], rel=1e-6)
+    assert [status for status, _ in errors] == [400, 405, 404]
+    # the concurrent requests were scored in far fewer calls than requests
+    assert health[1]['flights'] == len(flights) + 5
+    assert health[1]['batches'] < len(flights) / 4
@@ -0,0 +1,60 @@
+# src/models/test_train.py
+
+import os
+
+import pytest
+
+from . import train
+from ..data.matrix_io import write_feature_matrix
+from ..data.synthetic import make_flights
+from ..features.build_features import convert_data_types, create_features
+from ..features.feature_store import FeatureStore
+
+@pytest.mark.parametrize('model', train.MODELS)
+def test_tune_reuses_cached_datasets_and_times_trials(tmp_path, monkeypatch, model):
+    """Trials share the datasets built once, record their timing and report the validation AUC"""
+    monkeypatch.setattr(train, 'MAX_ROUNDS', 30)
+    df = create_features(convert_data_types(make_flights(3000, n_airports=40, seed=0)), FeatureStore(), fit=True)
+    write_feature_matrix(df, str(tmp_path / 'train.npy'))
+    cache_dir = str(tmp_path / 'cache')
+    matrix = train.load_training_matrix(str(tmp_path / 'train.npy'), cache_dir)
+
+    study, booster = train.tune(matrix, model, n_trials=3, n_jobs=2, cache_dir=cache_dir)
+    assert len(study.trials) == 3 and booster is not None
+    assert 0.5 < study.best_value <= 1.0
+    for trial in study.trials:
+        assert trial.user_attrs['train_seconds'] > 0
+
+    # the saved model stops at the best round, whatever the rounds trained for early stopping
+    train.save_results(study, booster, model, str(tmp_path / 'models'), matrix)
+    model_path = tmp_path / 'models' / ('lightgbm_model.txt' if model == 'lightgbm' else 'xgboost_model.json')
+    if model == 'lightgbm':
+        import lightgbm as lgb
+        saved_rounds = lgb.Booster(model_file=str(model_path)).num_trees()
+    else:
+        import xgboost as xgb
+        saved_rounds = xgb.Booster(model_file=str(model_path)).num_boosted_rounds()
+    assert saved_rounds == study.best_trial.user_attrs['rounds']
+
+    if model == 'lightgbm':
+        cached = sorted(os.listdir(cache_dir))
+        modified = [os.path.getmtime(os.path.join(cache_dir, name)) for name in cached]
+        train.tune(matrix, model, n_trials=1, cache_dir=cache_dir)
+        assert sorted(os.listdir(cache_dir)) == cached
+        assert [os.path.getmtime(os.path.join(cache_dir, name)) for name in cached] == modified
+
+def test_tune_raises_when_all_trials_are_pruned(tmp_path, monkeypatch):
+    import optuna
+
+    def pruned(trial):
+        raise optuna.TrialPruned("Pruned at round 0")
+
+    monkeypatch.setattr(train, 'xgboost_objective', lambda datasets, threads, seed: pruned)
+    df = create_features(convert_data_types(make_flights(500, seed=0)), FeatureStore(), fit=True)
+    write_feature_matrix(df, str(tmp_path / 'train.npy'))
+    matrix = train.load_training_matrix(str(tmp_path / 'train.npy'), str(tmp_path / 'cache'))
+
+    with pytest.raises(ValueError, match='all trials pruned'):
+        train.tune(matrix, 'xgboost', n_trials=2)
+    with pytest.raises(ValueError, match='all trials pruned'):
+        train.save_results(None, None, 'xgboost', str(tmp_path / 'models'), matrix)
@@ -0,0 +1,427 @@
+# src/models/train.py
+
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from ..data.matrix_io import is_matrix_path, load_feature_matrix, read_matrix_manifest, write_feature_matrix
+from ..data.table_io import read_table
+
+logger = logging.getLogger(__name__)
+
+MODELS = ['lightgbm', 'xgboost']
+
+# binning of the cached datasets; fixed, since every trial reuses the same bins
+DEFAULT_MAX_BIN = 255
+VALID_FRACTION = 0.2
+MAX_ROUNDS = 2000
+EARLY_STOPPING_ROUNDS = 50
+
+# processed training outputs, in the order the entry point looks for them
+TRAIN_FEATURES_STEM = 'flight_delays_train_features'
+TRAIN_FEATURES_EXTENSIONS = ['.npy', '.parquet', '.feather', '.csv']
+
+TrainingMatrix = namedtuple('TrainingMatrix', ['path', 'features', 'labels', 'columns', 'categorical'])
+
+def load_training_matrix(input_path, cache_dir):
+    """
+    Feature matrix of the feature pipeline output, memory-mapped.
+
+    A .npy matrix (build_features --format npy) is mapped as it is; a table is
+    converted once into a matrix in cache_dir, keyed on the file's path, size
+    and modification time, so later runs skip the parse.
+
+    Returns:
+    --------
+    TrainingMatrix
+        Path of the matrix, features, labels, column names and the indices of
+        the categorical columns
+    """
+    if not is_matrix_path(input_path):
+        matrix_path = os.path.join(cache_dir, f'features_{_file_key(input_path)}.npy')
+        if not os.path.exists(matrix_path):
+            logger.info("Converting %s to a feature matrix in %s", input_path, matrix_path)
+            write_feature_matrix(read_table(input_path), matrix_path)
+        input_path = matrix_path
+
+    matrix = load_feature_matrix(input_path)
+    if matrix.labels is None:
+        raise ValueError(f"{input_path} has no dep_delayed_15min labels to train on")
+    categorical = [matrix.columns.index(col) for col in matrix.categories]
+    return TrainingMatrix(str(input_path), matrix.features, matrix.labels, matrix.columns, categorical)
+
+def split_rows(n_rows, valid_fraction=VALID_FRACTION, seed=0):
+    """Sorted row indices of a random train/validation split."""
+    order = np.random.default_rng(seed).permutation(n_rows)
+    n_valid = int(round(n_rows * valid_fraction))
+    return np.sort(order[n_valid:]), np.sort(order[:n_valid])
+
+class LightGBMDatasets:
+    """
+    Binned LightGBM train/validation datasets, built once and cached as binary files.
+
+    Binning the raw features is the expensive part of constructing a
+    lightgbm.Dataset; the binned datasets are saved with save_binary under a
+    key of the matrix, split and max_bin, and every worker thread loads its own
+    copy of the binary files, which needs no binning.
+
+    Parameters:
+    -----------
+    matrix : TrainingMatrix
+        Training data
+    cache_dir : str
+        Directory of the binary dataset files
+    valid_fraction : float, default=VALID_FRACTION
+        Fraction of rows held out for early stopping
+    seed : int, default=0
+        Seed of the split
+    max_bin : int, default=DEFAULT_MAX_BIN
+        Maximum number of bins per feature
+    """
+
+    def __init__(self, matrix, cache_dir, valid_fraction=VALID_FRACTION, seed=0, max_bin=DEFAULT_MAX_BIN):
+        import lightgbm as lgb
+
+        # feature_pre_filter off, so that trials may vary min_data_in_leaf on the same bins
+        self.params = {'max_bin': max_bin, 'feature_pre_filter': False, 'verbosity': -1}
+        key = _dataset_key(matrix.path, 'lightgbm', valid_fraction, seed, max_bin)
+        self.train_path = os.path.join(cache_dir, f'lightgbm_{key}_train.bin')
+        self.valid_path = os.path.join(cache_dir, f'lightgbm_{key}_valid.bin')
+        self._local = threading.local()
+
+        if os.path.exists(self.train_path) and os.path.exists(self.valid_path):
+            logger.info("Using cached LightGBM datasets %s", self.train_path)
+            return
+        os.makedirs(cache_dir, exist_ok=True)
+        logger.info("Building LightGBM datasets in %s", cache_dir)
+        train_rows, valid_rows = split_rows(len(matrix.labels), valid_fraction, seed)
+        train = lgb.Dataset(matrix.features[train_rows], matrix.labels[train_rows], feature_name=matrix.columns,
+                            categorical_feature=matrix.categorical, params=self.params)
+        # the validation rows are binned with the training bin boundaries
+        valid = lgb.Dataset(matrix.features[valid_rows], matrix.labels[valid_rows], reference=train,
+                            params=self.params)
+        train.construct().save_binary(self.train_path)
+        valid.construct().save_binary(self.valid_path)
+
+    def get(self):
+        """(train, valid) datasets of the calling thread."""
+        if not hasattr(self._local, 'datasets'):
+            import lightgbm as lgb
+
+            train = lgb.Dataset(self.train_path, params=self.params).construct()
+            valid = lgb.Dataset(self.valid_path, reference=train, params=self.params).construct()
+            self._local.datasets = train, valid
+        return self._local.datasets
+
+class XGBoostDatasets:
+    """
+    Binned XGBoost train/validation QuantileDMatrix pairs, one per worker thread.
+
+    XGBoost has no binary format for binned data, so the quantile sketch is
+    built from the memory-mapped matrix once per worker thread and reused by
+    every trial that thread runs.
+
+    Parameters are those of LightGBMDatasets, without the cache directory.
+    """
+
+    def __init__(self, matrix, valid_fraction=VALID_FRACTION, seed=0, max_bin=DEFAULT_MAX_BIN):
+        self.matrix = matrix
+        self.max_bin = max_bin
+        self.rows = split_rows(len(matrix.labels), valid_fraction, seed)
+        self._local = threading.local()
+
+    def get(self):
+        """(train, valid) matrices of the calling thread."""
+        if not hasattr(self._local, 'datasets'):
+            import xgboost as xgb
+
+            matrix = self.matrix
+            feature_types = ['c' if i in matrix.categorical else 'q' for i in range(len(matrix.columns))]
+            train_rows, valid_rows = self.rows
+            train = xgb.QuantileDMatrix(matrix.features[train_rows], matrix.labels[train_rows],
+                                        feature_names=matrix.columns, feature_types=feature_types,
+                                        enable_categorical=True, max_bin=self.max_bin)
+            valid = xgb.QuantileDMatrix(matrix.features[valid_rows], matrix.labels[valid_rows], ref=train,
+                                        feature_names=matrix.columns, feature_types=feature_types,
+                                        enable_categorical=True, max_bin=self.max_bin)
+            self._local.datasets = train, valid
+        return self._local.datasets
+
+def lightgbm_objective(datasets, threads, seed=0):
+    """Optuna objective training LightGBM on the cached datasets; returns the best validation AUC."""
+    import lightgbm as lgb
+
+    def objective(trial):
+        params = {
+            'objective': 'binary',
+            'metric': 'auc',
+            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
+            'num_leaves': trial.suggest_int('num_leaves', 15, 255, log=True),
+            'min_data_in_leaf': trial.suggest_int('min_data_in_leaf', 10, 500, log=True),
+            'feature_fraction': trial.suggest_float('feature_fraction', 0.4, 1.0),
+            'bagging_fraction': trial.suggest_float('bagging_fraction', 0.4, 1.0),
+            'bagging_freq': 1,
+            'lambda_l1': trial.suggest_float('lambda_l1', 1e-8, 10.0, log=True),
+            'lambda_l2': trial.suggest_float('lambda_l2', 1e-8, 10.0, log=True),
+            'num_threads': threads,
+            'seed': seed,
+            **datasets.params,
+        }
+        train, valid = datasets.get()
+        with _timed_trial(trial):
+            booster = lgb.train(params, train, num_boost_round=MAX_ROUNDS, valid_sets=[valid], valid_names=['valid'],
+                                callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False),
+                                           _lightgbm_pruning_callback(trial)])
+        trial.set_user_attr('rounds', booster.best_iteration)
+        return booster.best_score['valid']['auc'], booster
+
+    return objective
+
+def xgboost_objective(datasets, threads, seed=0):
+    """Optuna objective training XGBoost on the cached datasets; returns the best validation AUC."""
+    import xgboost as xgb
+
+    def objective(trial):
+        params = {
+            'objective': 'binary:logistic',
+            'eval_metric': 'auc',
+            'tree_method': 'hist',
+            'max_bin': datasets.max_bin,
+            'eta': trial.suggest_float('eta', 0.01, 0.3, log=True),
+            'max_depth': trial.suggest_int('max_depth', 3, 12),
+            'min_child_weight': trial.suggest_float('min_child_weight', 1e-2, 100.0, log=True),
+            'subsample': trial.suggest_float('subsample', 0.4, 1.0),
+            'colsample_bytree': trial.suggest_float('colsample_bytree', 0.4, 1.0),
+            'lambda': trial.suggest_float('lambda', 1e-8, 10.0, log=True),
+            'alpha': trial.suggest_float('alpha', 1e-8, 10.0, log=True),
+            'nthread': threads,
+            'seed': seed,
+        }
+        train, valid = datasets.get()
+        with _timed_trial(trial):
+            booster = xgb.train(params, train, num_boost_round=MAX_ROUNDS, evals=[(valid, 'valid')],
+                                early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False,
+                                callbacks=[_xgboost_pruning_callback(trial)])
+        trial.set_user_attr('rounds', booster.best_iteration + 1)
+        # drop the early-stopping rounds past the best one, as LightGBM's save_model does, so the
+        # saved model (scored with inplace_predict over all its trees) is the one whose AUC was tuned
+        return booster.best_score, booster[:booster.best_iteration + 1]
+
+    return objective
+
+def _lightgbm_pruning_callback(trial):
+    """Report the validation AUC of every round to the trial and stop it when the pruner says so."""
+    import optuna
+
+    def callback(env):
+        for data_name, metric, score, _ in env.evaluation_result_list:
+            if data_name == 'valid' and metric == 'auc':
+                trial.report(score, env.iteration)
+                if trial.should_prune():
+                    raise optuna.TrialPruned(f"Pruned at round {env.iteration}")
+    return callback
+
+def _xgboost_pruning_callback(trial):
+    """XGBoost counterpart of _lightgbm_pruning_callback."""
+    import optuna
+    import xgboost as xgb
+
+    class PruningCallback(xgb.callback.TrainingCallback):
+        def after_iteration(self, model, epoch, evals_log):
+            trial.report(evals_log['valid']['auc'][-1], epoch)
+            if trial.should_prune():
+                raise optuna.TrialPruned(f"Pruned at round {epoch}")
+            return False
+
+    return PruningCallback()
+
+@contextlib.contextmanager
+def _timed_trial(trial):
+    """Record the wall and CPU seconds of a trial's training as trial attributes, also when it is pruned."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        trial.set_user_attr('train_seconds', time.perf_counter() - wall)
+        # process CPU time, so concurrent trials count each other's threads as well
+        trial.set_user_attr('process_cpu_seconds', time.process_time() - cpu)
+
+def tune(matrix, model='lightgbm', n_trials=50, n_jobs=1, timeout=None, cache_dir=None, seed=0,
+         valid_fraction=VALID_FRACTION, max_bin=DEFAULT_MAX_BIN):
+    """
+    Run an Optuna study maximizing validation ROC AUC.
+
+    The binned datasets are built once (and for LightGBM cached on disk) and
+    shared by every trial. n_jobs trials run concurrently on threads (the
+    boosters release the GIL while training), each with an equal share of
+    the cores. Every trial stops early once the validation AUC has not
+    improved for EARLY_STOPPING_ROUNDS rounds, and unpromising trials are
+    pruned by a median pruner on the AUC per round. A study in which no
+    trial completes raises a ValueError, as there is no model to keep.
+
+    Parameters:
+    -----------
+    matrix : TrainingMatrix
+        Training data from load_training_matrix
+    model : str, default='lightgbm'
+        'lightgbm' or 'xgboost'
+    n_trials : int, default=50
+        Number of trials
+    n_jobs : int, default=1
+        Concurrent trials
+    timeout : float, optional
+        Stop starting new trials after this many seconds
+    cache_dir : str, optional
+        Directory of the LightGBM binary datasets (required for lightgbm)
+    seed : int, default=0
+        Seed of the split, the sampler and the boosters
+    valid_fraction : float, default=VALID_FRACTION
+        Fraction of rows held out for early stopping and the AUC
+    max_bin : int, default=DEFAULT_MAX_BIN
+        Maximum number of bins per feature
+
+    Returns:
+    --------
+    (optuna.Study, booster)
+        The study (per-trial timing in the user attributes train_seconds,
+        process_cpu_seconds and rounds) and the best trial's booster
+    """
+    import optuna
+
+    if model not in MODELS:
+        raise ValueError(f"Unknown model '{model}'; expected one of {MODELS}")
+    threads = max(1, (os.cpu_count() or 1) // n_jobs)
+    with _timed('datasets'):
+        if model == 'lightgbm':
+            datasets = LightGBMDatasets(matrix, cache_dir, valid_fraction, seed, max_bin)
+            objective = lightgbm_objective(datasets, threads, seed)
+        else:
+            datasets = XGBoostDatasets(matrix, valid_fraction, seed, max_bin)
+            objective = xgboost_objective(datasets, threads, seed)
+
+    best = {'score': -np.inf, 'booster': None}
+    lock = threading.Lock()
+
+    def keep_best(trial):
+        score, booster = objective(trial)
+        with lock:
+            if score > best['score']:
+                best['score'], best['booster'] = score, booster
+        return score
+
+    study = optuna.create_study(direction='maximize', sampler=optuna.samplers.TPESampler(seed=seed),
+                                pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=20))
+    logger.info("Running %d %s trials, %d at a time with %d threads each", n_trials, model, n_jobs, threads)
+    with _timed('study'):
+        study.optimize(keep_best, n_trials=n_trials, timeout=timeout, n_jobs=n_jobs, callbacks=[_log_trial])
+    if best['booster'] is None:
+        raise ValueError(f"No {model} trial completed (all trials pruned or failed) in {len(study.trials)} "
+                         "trials; run more trials or a longer timeout")
+    return study, best['booster']
+
+def _log_trial(study, trial):
+    seconds = trial.user_attrs.get('train_seconds', float('nan'))
+    if trial.state == trial.state.COMPLETE:
+        logger.info("Trial %d: AUC %.5f after %s rounds in %.2fs", trial.number, trial.value,
+                    trial.user_attrs.get('rounds'), seconds)
+    else:
+        logger.info("Trial %d: %s after %.2fs", trial.number, trial.state.name.lower(), seconds)
+
+@contextlib.contextmanager
+def _timed(name):
+    """Log the wall time of a block."""
+    start = time.perf_counter()
+    yield
+    logger.info("%s took %.2fs", name, time.perf_counter() - start)
+
+def model_layout_file(model_path):
+    """Path of the feature matrix layout saved next to a model."""
+    return os.path.splitext(str(model_path))[0] + '.features.json'
+
+def save_results(study, booster, model, model_dir, matrix):
+    """
+    Write the best booster, its parameters and the per-trial report (with timings) to model_dir.
+
+    The column layout and category codes of the training matrix are saved next
+    to the model, so that predictions encode new data the same way.
+    """
+    if booster is None:
+        raise ValueError("No best booster to save: all trials pruned or failed")
+    os.makedirs(model_dir, exist_ok=True)
+    model_path = os.path.join(model_dir, f'{model}_model.txt' if model == 'lightgbm' else f'{model}_model.json')
+    booster.save_model(model_path)
+    layout = read_matrix_manifest(matrix.path)
+    layout.pop('rows')
+    with open(model_layout_file(model_path), 'w') as f:
+        json.dump(layout, f, indent=2)
+    with open(os.path.join(model_dir, f'{model}_best_params.json'), 'w') as f:
+        json.dump({'auc': study.best_value, 'params': study.best_params, **study.best_trial.user_attrs}, f, indent=2)
+    study.trials_dataframe().to_csv(os.path.join(model_dir, f'{model}_trials.csv'), index=False)
+    logger.info("Saved the best model (AUC %.5f) to %s", study.best_value, model_path)
+
+def find_training_features(processed_data_dir):
+    """Processed training output, preferring the feature matrix over tables."""
+    for ext in TRAIN_FEATURES_EXTENSIONS:
+        path = os.path.join(processed_data_dir, TRAIN_FEATURES_STEM + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No {TRAIN_FEATURES_STEM} output in {processed_data_dir}; "
+                            "run python -m src.features.build_features first")
+
+def _file_key(path):
+    """Short key of a file's identity: absolute path, size and modification time."""
+    stat = os.stat(path)
+    return hashlib.blake2b(f'{os.path.abspath(path)} {stat.st_size} {stat.st_mtime_ns}'.encode(),
+                           digest_size=8).hexdigest()
+
+def _dataset_key(matrix_path, model, valid_fraction, seed, max_bin):
+    """Cache key of the binned datasets of one matrix, split and binning."""
+    return hashlib.blake2b(f'{_file_key(matrix_path)} {model} {valid_fraction} {seed} {max_bin}'.encode(),
+                           digest_size=8).hexdigest()
+
+def main():
+    """
+    Entry point for model training.
+    Example usage:
+        python -m src.models.train
+        python -m src.models.train --model xgboost --trials 100 --n-jobs 4
+        python -m src.models.train --input data/processed/flight_delays_train_features.npy --timeout 3600
+    """
+    parser = argparse.ArgumentParser(description='Tune and train a flight delay model')
+    parser.add_argument('--model', choices=MODELS, default='lightgbm')
+    parser.add_argument('--input', default=None,
+                        help='processed training features (defaults to data/processed/flight_delays_train_features.*)')
+    parser.add_argument('--trials', type=int, default=50, help='number of Optuna trials')
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help='concurrent trials; the cores are split evenly between them')
+    parser.add_argument('--timeout', type=float, default=None, help='stop starting trials after this many seconds')
+    parser.add_argument('--valid-fraction', type=float, default=VALID_FRACTION,
+                        help='fraction of rows held out for early stopping')
+    parser.add_argument('--max-bin', type=int, default=DEFAULT_MAX_BIN, help='maximum number of bins per feature')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    # project base path
+    project_dir = Path(__file__).resolve().parents[2]
+    input_path = args.input or find_training_features(os.path.join(project_dir, 'data', 'processed'))
+    cache_dir = os.path.join(project_dir, 'data', 'interim', 'train_datasets')
+    model_dir = os.path.join(project_dir, 'models')
+
+    matrix = load_training_matrix(input_path, cache_dir)
+    study, booster = tune(matrix, args.model, args.trials, args.n_jobs, args.timeout, cache_dir, args.seed,
+                          args.valid_fraction, args.max_bin)
+    save_results(study, booster, args.model, model_dir, matrix)
+
+if __name__ == '__main__':
+    main()